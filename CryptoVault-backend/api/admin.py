@@ -1,9 +1,109 @@
 from django.contrib import admin
-from .models import VaultFile  # Import your correct model
+from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .date_hierarchy import FILTERED_COUNT_LIMIT
+from .models import VaultFile, CloudUploadLog  # Import your correct model
+from .search import search_file_name
+
+User = get_user_model()
+
+# Above this many rows the changelist shows the planner's row estimate
+# instead of running COUNT(*) over the whole table
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+def estimated_row_count(model, using='default'):
+    """Approximate number of rows in model's table without scanning it (None if unknown)."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed/analyzed once
+            return row[0] if row and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            # Ids are assigned in increasing order, so the largest one is a
+            # close upper bound; found with one index lookup
+            cursor.execute(f"SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}")
+            row = cursor.fetchone()
+            return row[0] if row else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator for large tables. The unfiltered list uses the
+    estimated table size; filtered lists are counted up to
+    FILTERED_COUNT_LIMIT matches.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        model = queryset.model
+        if queryset.query.where == model._default_manager.all().query.where:
+            estimate = estimated_row_count(model, queryset.db)
+            if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return queryset.order_by()[:FILTERED_COUNT_LIMIT].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings shared by the admins of large tables."""
+    paginator = EstimatedCountPaginator
+    # Skip the second COUNT(*) of the whole table on filtered pages
+    show_full_result_count = False
+    list_per_page = 50
+    # Newest first, read in order from the date index
+    ordering = ('-uploaded_at',)
+
+    def get_queryset(self, request):
+        # Same as ModelAdmin.get_queryset, but from the model's changelist
+        # manager, whose querysets build the date hierarchy from the index
+        queryset = self.model.changelist_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
 
 @admin.register(VaultFile)
-class VaultFileAdmin(admin.ModelAdmin):
+class VaultFileAdmin(LargeTableAdmin):
     # Customize columns shown in the admin list view
     list_display = ('id', 'uploaded_file', 'file_name', 'uploaded_at', 'blockchain_hash', 'user', 'receiving_user', 'aes_key')
-    readonly_fields = ('uploaded_at', 'encrypted_fernet_key')
-    fields = ('user', 'uploaded_file', 'file_name', 'blockchain_hash', 'receiving_user', 'aes_key', 'encrypted_fernet_key', 'uploaded_at')
\ No newline at end of file
+    list_select_related = ('user', 'receiving_user')
+    readonly_fields = ('uploaded_at', 'encrypted_fernet_key', 'last_verified_at', 'verification_status')
+    fields = ('user', 'uploaded_file', 'file_name', 'blockchain_hash', 'receiving_user', 'aes_key', 'encrypted_fernet_key', 'uploaded_at', 'last_verified_at', 'verification_status')
+    raw_id_fields = ('user', 'receiving_user')
+    date_hierarchy = 'uploaded_at'
+    # file_name goes through the trigram index (see get_search_results);
+    # usernames are matched exactly on the unique index
+    search_fields = ('file_name', '=user__username', '=receiving_user__username')
+    search_help_text = "File name (3+ characters use the search index) or exact sender/recipient username"
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        # Subqueries rather than joins, so each branch can use its own index
+        named = User.objects.filter(username=term).values('pk')
+        matches = (
+            search_file_name(queryset, term)
+            | queryset.filter(user__in=named)
+            | queryset.filter(receiving_user__in=named)
+        )
+        return matches, False
+
+
+@admin.register(CloudUploadLog)
+class CloudUploadLogAdmin(LargeTableAdmin):
+    list_display = ('id', 'file_name', 'user', 'file_size', 'content_type', 'uploaded_at', 'vault_file')
+    list_select_related = ('user', 'vault_file')
+    raw_id_fields = ('user', 'vault_file')
+    date_hierarchy = 'uploaded_at'
+    search_fields = ('=s3_key', '=user__username')
+    search_help_text = "Exact S3 key or username"
@@ -0,0 +1,176 @@
+"""
+Process-wide admission control for in-memory crypto work.
+
+Fernet encryption and decryption hold whole files in memory (plaintext,
+ciphertext and the base64 token at once), so each request reserves an
+estimated number of bytes plus a concurrency slot before it starts. When the
+budget is exhausted requests queue up to QUEUE_TIMEOUT seconds and are then
+turned away with 503 and Retry-After.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+ADMISSION_DEFAULTS = {
+    'MAX_CONCURRENT': 4,
+    'MAX_BYTES': 1024 * 1024 * 1024,
+    'QUEUE_TIMEOUT': 10,
+    'RETRY_AFTER': 5,
+    # Peak memory of one crypto operation relative to the file size
+    'MEMORY_FACTOR': 3,
+}
+
+
+class CryptoCapacityExceeded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Server is busy encrypting other files. Please retry later.'
+    default_code = 'crypto_capacity_exceeded'
+
+    def __init__(self, wait):
+        super().__init__()
+        # DRF's exception handler turns this into a Retry-After header
+        self.wait = wait
+
+
+class CryptoRequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'File is too large to be encrypted on this server.'
+    default_code = 'crypto_request_too_large'
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Upload exceeds the maximum allowed size.'
+    default_code = 'upload_too_large'
+
+
+class AdmissionController:
+    """
+    Byte budget plus concurrency limit guarded by one condition variable.
+    """
+
+    def __init__(self, max_concurrent, max_bytes, queue_timeout, retry_after):
+        self.max_concurrent = max_concurrent
+        self.max_bytes = max_bytes
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._cond = threading.Condition()
+        self.active = 0
+        self.bytes_in_use = 0
+        self.waiting = 0
+        self.peak_bytes = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.wait_seconds_total = 0.0
+
+    def _has_room(self, nbytes):
+        return self.active < self.max_concurrent and self.bytes_in_use + nbytes <= self.max_bytes
+
+    @contextmanager
+    def admit(self, nbytes):
+        """Hold a slot and nbytes of budget for the duration of the block."""
+        if nbytes > self.max_bytes:
+            with self._cond:
+                self.rejected_total += 1
+            raise CryptoRequestTooLarge()
+
+        start = time.monotonic()
+        deadline = start + self.queue_timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while not self._has_room(nbytes):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_total += 1
+                        raise CryptoCapacityExceeded(self.retry_after)
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.active += 1
+            self.bytes_in_use += nbytes
+            self.peak_bytes = max(self.peak_bytes, self.bytes_in_use)
+            self.admitted_total += 1
+            self.wait_seconds_total += time.monotonic() - start
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self.bytes_in_use -= nbytes
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_bytes': self.max_bytes,
+                'queue_timeout': self.queue_timeout,
+                'active': self.active,
+                'waiting': self.waiting,
+                'bytes_in_use': self.bytes_in_use,
+                'peak_bytes': self.peak_bytes,
+                'admitted_total': self.admitted_total,
+                'rejected_total': self.rejected_total,
+                'avg_wait_seconds': (
+                    self.wait_seconds_total / self.admitted_total if self.admitted_total else 0.0
+                ),
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_settings():
+    config = dict(ADMISSION_DEFAULTS)
+    config.update(getattr(settings, 'CRYPTO_ADMISSION', {}) or {})
+    return config
+
+
+def get_admission_controller():
+    """The process-wide controller, built from settings on first use."""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                config = get_admission_settings()
+                _controller = AdmissionController(
+                    max_concurrent=config['MAX_CONCURRENT'],
+                    max_bytes=config['MAX_BYTES'],
+                    queue_timeout=config['QUEUE_TIMEOUT'],
+                    retry_after=config['RETRY_AFTER'],
+                )
+    return _controller
+
+
+@contextmanager
+def reserve_crypto_memory(file_size):
+    """
+    Admit a crypto operation over a file of file_size bytes. A size of 0
+    (nothing to encrypt) skips admission entirely.
+    """
+    if not file_size:
+        yield
+        return
+    cost = int(file_size * get_admission_settings()['MEMORY_FACTOR'])
+    with get_admission_controller().admit(cost):
+        yield
+
+
+def enforce_upload_size(request):
+    """
+    Reject an upload from its Content-Length before the body is parsed, so
+    oversized files are never spooled to disk.
+    """
+    max_size = getattr(settings, 'VAULT_MAX_UPLOAD_SIZE', None)
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if max_size and content_length > max_size:
+        raise UploadTooLarge(f'Upload exceeds the {max_size} byte limit.')
@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .merkle import build_levels, decode_proof, encode_proof, inclusion_proof, leaf_hash, verify_proof
+from .models import AnchorBatch, VaultFile
+
+SHA256_HEX_PATTERN = r'^[0-9a-f]{64}$'
+
+
+def file_leaf(blockchain_hash: str) -> bytes:
+    """Leaf hash of a file in an anchor batch."""
+    return leaf_hash(bytes.fromhex(blockchain_hash))
+
+
+def pending_files():
+    """Files with a SHA-256 blockchain_hash that are not in any batch yet."""
+    return VaultFile.objects.filter(
+        anchor_batch__isnull=True,
+        blockchain_hash__regex=SHA256_HEX_PATTERN
+    ).order_by('id')
+
+
+def build_anchor_batch(max_leaves=10000):
+    """
+    Build one batch over the oldest pending files, storing the root and each
+    file's inclusion proof, then hand the root to the anchor publisher.
+    Returns the new AnchorBatch, or None when nothing is pending.
+    """
+    with transaction.atomic():
+        files = list(
+            pending_files().select_for_update().only('id', 'blockchain_hash')[:max_leaves]
+        )
+        if not files:
+            return None
+        levels = build_levels([file_leaf(f.blockchain_hash) for f in files])
+        batch = AnchorBatch.objects.create(
+            merkle_root=levels[-1][0].hex(),
+            leaf_count=len(files),
+        )
+        for index, vault_file in enumerate(files):
+            vault_file.anchor_batch = batch
+            vault_file.anchor_index = index
+            vault_file.anchor_proof = encode_proof(inclusion_proof(levels, index))
+        VaultFile.objects.bulk_update(files, ['anchor_batch', 'anchor_index', 'anchor_proof'], batch_size=500)
+    publish_batch(batch)
+    return batch
+
+
+def publish_batch(batch):
+    """
+    Pass the batch to settings.VAULT_ANCHOR_PUBLISHER, a dotted path to a
+    callable taking the AnchorBatch and returning an external reference.
+    Without a publisher the root is only recorded locally.
+    """
+    publisher_path = getattr(settings, 'VAULT_ANCHOR_PUBLISHER', None)
+    if not publisher_path:
+        return
+    try:
+        reference = import_string(publisher_path)(batch)
+    except Exception as e:
+        print(f"Anchor publishing failed for batch {batch.pk}: {e}")
+        return
+    batch.anchored_at = timezone.now()
+    batch.anchor_reference = str(reference) if reference is not None else None
+    batch.save(update_fields=['anchored_at', 'anchor_reference'])
+
+
+def verify_file_anchor(vault_file):
+    """Check the stored inclusion proof of a file against its batch root."""
+    if not vault_file.anchor_batch_id or vault_file.anchor_proof is None:
+        return False
+    return verify_proof(
+        file_leaf(vault_file.blockchain_hash),
+        decode_proof(vault_file.anchor_proof),
+        bytes.fromhex(vault_file.anchor_batch.merkle_root),
+    )
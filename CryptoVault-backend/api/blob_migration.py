@@ -0,0 +1,120 @@
+"""
+Copying vault blobs between storage backends (see migrate_storage command).
+
+Workers stream each blob from its current storage into the target and
+re-hash the copy. The main thread then switches every verified row of the
+batch to the new storage in one transaction. The switch is conditional on
+the row still pointing at the old blob, so uploads, updates and deletes
+can keep running while a migration is in progress.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import File
+from django.core.files.storage import storages
+from django.db import transaction
+
+from .models import VaultFile, JobCheckpoint
+from .utils import sha256_stream
+
+
+def checkpoint_name(source_alias, target_alias):
+    return f"storage-migrate:{source_alias}->{target_alias}"
+
+
+def copy_blob(vault_file, target, limiter=None):
+    """
+    Stream one blob into the target storage and verify the copy.
+    Returns (vault_file, new_name, error); new_name is None on failure.
+    """
+    name = vault_file.uploaded_file.name
+    source = vault_file.uploaded_file.storage
+    new_name = None
+    try:
+        with source.open(name, 'rb') as src:
+            new_name = target.save(name, File(src, name=name))
+        with target.open(new_name, 'rb') as copied:
+            if vault_file.blockchain_hash:
+                digest = sha256_stream(copied, limiter=limiter)
+                if digest != vault_file.blockchain_hash:
+                    raise ValueError(f"hash mismatch after copy ({digest})")
+            elif target.size(new_name) != source.size(name):
+                raise ValueError("size mismatch after copy")
+    except Exception as e:
+        if new_name:
+            target.delete(new_name)
+        return vault_file, None, str(e)
+    return vault_file, new_name, None
+
+
+def switch_batch(copied, target_alias):
+    """
+    Point every copied row at its new blob in one transaction. Rows whose
+    file changed while copying are left alone. Returns the list of
+    (vault_file, new_name) that were switched.
+    """
+    switched = []
+    with transaction.atomic():
+        for vault_file, new_name in copied:
+            updated = VaultFile.objects.filter(
+                id=vault_file.id,
+                storage_alias=vault_file.storage_alias,
+                uploaded_file=vault_file.uploaded_file.name,
+            ).update(storage_alias=target_alias, uploaded_file=new_name)
+            if updated:
+                switched.append((vault_file, new_name))
+    return switched
+
+
+def migrate_batch(files, target_alias, executor, delete_source=False, limiter=None):
+    """
+    Copy, verify and switch one batch. Returns (migrated, errors) where
+    errors is a list of (id, message).
+    """
+    target = storages[target_alias]
+    copied, errors = [], []
+    for vault_file, new_name, error in executor.map(lambda vf: copy_blob(vf, target, limiter), files):
+        if error:
+            errors.append((vault_file.id, error))
+        else:
+            copied.append((vault_file, new_name))
+
+    switched = switch_batch(copied, target_alias)
+    switched_ids = {vault_file.id for vault_file, _ in switched}
+    for vault_file, new_name in copied:
+        if vault_file.id in switched_ids:
+            if delete_source:
+                vault_file.uploaded_file.storage.delete(vault_file.uploaded_file.name)
+        else:
+            # Row changed underneath us; drop the now unreferenced copy
+            target.delete(new_name)
+            errors.append((vault_file.id, "row changed during copy, skipped"))
+    return len(switched), errors
+
+
+def migrate_storage(source_alias, target_alias, batch_size=100, workers=8,
+                    delete_source=False, limiter=None, on_batch=None):
+    """
+    Migrate every row stored under source_alias to target_alias, resuming
+    from the saved checkpoint.
+    """
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name=checkpoint_name(source_alias, target_alias))
+    migrated, errors = 0, []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            files = list(
+                VaultFile.objects.filter(id__gt=checkpoint.last_id, storage_alias=source_alias)
+                .exclude(uploaded_file='')
+                .only('id', 'uploaded_file', 'storage_alias', 'blockchain_hash', 'receiving_user_id')
+                .order_by('id')[:batch_size]
+            )
+            if not files:
+                break
+            batch_migrated, batch_errors = migrate_batch(files, target_alias, executor, delete_source, limiter)
+            migrated += batch_migrated
+            errors.extend(batch_errors)
+            checkpoint.last_id = files[-1].id
+            checkpoint.save(update_fields=['last_id', 'updated_at'])
+            if on_batch:
+                on_batch(checkpoint.last_id, batch_migrated, batch_errors)
+    checkpoint.delete()
+    return migrated, errors
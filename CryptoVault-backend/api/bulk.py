@@ -0,0 +1,64 @@
+"""
+Set-based bulk actions on vault files (see SecureFileViewSet.bulk_delete
+and bulk_reshare).
+
+The selection is resolved to ids with one query that already applies the
+ownership check, then changed in chunks of BULK_CHUNK_SIZE rows, each in its
+own transaction, so a large request never holds locks on every row at once.
+Deletes only tombstone rows; collect_garbage removes the blobs later.
+"""
+from django.db import transaction
+
+from .models import SHARE_EXPIRY_RESET, VaultFile
+from .usage import apply_deltas, merge_deltas, vault_file_deltas
+
+BULK_CHUNK_SIZE = 500
+
+
+def chunked(ids, size):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def bulk_delete_files(queryset, chunk_size=BULK_CHUNK_SIZE):
+    """Tombstone every file in queryset. Returns the number deleted."""
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+    deleted = 0
+    for chunk in chunked(ids, chunk_size):
+        # VaultFileQuerySet.delete tombstones and updates usage in one transaction
+        count, _ = VaultFile.objects.filter(id__in=chunk).delete()
+        deleted += count
+    return deleted
+
+
+def bulk_reshare_files(queryset, receiving_user, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Point receiving_user of every file in queryset at receiving_user (None
+    to unshare), clearing any share expiry and adjusting usage counters.
+    Returns the number changed.
+    """
+    receiving_user_id = receiving_user.id if receiving_user else None
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+    changed = 0
+    for chunk in chunked(ids, chunk_size):
+        with transaction.atomic():
+            rows = list(
+                VaultFile.objects.filter(id__in=chunk)
+                .exclude(receiving_user_id=receiving_user_id)
+                .select_for_update()
+                .values_list('id', 'user_id', 'receiving_user_id', 'file_size')
+            )
+            if not rows:
+                continue
+            VaultFile.objects.filter(id__in=[row[0] for row in rows]).update(
+                receiving_user_id=receiving_user_id, **SHARE_EXPIRY_RESET
+            )
+            apply_deltas(merge_deltas(*(
+                merge_deltas(
+                    vault_file_deltas(user_id, old_receiver, size, sign=-1),
+                    vault_file_deltas(user_id, receiving_user_id, size),
+                )
+                for _, user_id, old_receiver, size in rows
+            )))
+            changed += len(rows)
+    return changed
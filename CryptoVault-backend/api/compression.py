@@ -0,0 +1,142 @@
+"""
+Optional compression of uploads before they are encrypted.
+
+Ciphertext does not compress, so the only chance to save disk and transfer
+is before encrypt_data runs. Uploads are fed through an incremental
+compressor in chunks; formats that are already compressed are skipped by
+content type or by the entropy of a sample of their bytes. The codec used
+is stored on the VaultFile ('' for none) and reversed after decryption.
+zstd needs the optional zstandard package and falls back to zlib without it.
+"""
+import lzma
+import math
+import zlib
+from collections import Counter
+
+from django.conf import settings
+
+COMPRESSION_DEFAULTS = {
+    # '', 'zlib', 'lzma' or 'zstd'
+    'CODEC': '',
+    'LEVEL': None,
+    'MIN_SIZE': 1024,
+    'CHUNK_SIZE': 1024 * 1024,
+    'SAMPLE_SIZE': 64 * 1024,
+    # Bits per byte above which a sample is treated as incompressible
+    'MAX_ENTROPY': 7.5,
+    # Stored compressed only if it saves at least this fraction
+    'MIN_SAVING': 0.05,
+    'SKIP_CONTENT_TYPES': [
+        'image/', 'video/', 'audio/',
+        'application/zip', 'application/gzip', 'application/x-gzip',
+        'application/x-7z-compressed', 'application/x-rar-compressed',
+        'application/vnd.rar', 'application/x-bzip2', 'application/x-xz',
+        'application/zstd', 'application/pdf',
+    ],
+}
+
+DEFAULT_LEVELS = {'zlib': 6, 'lzma': 6, 'zstd': 3}
+
+
+def get_compression_settings():
+    config = dict(COMPRESSION_DEFAULTS)
+    config.update(getattr(settings, 'VAULT_COMPRESSION', {}) or {})
+    return config
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_codec(codec):
+    """The configured codec, or zlib when zstd is requested but not installed."""
+    if codec == 'zstd' and _zstd() is None:
+        return 'zlib'
+    return codec
+
+
+def _compressor(codec, level):
+    if codec == 'zlib':
+        return zlib.compressobj(level)
+    if codec == 'lzma':
+        return lzma.LZMACompressor(preset=level)
+    if codec == 'zstd':
+        return _zstd().ZstdCompressor(level=level).compressobj()
+    raise ValueError(f"Unknown compression codec '{codec}'")
+
+
+def _decompressor(codec):
+    if codec == 'zlib':
+        return zlib.decompressobj()
+    if codec == 'lzma':
+        return lzma.LZMADecompressor()
+    if codec == 'zstd':
+        return _zstd().ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unknown compression codec '{codec}'")
+
+
+def shannon_entropy(data):
+    """Bits of entropy per byte of data (0 to 8)."""
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(count / total * math.log2(count / total) for count in Counter(data).values())
+
+
+def looks_compressible(uploaded_file, config):
+    """Cheap checks on the declared content type and a sample of the bytes."""
+    content_type = (getattr(uploaded_file, 'content_type', None) or '').lower()
+    if any(content_type.startswith(prefix) for prefix in config['SKIP_CONTENT_TYPES']):
+        return False
+    if uploaded_file.size is not None and uploaded_file.size < config['MIN_SIZE']:
+        return False
+    uploaded_file.seek(0)
+    sample = uploaded_file.read(config['SAMPLE_SIZE'])
+    uploaded_file.seek(0)
+    return shannon_entropy(sample) <= config['MAX_ENTROPY']
+
+
+def compress_stream(fileobj, codec, level=None, chunk_size=1024 * 1024):
+    """Compress a file-like object chunk by chunk. Returns the compressed bytes."""
+    compressor = _compressor(codec, DEFAULT_LEVELS[codec] if level is None else level)
+    parts = []
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        parts.append(compressor.compress(chunk))
+    parts.append(compressor.flush())
+    return b''.join(parts)
+
+
+def decompress_data(data, codec):
+    """Reverse compress_stream. An empty codec returns data unchanged."""
+    if not codec:
+        return data
+    decompressor = _decompressor(codec)
+    result = decompressor.decompress(data)
+    if codec == 'zlib':
+        result += decompressor.flush()
+    return result
+
+
+def compress_upload(uploaded_file):
+    """
+    Compress an upload with the configured codec if it is worth it.
+    Returns (data, codec); codec is '' and data is None when the upload
+    should be stored as is.
+    """
+    config = get_compression_settings()
+    codec = available_codec(config['CODEC'])
+    if not codec or not looks_compressible(uploaded_file, config):
+        return None, ''
+    uploaded_file.seek(0)
+    data = compress_stream(uploaded_file, codec, config['LEVEL'], config['CHUNK_SIZE'])
+    uploaded_file.seek(0)
+    if len(data) > uploaded_file.size * (1 - config['MIN_SAVING']):
+        return None, ''
+    return data, codec
@@ -0,0 +1,126 @@
+"""
+Background removal of vault blobs (see collect_garbage command).
+
+Deleting a VaultFile only sets its deleted_at tombstone, so requests return
+without touching storage. The collector later deletes the blobs of
+tombstones older than a grace period in batches and then the rows
+themselves. Expired shares are tombstoned first, so they take the same
+path. The orphan scan walks the storage for blobs no row refers to:
+leftovers of CASCADE deletes, replaced uploads and failed requests.
+"""
+from datetime import timedelta
+
+from django.core.files.storage import storages
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import VaultFile, get_vault_storage
+
+# Directories get_upload_path writes to
+VAULT_UPLOAD_DIRS = ('secure_vault_files', 'sharedfiles')
+
+
+def sweep_expired_shares(batch_size=500):
+    """
+    Tombstone files whose share has expired, walking the partial
+    vaultfile_expiring_idx in (expires_at, id) keyset order; each batch is
+    its own short transaction. Returns the number of files tombstoned.
+    """
+    now = timezone.now()
+    swept = 0
+    last = None
+    while True:
+        expiring = VaultFile.objects.filter(expires_at__lte=now)
+        if last:
+            expiring = expiring.filter(Q(expires_at__gt=last[0]) | Q(expires_at=last[0], id__gt=last[1]))
+        batch = list(expiring.order_by('expires_at', 'id').values_list('expires_at', 'id')[:batch_size])
+        if not batch:
+            return swept
+        swept += VaultFile.objects.filter(id__in=[file_id for _, file_id in batch]).delete()[0]
+        last = batch[-1]
+
+
+def collect_tombstones(grace_seconds=0, batch_size=200, on_batch=None):
+    """
+    Remove blobs and rows of files deleted more than grace_seconds ago.
+    Rows whose blob could not be deleted are kept for the next run.
+    Returns (collected, errors) where errors is a list of (id, message).
+    """
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    collected, errors = 0, []
+    last_id = 0
+    while True:
+        files = list(
+            VaultFile.all_objects.filter(id__gt=last_id, deleted_at__lte=cutoff)
+            .only('id', 'uploaded_file', 'storage_alias')
+            .order_by('id')[:batch_size]
+        )
+        if not files:
+            return collected, errors
+        removed = []
+        for vault_file in files:
+            try:
+                if vault_file.uploaded_file:
+                    vault_file.uploaded_file.storage.delete(vault_file.uploaded_file.name)
+                removed.append(vault_file.id)
+            except Exception as e:
+                errors.append((vault_file.id, str(e)))
+        VaultFile.all_objects.filter(id__in=removed, deleted_at__isnull=False).hard_delete()
+        collected += len(removed)
+        last_id = files[-1].id
+        if on_batch:
+            on_batch(last_id, len(removed), len(files) - len(removed))
+
+
+def iter_storage_files(storage, path=''):
+    """Every file name below path, walking storage.listdir recursively."""
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield f'{path}/{name}' if path else name
+    for directory in directories:
+        yield from iter_storage_files(storage, f'{path}/{directory}' if path else directory)
+
+
+def _referenced(names):
+    # Any row, on any storage and including tombstones, keeps a name alive
+    return set(VaultFile.all_objects.filter(uploaded_file__in=names).values_list('uploaded_file', flat=True))
+
+
+def find_orphans(storage_alias='', min_age_seconds=3600, batch_size=500):
+    """
+    Yield names of blobs in the vault upload directories of storage_alias
+    ('' for the storage new uploads go to) that no VaultFile refers to. Blobs
+    younger than min_age_seconds are skipped, as their row may not be
+    committed yet.
+    """
+    storage = storages[storage_alias] if storage_alias else get_vault_storage()
+    cutoff = timezone.now() - timedelta(seconds=min_age_seconds)
+
+    def orphans_in(batch):
+        referenced = _referenced(batch)
+        for name in batch:
+            if name not in referenced and storage.get_modified_time(name) <= cutoff:
+                yield name
+
+    batch = []
+    for directory in VAULT_UPLOAD_DIRS:
+        for name in iter_storage_files(storage, directory):
+            batch.append(name)
+            if len(batch) >= batch_size:
+                yield from orphans_in(batch)
+                batch = []
+    if batch:
+        yield from orphans_in(batch)
+
+
+def delete_orphans(storage_alias='', min_age_seconds=3600, batch_size=500, dry_run=False):
+    """Delete (or with dry_run only list) orphaned blobs. Returns their names."""
+    storage = storages[storage_alias] if storage_alias else get_vault_storage()
+    orphans = list(find_orphans(storage_alias, min_age_seconds, batch_size))
+    if not dry_run:
+        for name in orphans:
+            storage.delete(name)
+    return orphans
@@ -0,0 +1,254 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .merkle import hash_chunks, leaf_hash, merkle_root
+from .models import VaultFile, JobCheckpoint
+from .utils import sha256_stream
+
+SCRUB_CHECKPOINT = 'integrity-scrub'
+
+
+class ChunkVerificationError(Exception):
+    """Raised when a stored chunk does not match its Merkle leaf hash."""
+
+    def __init__(self, index):
+        super().__init__(f"Chunk {index} failed integrity verification")
+        self.index = index
+
+
+def file_hash_fields(fileobj):
+    """
+    blockchain_hash and, unless VAULT_MERKLE_CHUNK_SIZE is 0, the Merkle
+    chunk tree fields for the content of fileobj, from a single read.
+    """
+    chunk_size = getattr(settings, 'VAULT_MERKLE_CHUNK_SIZE', 0)
+    if not chunk_size:
+        return {
+            'blockchain_hash': sha256_stream(fileobj),
+            'merkle_chunk_size': None,
+            'merkle_root': None,
+            'chunk_hashes': None,
+        }
+    digest, leaves = hash_chunks(fileobj, chunk_size)
+    return {
+        'blockchain_hash': digest,
+        'merkle_chunk_size': chunk_size,
+        'merkle_root': merkle_root(leaves).hex(),
+        'chunk_hashes': ''.join(leaf.hex() for leaf in leaves),
+    }
+
+
+class StreamHasher:
+    """
+    Incremental form of file_hash_fields: feed the content with update() in
+    pieces of any size, then fields() returns the same hash fields.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = getattr(settings, 'VAULT_MERKLE_CHUNK_SIZE', 0) if chunk_size is None else chunk_size
+        self.reset()
+
+    def reset(self):
+        self.digest = hashlib.sha256()
+        self.leaves = []
+        self.pending = bytearray()
+
+    def update(self, data):
+        self.digest.update(data)
+        if not self.chunk_size:
+            return
+        view = memoryview(data)
+        if self.pending:
+            missing = self.chunk_size - len(self.pending)
+            self.pending += view[:missing]
+            view = view[missing:]
+            if len(self.pending) < self.chunk_size:
+                return
+            self.leaves.append(leaf_hash(bytes(self.pending)))
+            self.pending.clear()
+        while len(view) >= self.chunk_size:
+            self.leaves.append(leaf_hash(bytes(view[:self.chunk_size])))
+            view = view[self.chunk_size:]
+        self.pending += view
+
+    def fields(self):
+        if not self.chunk_size:
+            return {
+                'blockchain_hash': self.digest.hexdigest(),
+                'merkle_chunk_size': None,
+                'merkle_root': None,
+                'chunk_hashes': None,
+            }
+        leaves = self.leaves + [leaf_hash(bytes(self.pending))] if self.pending else self.leaves
+        return {
+            'blockchain_hash': self.digest.hexdigest(),
+            'merkle_chunk_size': self.chunk_size,
+            'merkle_root': merkle_root(leaves).hex(),
+            'chunk_hashes': ''.join(leaf.hex() for leaf in leaves),
+        }
+
+
+class HashingFile(File):
+    """
+    Wraps an upload so the bytes a storage backend reads while saving it are
+    fed to a StreamHasher: the blob is written and hashed in one pass.
+    Rewinding to the start (storages do before writing) restarts the hash.
+    """
+
+    def __init__(self, file, hasher):
+        super().__init__(file, getattr(file, 'name', None))
+        self.hasher = hasher
+        self.content_type = getattr(file, 'content_type', None)
+
+    def read(self, *args):
+        data = self.file.read(*args)
+        self.hasher.update(data)
+        return data
+
+    def seek(self, offset, whence=0):
+        if offset == 0 and whence == 0:
+            self.hasher.reset()
+        return self.file.seek(offset, whence)
+
+
+def record_file_hashes(vault_file, fileobj):
+    """
+    Set the hash fields of vault_file from fileobj (see file_hash_fields).
+    Does not save the instance. A changed hash drops the file out of its
+    anchor batch so it is re-anchored with the new content.
+    """
+    for field, value in hash_field_changes(vault_file, file_hash_fields(fileobj)).items():
+        setattr(vault_file, field, value)
+
+
+def hash_field_changes(vault_file, fields):
+    """
+    fields (from file_hash_fields or StreamHasher.fields) plus the anchor
+    fields to clear when blockchain_hash changes.
+    """
+    changes = dict(fields)
+    if changes['blockchain_hash'] != vault_file.blockchain_hash:
+        changes.update(anchor_batch=None, anchor_index=None, anchor_proof=None)
+    return changes
+
+
+def has_chunk_tree(vault_file):
+    return bool(vault_file.merkle_chunk_size and vault_file.merkle_root and vault_file.chunk_hashes is not None)
+
+
+def chunk_tree_is_consistent(vault_file):
+    """Check the stored leaf hashes still reduce to the stored merkle_root."""
+    return merkle_root(vault_file.get_chunk_hashes()).hex() == vault_file.merkle_root
+
+
+def iter_chunks(vault_file, first=0, last=None):
+    """
+    Yield (index, data, valid) for chunks first..last (inclusive, or to the
+    end of the file when last is None) of the stored file, reading only
+    those chunks. valid is None when the file has no chunk tree.
+    """
+    leaves = vault_file.get_chunk_hashes() if has_chunk_tree(vault_file) else None
+    chunk_size = vault_file.merkle_chunk_size or 1024 * 1024
+    with vault_file.uploaded_file.storage.open(vault_file.uploaded_file.name, 'rb') as f:
+        if first:
+            f.seek(first * chunk_size)
+        index = first
+        while last is None or index <= last:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            if leaves is None:
+                valid = None
+            else:
+                valid = index < len(leaves) and leaf_hash(data) == leaves[index]
+            yield index, data, valid
+            index += 1
+
+
+def iter_verified_chunks(vault_file):
+    """
+    Stream the stored file chunk by chunk, raising ChunkVerificationError
+    as soon as a chunk does not match the tree.
+    """
+    expected = len(vault_file.get_chunk_hashes()) if has_chunk_tree(vault_file) else None
+    served = 0
+    for index, data, valid in iter_chunks(vault_file):
+        if valid is False:
+            raise ChunkVerificationError(index)
+        served += 1
+        yield data
+    if expected is not None and served != expected:
+        raise ChunkVerificationError(served)
+
+
+def verify_vault_file(vault_file, limiter=None, chunk_size=1024 * 1024):
+    """
+    Re-hash the stored file and compare it with blockchain_hash.
+    Returns one of the VERIFICATION_STATUS_CHOICES values.
+    Only touches storage, never the database, so it is safe to run in a
+    worker thread.
+    """
+    if not vault_file.blockchain_hash:
+        return 'unhashed'
+    name = vault_file.uploaded_file.name
+    storage = vault_file.uploaded_file.storage
+    try:
+        if not name or not storage.exists(name):
+            return 'missing'
+        with storage.open(name, 'rb') as f:
+            digest = sha256_stream(f, chunk_size=chunk_size, limiter=limiter)
+    except Exception as e:
+        # Any backend failure (filesystem, GridFS, S3, ...) fails this file
+        # only, not the whole pass
+        print(f"Integrity check failed to read {name}: {type(e).__name__}: {e}")
+        return 'error'
+    return 'ok' if digest == vault_file.blockchain_hash else 'mismatch'
+
+
+def scrub_batch(files, executor, limiter=None):
+    """
+    Verify a batch of VaultFile rows concurrently and persist the results
+    with a single bulk_update. Returns a {status: count} summary.
+    """
+    statuses = executor.map(lambda vf: verify_vault_file(vf, limiter), files)
+    now = timezone.now()
+    summary = {}
+    for vault_file, result in zip(files, statuses):
+        vault_file.verification_status = result
+        vault_file.last_verified_at = now
+        summary[result] = summary.get(result, 0) + 1
+    VaultFile.objects.bulk_update(files, ['verification_status', 'last_verified_at'])
+    return summary
+
+
+def scrub_pass(batch_size=200, workers=4, limiter=None, on_batch=None):
+    """
+    Walk VaultFile rows in primary-key order, resuming from the stored
+    checkpoint. The checkpoint is advanced after every batch and reset to
+    zero once the pass reaches the end of the table.
+    """
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name=SCRUB_CHECKPOINT)
+    totals = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            files = list(
+                VaultFile.objects.filter(id__gt=checkpoint.last_id)
+                .only('id', 'uploaded_file', 'storage_alias', 'blockchain_hash', 'receiving_user_id')
+                .order_by('id')[:batch_size]
+            )
+            if not files:
+                break
+            summary = scrub_batch(files, executor, limiter)
+            for result, count in summary.items():
+                totals[result] = totals.get(result, 0) + count
+            checkpoint.last_id = files[-1].id
+            checkpoint.save(update_fields=['last_id', 'updated_at'])
+            if on_batch:
+                on_batch(checkpoint.last_id, summary)
+    checkpoint.last_id = 0
+    checkpoint.save(update_fields=['last_id', 'updated_at'])
+    return totals
@@ -0,0 +1,124 @@
+"""
+Read-only fast path for file listings.
+
+Produces exactly what VaultFileSerializer(many=True) does for listings, but
+from a .values_list() projection: no model instances, no FieldFile or
+storage calls per row and no per-field serializer dispatch. File URLs are
+built from an absolute prefix computed once per storage backend.
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import connections
+from django.db.models import TextField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import VaultFile
+from .storage import GridFSStorage
+
+LISTING_FIELDS = (
+    'id', 'uploaded_file', 'storage_alias', 'uploaded_at', 'blockchain_hash',
+    'user_id', 'receiving_user_id', 'aes_key', 'encrypted_fernet_key',
+    'expires_at', 'max_downloads', 'download_count', 'client_encrypted',
+)
+DATETIME_FIELDS = ('uploaded_at', 'expires_at')
+
+# Characters filepath_to_uri would percent-encode
+URL_UNSAFE = re.compile(r"[^A-Za-z0-9_.\-~/!*()']")
+
+
+def _url_builder(storage, request):
+    """Function mapping a stored name to the absolute URL the serializer would return."""
+    absolute = request.build_absolute_uri if request is not None else (lambda url: url)
+    if isinstance(storage, FileSystemStorage):
+        prefix = absolute(storage.url(''))
+
+        def build_url(name):
+            # Stored names are normally URL-safe already (get_valid_filename);
+            # otherwise quote like django.utils.encoding.filepath_to_uri
+            if URL_UNSAFE.search(name):
+                name = quote(name.replace('\\', '/'), safe="/~!*()'")
+            return prefix + name.lstrip('/')
+        return build_url
+    if isinstance(storage, GridFSStorage):
+        prefix = absolute(storage.url(''))
+        return lambda name: prefix + name
+    # Any other backend (e.g. signed S3 URLs) is asked per row
+    return lambda name: absolute(storage.url(name))
+
+
+def _datetime_formatter():
+    """
+    Same output as DRF's DateTimeField with the default ISO 8601 format, for
+    values straight from the database cursor (SQLite returns naive UTC text).
+    """
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def format_datetime(value):
+        if isinstance(value, str):
+            # Naive UTC text from SQLite
+            value = datetime.fromisoformat(value + '+00:00' if tz else value)
+        if tz is None:
+            return value.isoformat()
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=dt_timezone.utc)
+        text = value.astimezone(tz).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return format_datetime
+
+
+def listing_rows(queryset):
+    """Rows of the LISTING_FIELDS projection as the cursor returns them (no converters)."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        # Fetch timestamps as text; the sqlite3 module would otherwise run
+        # Django's Python-level timestamp converter on every row
+        fields = [f'{name}_text' if name in DATETIME_FIELDS else name for name in LISTING_FIELDS]
+        queryset = queryset.annotate(**{f'{name}_text': Cast(name, TextField()) for name in DATETIME_FIELDS})
+    else:
+        fields = LISTING_FIELDS
+    sql, params = queryset.values_list(*fields).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(2000):
+            yield from rows
+
+
+def serialize_file_listing(queryset, request=None):
+    """List of dicts for queryset, identical to VaultFileSerializer(queryset, many=True).data."""
+    return serialize_listing_rows(listing_rows(queryset), request)
+
+
+def serialize_listing_rows(rows, request=None):
+    """Listing dicts for rows fetched with listing_rows."""
+    default_storage = VaultFile._meta.get_field('uploaded_file').storage
+    url_builders = {}
+    format_datetime = _datetime_formatter()
+    data = []
+    append = data.append
+    for (pk, name, alias, uploaded_at, blockchain_hash,
+         user_id, receiving_user_id, aes_key, encrypted_fernet_key,
+         expires_at, max_downloads, download_count, client_encrypted) in rows:
+        build_url = url_builders.get(alias)
+        if build_url is None:
+            build_url = url_builders[alias] = _url_builder(storages[alias] if alias else default_storage, request)
+        append({
+            'id': pk,
+            'uploaded_file': build_url(name) if name else None,
+            'file_name': name.rpartition('/')[2],
+            'uploaded_at': format_datetime(uploaded_at) if uploaded_at else None,
+            'blockchain_hash': blockchain_hash,
+            'user': user_id,
+            'receiving_user': receiving_user_id,
+            'aes_key': aes_key,
+            'encrypted_fernet_key': encrypted_fernet_key,
+            'expires_at': format_datetime(expires_at) if expires_at else None,
+            'max_downloads': max_downloads,
+            'download_count': download_count,
+            'client_encrypted': bool(client_encrypted),
+        })
+    return data
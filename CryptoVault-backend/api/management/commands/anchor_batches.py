@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.anchoring import build_anchor_batch
+
+
+class Command(BaseCommand):
+    help = "Build Merkle anchor batches over the blockchain_hash of newly uploaded files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-leaves', type=int, default=10000,
+                            help="Maximum number of files per batch (default: 10000)")
+        parser.add_argument('--daemon', action='store_true',
+                            help="Keep building batches every --interval seconds")
+        parser.add_argument('--interval', type=int, default=300,
+                            help="Seconds between batching rounds in daemon mode (default: 300)")
+
+    def handle(self, *args, **options):
+        while True:
+            # Drain everything pending, one batch at a time
+            while True:
+                batch = build_anchor_batch(max_leaves=options['max_leaves'])
+                if batch is None:
+                    break
+                self.stdout.write(self.style.SUCCESS(
+                    f"Batch {batch.pk}: {batch.leaf_count} files, root {batch.merkle_root}"
+                ))
+            if not options['daemon']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.admin import VaultFileAdmin
+from api.models import VaultFile
+
+
+class PlainVaultFileAdmin(admin.ModelAdmin):
+    """VaultFileAdmin as it was before the large-table settings."""
+    list_display = VaultFileAdmin.list_display
+
+
+class Command(BaseCommand):
+    help = (
+        "Time VaultFile admin changelist pages against generated rows, with "
+        "the plain ModelAdmin settings and with VaultFileAdmin. Runs in a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000,
+                            help="Number of files to generate (default: 200000)")
+        parser.add_argument('--users', type=int, default=100,
+                            help="Number of owners the files are spread over (default: 100)")
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        with transaction.atomic():
+            superuser = self.seed(options['rows'], options['users'])
+            year = timezone.localtime(timezone.now()).year
+            pages = [
+                ('first page', {}),
+                ('page 100', {'p': '100'}),
+                ('search', {'q': 'report_4242'}),
+                ('username', {'q': 'bench-admin-7'}),
+                ('year', {'uploaded_at__year': str(year)}),
+            ]
+            site = admin.AdminSite(name='admin')
+            for label, model_admin in [('plain', PlainVaultFileAdmin(VaultFile, site)),
+                                       ('tuned', VaultFileAdmin(VaultFile, site))]:
+                for page, params in pages:
+                    request = factory.get('/admin/api/vaultfile/', params)
+                    request.user = superuser
+                    connection.queries_log.clear()
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        model_admin.changelist_view(request).render()
+                        elapsed = time.perf_counter() - started
+                    self.stdout.write(f"{label:>5} {page:<11} {elapsed * 1000:9.1f} ms  {len(queries):4d} queries")
+            transaction.set_rollback(True)
+
+    def seed(self, rows, users):
+        User = get_user_model()
+        owners = User.objects.bulk_create([User(username=f'bench-admin-{i}') for i in range(users)])
+        superuser = User.objects.create(username='bench-admin-superuser', is_staff=True, is_superuser=True)
+        now = timezone.now()
+        batch = []
+        for i in range(rows):
+            batch.append(VaultFile(
+                user=owners[i % users],
+                receiving_user=owners[(i + 1) % users] if i % 3 == 0 else None,
+                uploaded_file=f'secure_vault_files/report_{i}.pdf',
+                file_name=f'report_{i}.pdf',
+                uploaded_at=now - timedelta(minutes=i),
+                blockchain_hash='f' * 64,
+            ))
+            if len(batch) == 5000:
+                VaultFile.objects.bulk_create(batch)
+                batch = []
+        VaultFile.objects.bulk_create(batch)
+        # Planner statistics, as a production database would have them
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return superuser
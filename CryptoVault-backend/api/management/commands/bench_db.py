@@ -0,0 +1,154 @@
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+SCHEMA = [
+    "CREATE TABLE bench_usage (user_id INTEGER PRIMARY KEY, bytes INTEGER NOT NULL)",
+    "CREATE TABLE bench_file (id INTEGER PRIMARY KEY, user_id INTEGER, name TEXT, size INTEGER, hash TEXT)",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent write throughput of plain SQLite (no pragmas, a "
+        "connection per request) with the tuned SQLITE_OPTIONS profile "
+        "(WAL, IMMEDIATE transactions, persistent connections)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8,
+                            help="Concurrent writer threads (default: 8)")
+        parser.add_argument('--readers', type=int, default=4,
+                            help="Concurrent listing reader threads (default: 4)")
+        parser.add_argument('--writes', type=int, default=200,
+                            help="Upload-like transactions per writer (default: 200)")
+
+    def profiles(self, directory):
+        return {
+            'plain': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'plain.sqlite3'),
+                'CONN_MAX_AGE': 0,
+            },
+            'tuned': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'tuned.sqlite3'),
+                'OPTIONS': settings.SQLITE_OPTIONS,
+                'CONN_MAX_AGE': None,
+            },
+        }
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='bench_db_')
+        try:
+            results = {}
+            for name, config in self.profiles(directory).items():
+                alias = f'bench_{name}'
+                connections.settings[alias] = connections.configure_settings({'default': config})['default']
+                results[name] = self.run_profile(alias, options)
+                connections[alias].close()
+                del connections.settings[alias]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:>6}: {result['throughput']:8.1f} writes/s, "
+                f"p50 {result['p50']:6.1f} ms, p95 {result['p95']:7.1f} ms, "
+                f"{result['locked']} 'database is locked' errors, {result['reads']} listing reads"
+            )
+        if results['plain']['throughput']:
+            speedup = results['tuned']['throughput'] / results['plain']['throughput']
+            self.stdout.write(self.style.SUCCESS(f"Tuned profile: {speedup:.1f}x write throughput"))
+
+    def run_profile(self, alias, options):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            cursor.executemany(
+                "INSERT INTO bench_usage (user_id, bytes) VALUES (%s, 0)",
+                [(user_id,) for user_id in range(options['writers'])],
+            )
+        connection.close()
+
+        latencies, locked = [], [0]
+        reads = [0]
+        lock = threading.Lock()
+        done = threading.Event()
+        persistent = connection.settings_dict['CONN_MAX_AGE'] != 0
+
+        def upload(user_id, number):
+            # Same shape as an upload: quota read, INSERT, counter UPDATE
+            with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                cursor.execute("SELECT bytes FROM bench_usage WHERE user_id = %s", [user_id])
+                cursor.fetchone()
+                cursor.execute(
+                    "INSERT INTO bench_file (user_id, name, size, hash) VALUES (%s, %s, %s, %s)",
+                    [user_id, f'file-{number}', 1024, 'f' * 64],
+                )
+                cursor.execute("UPDATE bench_usage SET bytes = bytes + 1024 WHERE user_id = %s", [user_id])
+
+        def writer(user_id):
+            mine = []
+            for number in range(options['writes']):
+                started = time.perf_counter()
+                try:
+                    upload(user_id, number)
+                    mine.append((time.perf_counter() - started) * 1000)
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    with lock:
+                        locked[0] += 1
+                if not persistent:
+                    connections[alias].close()
+            connections[alias].close()
+            with lock:
+                latencies.extend(mine)
+
+        def reader():
+            count = 0
+            while not done.is_set():
+                try:
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute("SELECT id, name, size FROM bench_file ORDER BY id DESC LIMIT 50")
+                        cursor.fetchall()
+                    count += 1
+                except OperationalError:
+                    pass
+                if not persistent:
+                    connections[alias].close()
+            connections[alias].close()
+            with lock:
+                reads[0] += count
+
+        readers = [threading.Thread(target=reader) for _ in range(options['readers'])]
+        writers = [threading.Thread(target=writer, args=(user_id,)) for user_id in range(options['writers'])]
+        for thread in readers:
+            thread.start()
+        started = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        latencies.sort()
+        return {
+            'throughput': len(latencies) / elapsed if elapsed else 0,
+            'p50': statistics.median(latencies) if latencies else 0,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else 0,
+            'locked': locked[0],
+            'reads': reads[0],
+        }
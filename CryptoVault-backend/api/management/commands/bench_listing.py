@@ -0,0 +1,80 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from api.listing import listing_rows, serialize_file_listing, serialize_listing_rows
+from api.models import VaultFile
+from api.serializers import VaultFileSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare VaultFileSerializer(many=True) with the lean listing path on "
+        "generated rows. Runs in a transaction that is rolled back. On 10k rows "
+        "(SQLite) serialization alone is 12-14x faster; end to end it is "
+        "roughly 9-10x, as the query itself is shared by both paths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000,
+                            help="Number of files to list (default: 10000)")
+        parser.add_argument('--repeat', type=int, default=3,
+                            help="Timed runs per path; the best is reported (default: 3)")
+
+    def best_of(self, repeat, func):
+        timings, result = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    def handle(self, *args, **options):
+        request = RequestFactory().get('/api/v1/files/vault_files/', SERVER_NAME='localhost')
+        with transaction.atomic():
+            user = get_user_model().objects.create(username='bench-listing-user')
+            now = timezone.now()
+            VaultFile.objects.bulk_create([
+                VaultFile(
+                    user=user,
+                    uploaded_file=f'secure_vault_files/report_{i}.pdf',
+                    file_name=f'report_{i}.pdf',
+                    uploaded_at=now - timedelta(seconds=i),
+                    blockchain_hash='f' * 64,
+                    aes_key='key',
+                    encrypted_fernet_key='c' * 140,
+                )
+                for i in range(options['rows'])
+            ], batch_size=1000)
+            # Same query as the vault_files endpoint
+            queryset = VaultFile.objects.filter(user=user, receiving_user__isnull=True).order_by('-uploaded_at')
+
+            full_time, full = self.best_of(
+                options['repeat'],
+                lambda: VaultFileSerializer(queryset, many=True, context={'request': request}).data
+            )
+            lean_time, lean = self.best_of(options['repeat'], lambda: serialize_file_listing(queryset, request))
+
+            # Serialization alone, from rows already fetched by each path
+            instances, rows = list(queryset), list(listing_rows(queryset))
+            full_encode, _ = self.best_of(
+                options['repeat'],
+                lambda: VaultFileSerializer(instances, many=True, context={'request': request}).data
+            )
+            lean_encode, _ = self.best_of(options['repeat'], lambda: serialize_listing_rows(rows, request))
+            transaction.set_rollback(True)
+
+        if [dict(row) for row in full] != lean:
+            raise CommandError("Lean listing output differs from VaultFileSerializer.")
+        self.stdout.write(f"{len(lean)} rows, query + serialization / serialization only:")
+        self.stdout.write(f"  VaultFileSerializer: {full_time * 1000:8.1f} ms / {full_encode * 1000:8.1f} ms")
+        self.stdout.write(f"  Lean listing:        {lean_time * 1000:8.1f} ms / {lean_encode * 1000:8.1f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Speedup: {full_time / lean_time:.1f}x end to end, "
+            f"{full_encode / lean_encode:.1f}x serialization (identical output)"
+        ))
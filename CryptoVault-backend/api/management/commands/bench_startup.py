@@ -0,0 +1,40 @@
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.startup import measure_startup, slowest_modules
+
+
+class Command(BaseCommand):
+    help = "Measure worker cold-start time (django.setup + WSGI app + URLconf) with python -X importtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help="Fresh interpreters to start; the median is reported (default: 5)")
+        parser.add_argument('--top', type=int, default=15,
+                            help="Number of slowest modules to list (default: 15)")
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative',
+                            help="Rank modules by cumulative or self import time")
+        parser.add_argument('--budget', type=float, default=settings.STARTUP_IMPORT_BUDGET_MS,
+                            help="Fail if the median start-up exceeds this many milliseconds")
+
+    def handle(self, *args, **options):
+        runs = [measure_startup() for _ in range(max(options['runs'], 1))]
+        totals = sorted(run['total_ms'] for run in runs)
+        median = statistics.median(totals)
+        # Module list of the run closest to the median
+        modules = min(runs, key=lambda run: abs(run['total_ms'] - median))['modules']
+
+        self.stdout.write(f"Start-up over {len(runs)} run(s): median {median:.1f} ms "
+                          f"(min {totals[0]:.1f}, max {totals[-1]:.1f}), {len(modules)} modules imported")
+        self.stdout.write(f"Slowest modules by {options['sort']} import time:")
+        for name, self_us, cumulative_us in slowest_modules(modules, options['top'], options['sort']):
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms cumulative  {self_us / 1000:7.1f} ms self  {name}")
+
+        eager = sorted({name for run in runs for name in run['eager']})
+        if eager:
+            self.stdout.write(self.style.WARNING(f"Optional subsystems imported at start-up: {', '.join(eager)}"))
+        if options['budget'] and median > options['budget']:
+            raise CommandError(f"Median start-up {median:.1f} ms exceeds the {options['budget']:.0f} ms budget.")
+        self.stdout.write(self.style.SUCCESS(f"Within the {options['budget']:.0f} ms budget."))
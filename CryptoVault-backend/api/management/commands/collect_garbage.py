@@ -0,0 +1,69 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.garbage import collect_tombstones, delete_orphans, sweep_expired_shares
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired shares and remove blobs of deleted vault files and, "
+        "optionally, blobs no VaultFile refers to."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=settings.VAULT_DELETE_GRACE_SECONDS,
+                            help="Only collect files deleted at least this many seconds ago")
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Tombstones collected per batch (default: 200)")
+        parser.add_argument('--orphans', action='store_true',
+                            help="Also scan the storage for blobs without a VaultFile row")
+        parser.add_argument('--storage', default='',
+                            help="STORAGES alias to scan for orphans (default: the vault storage)")
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help="Ignore orphan candidates younger than this many seconds (default: 3600)")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="List orphaned blobs instead of deleting them")
+        parser.add_argument('--daemon', action='store_true',
+                            help="Keep collecting every --interval seconds")
+        parser.add_argument('--interval', type=int, default=300,
+                            help="Seconds between runs in daemon mode (default: 300)")
+
+    def handle(self, *args, **options):
+        if options['storage'] and options['storage'] not in settings.STORAGES:
+            raise CommandError(f"Unknown storage alias '{options['storage']}'.")
+
+        def report(last_id, collected, failed):
+            self.stdout.write(f"  up to id {last_id}: {collected} collected, {failed} failed")
+
+        while True:
+            expired = sweep_expired_shares(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Expired {expired} shared file(s)."))
+
+            collected, errors = collect_tombstones(
+                grace_seconds=options['grace'],
+                batch_size=options['batch_size'],
+                on_batch=report if options['verbosity'] > 1 else None,
+            )
+            for file_id, message in errors:
+                self.stdout.write(self.style.WARNING(f"  file {file_id}: {message}"))
+            self.stdout.write(self.style.SUCCESS(f"Collected {collected} deleted file(s), {len(errors)} failed."))
+
+            if options['orphans']:
+                orphans = delete_orphans(
+                    options['storage'],
+                    min_age_seconds=options['min_age'],
+                    dry_run=options['dry_run'],
+                )
+                for name in orphans:
+                    self.stdout.write(f"  orphan: {name}")
+                verb = "Found" if options['dry_run'] else "Deleted"
+                self.stdout.write(self.style.SUCCESS(f"{verb} {len(orphans)} orphaned blob(s)."))
+
+            if not options['daemon']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,43 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from api.export import EXPORTS, EXPORT_FORMATS, iter_export
+from api.models import VaultFile
+
+
+class Command(BaseCommand):
+    help = "Stream VaultFile or CloudUploadLog metadata as NDJSON or CSV (e.g. for compliance exports)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS),
+                            help="What to export")
+        parser.add_argument('--fmt', choices=list(EXPORT_FORMATS), default='ndjson',
+                            help="Output format (default: ndjson)")
+        parser.add_argument('--output', '-o', default='-',
+                            help="File to write to (default: stdout)")
+        parser.add_argument('--user', default=None,
+                            help="Only export rows of this username")
+
+    def handle(self, *args, **options):
+        model, fields = EXPORTS[options['kind']]
+        queryset = model.objects.all()
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Unknown user '{options['user']}'.")
+            if model is VaultFile:
+                queryset = queryset.filter(Q(user=user) | Q(receiving_user=user))
+            else:
+                queryset = queryset.filter(user=user)
+
+        out = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='', encoding='utf-8')
+        try:
+            for chunk in iter_export(queryset, fields, options['fmt']):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
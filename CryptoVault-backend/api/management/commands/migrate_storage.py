@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.blob_migration import checkpoint_name, migrate_storage
+from api.models import JobCheckpoint
+from api.utils import BandwidthLimiter
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy vault files from one storage backend to another (any alias in "
+        "settings.STORAGES), verifying blockchain_hash before switching rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', dest='target', required=True,
+                            help="Target STORAGES alias, e.g. 'gridfs'")
+        parser.add_argument('--from', dest='source', default='default',
+                            help="Migrate rows stored under this alias (default: 'default', i.e. MEDIA_ROOT)")
+        parser.add_argument('--workers', type=int, default=8,
+                            help="Number of copy threads (default: 8)")
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Rows copied and switched per batch (default: 100)")
+        parser.add_argument('--max-mbps', type=float, default=0,
+                            help="Bandwidth limit for verification reads in MB/s, 0 for unlimited")
+        parser.add_argument('--delete-source', action='store_true',
+                            help="Delete the source blob once its row has been switched")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the saved checkpoint and start from the first row")
+
+    def handle(self, *args, **options):
+        source, target = options['source'], options['target']
+        for alias in (source, target):
+            if alias not in settings.STORAGES:
+                raise CommandError(f"Unknown storage alias '{alias}'. Configure it in settings.STORAGES.")
+        if source == target:
+            raise CommandError("--from and --to must differ.")
+        if target != settings.VAULT_STORAGE_ALIAS:
+            self.stdout.write(self.style.WARNING(
+                f"New uploads still go to '{settings.VAULT_STORAGE_ALIAS}'; set VAULT_STORAGE_ALIAS={target} "
+                "so no rows are left behind."
+            ))
+        if options['restart']:
+            JobCheckpoint.objects.filter(name=checkpoint_name(source, target)).delete()
+
+        def report(last_id, migrated, errors):
+            self.stdout.write(f"  up to id {last_id}: {migrated} migrated, {len(errors)} failed")
+
+        migrated, errors = migrate_storage(
+            source,
+            target,
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            delete_source=options['delete_source'],
+            limiter=BandwidthLimiter(int(options['max_mbps'] * 1024 * 1024)),
+            on_batch=report,
+        )
+        for file_id, message in errors:
+            self.stdout.write(self.style.WARNING(f"  file {file_id}: {message}"))
+        self.stdout.write(self.style.SUCCESS(f"Migrated {migrated} file(s) to '{target}', {len(errors)} failed."))
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from api.usage import backfill_file_sizes, reconcile_users
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-user storage usage counters from the VaultFile and CloudUploadLog tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Users recomputed per batch (default: 500)")
+        parser.add_argument('--skip-backfill', action='store_true',
+                            help="Do not fill in missing VaultFile.file_size values first")
+
+    def handle(self, *args, **options):
+        if not options['skip_backfill']:
+            filled = backfill_file_sizes(options['batch_size'])
+            self.stdout.write(f"Backfilled file_size for {filled} file(s).")
+
+        last_id = 0
+        reconciled = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not user_ids:
+                break
+            reconcile_users(user_ids)
+            reconciled += len(user_ids)
+            last_id = user_ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Reconciled storage usage for {reconciled} user(s)."))
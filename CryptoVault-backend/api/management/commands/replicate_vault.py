@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.replication import S3Replicator, get_replication_settings, replicate_pass
+
+
+class Command(BaseCommand):
+    help = "Mirror encrypted vault files to the S3-compatible endpoint in settings.VAULT_REPLICATION."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Files uploaded concurrently (default: 4)")
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help="Files fetched per batch (default: 50)")
+        parser.add_argument('--daemon', action='store_true',
+                            help="Keep mirroring new files every --interval seconds")
+        parser.add_argument('--interval', type=int, default=60,
+                            help="Seconds between passes in daemon mode (default: 60)")
+
+    def handle(self, *args, **options):
+        if not get_replication_settings()['ENABLED']:
+            raise CommandError("Replication is disabled. Set VAULT_REPLICATION['ENABLED'] (VAULT_REPLICATION=1).")
+        replicator = S3Replicator()
+
+        def report(last_id, done, failed):
+            self.stdout.write(f"  up to id {last_id}: {done} mirrored, {failed} failed")
+
+        try:
+            while True:
+                replicated, errors = replicate_pass(
+                    replicator,
+                    batch_size=options['batch_size'],
+                    workers=options['workers'],
+                    on_batch=report if options['verbosity'] > 1 else None,
+                )
+                for file_id, message in errors:
+                    self.stdout.write(self.style.WARNING(f"  file {file_id}: {message}"))
+                self.stdout.write(self.style.SUCCESS(f"Mirrored {replicated} file(s), {len(errors)} failed."))
+                if not options['daemon']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            replicator.close()
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.integrity import scrub_pass, SCRUB_CHECKPOINT
+from api.models import JobCheckpoint
+from api.utils import BandwidthLimiter
+
+
+class Command(BaseCommand):
+    help = "Re-verify blockchain_hash of stored vault files against their contents on disk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help="Rows fetched per keyset batch (default: 200)")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Number of hashing threads (default: 4)")
+        parser.add_argument('--max-mbps', type=float, default=0,
+                            help="Aggregate read bandwidth limit in MB/s, 0 for unlimited")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the saved checkpoint and start from the first row")
+        parser.add_argument('--daemon', action='store_true',
+                            help="Keep scrubbing, starting a new pass every --interval seconds")
+        parser.add_argument('--interval', type=int, default=3600,
+                            help="Seconds to sleep between passes in daemon mode (default: 3600)")
+
+    def handle(self, *args, **options):
+        if options['restart']:
+            JobCheckpoint.objects.filter(name=SCRUB_CHECKPOINT).update(last_id=0)
+        limiter = BandwidthLimiter(int(options['max_mbps'] * 1024 * 1024))
+
+        def report(last_id, summary):
+            self.stdout.write(f"  up to id {last_id}: {summary}")
+
+        while True:
+            started = time.monotonic()
+            totals = scrub_pass(
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                limiter=limiter,
+                on_batch=report if options['verbosity'] > 1 else None,
+            )
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(f"Scrub pass finished in {elapsed:.1f}s: {totals}"))
+            failed = sum(count for result, count in totals.items() if result in ('mismatch', 'missing', 'error'))
+            if failed:
+                self.stdout.write(self.style.WARNING(f"{failed} file(s) failed verification"))
+            if not options['daemon']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,92 @@
+"""
+Binary Merkle tree helpers shared by per-file chunk trees and batched
+anchoring.
+
+Leaves and interior nodes are domain separated (RFC 6962 style) so a leaf
+can never be passed off as an interior node. When a level has an odd number
+of nodes the last one is promoted unchanged to the next level. Roots are
+SHA-256 hex digests, the same format as VaultFile.blockchain_hash, so they
+can be anchored the same way.
+"""
+import hashlib
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(leaves):
+    """
+    Build every level of the tree, leaves first and root last.
+    An empty tree has the hash of an empty leaf as its root.
+    """
+    level = list(leaves) or [leaf_hash(b'')]
+    levels = [level]
+    while len(level) > 1:
+        level = [
+            node_hash(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+            for i in range(0, len(level), 2)
+        ]
+        levels.append(level)
+    return levels
+
+
+def merkle_root(leaves) -> bytes:
+    return build_levels(leaves)[-1][0]
+
+
+def inclusion_proof(levels, index):
+    """
+    Sibling path for the leaf at index, bottom-up, as (side, hash) pairs
+    where side says whether the sibling sits to the 'left' or 'right'.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(('left' if sibling < index else 'right', level[sibling]))
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf: bytes, proof, root: bytes) -> bool:
+    """Check an inclusion proof in O(log n) hashes."""
+    node = leaf
+    for side, sibling in proof:
+        node = node_hash(sibling, node) if side == 'left' else node_hash(node, sibling)
+    return node == root
+
+
+def encode_proof(proof) -> list:
+    """JSON-friendly form of an inclusion proof."""
+    return [{'side': side, 'hash': sibling.hex()} for side, sibling in proof]
+
+
+def decode_proof(data) -> list:
+    return [(item['side'], bytes.fromhex(item['hash'])) for item in data]
+
+
+def hash_chunks(fileobj, chunk_size: int, limiter=None):
+    """
+    Read a file-like object once and return (sha256_hex, leaves), where
+    sha256_hex is the plain digest of the whole content (blockchain_hash)
+    and leaves are the Merkle leaf hashes of each chunk_size chunk.
+    """
+    digest = hashlib.sha256()
+    leaves = []
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        if limiter:
+            limiter.consume(len(chunk))
+        digest.update(chunk)
+        leaves.append(leaf_hash(chunk))
+    return digest.hexdigest(), leaves
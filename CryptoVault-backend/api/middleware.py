@@ -0,0 +1,211 @@
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+# Defaults for settings.REQUEST_PROFILING; any key can be overridden there
+PROFILING_DEFAULTS = {
+    'ENABLED': False,
+    # Fraction of requests (0.0 - 1.0) profiled without being asked to
+    'SAMPLE_RATE': 0.0,
+    # Header that forces profiling of a single request (staff users only)
+    'HEADER': 'X-Profile-Request',
+    # Where per-endpoint .prof / .folded / .json files are written
+    'OUTPUT_DIR': None,
+    # Stack sampling interval used for the collapsed (flame graph) output
+    'SAMPLE_INTERVAL': 0.001,
+    # Number of slowest SQL statements kept in the summary
+    'TOP_QUERIES': 10,
+}
+
+
+def get_profiling_settings():
+    """Merge settings.REQUEST_PROFILING over PROFILING_DEFAULTS."""
+    config = dict(PROFILING_DEFAULTS)
+    config.update(getattr(settings, 'REQUEST_PROFILING', {}) or {})
+    if not config['OUTPUT_DIR']:
+        config['OUTPUT_DIR'] = os.path.join(settings.BASE_DIR, 'profiles')
+    return config
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that counts SQL statements and their time.
+    Works without DEBUG=True, unlike connection.queries.
+    """
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total_time += duration
+            self.slowest.append((duration, sql))
+            if len(self.slowest) > self.keep * 4:
+                self.slowest.sort(reverse=True)
+                del self.slowest[self.keep:]
+
+    def summary(self):
+        self.slowest.sort(reverse=True)
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_time * 1000, 3),
+            'slowest': [
+                {'ms': round(duration * 1000, 3), 'sql': sql}
+                for duration, sql in self.slowest[:self.keep]
+            ],
+        }
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the stack of one thread at a fixed interval and aggregates the
+    result as collapsed stacks ("a;b;c count"), the input format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='request-profiler-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class RequestProfilingMiddleware:
+    """
+    Profiles a sampled fraction of requests, or any request carrying the
+    profiling header from a staff user, with cProfile plus a stack sampler.
+
+    For each profiled request three files are written under
+    OUTPUT_DIR/<endpoint>/: a .prof file for pstats/snakeviz, a .folded
+    file with collapsed stacks for flame graphs and a .json summary with the
+    SQL query count and time. When REQUEST_PROFILING['ENABLED'] is false the
+    middleware removes itself from the chain at startup.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_profiling_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed('Request profiling is disabled.')
+        self.sample_rate = float(self.config['SAMPLE_RATE'])
+        self.header_key = 'HTTP_' + self.config['HEADER'].upper().replace('-', '_')
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        return self.profile(request)
+
+    def should_profile(self, request):
+        if self.header_key in request.META:
+            return self.is_staff_request(request)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def is_staff_request(self, request):
+        """
+        Staff check that works for both session and JWT authenticated
+        requests; DRF only authenticates JWT inside the view, so we do it here.
+        """
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.is_staff
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except Exception:
+            return False
+        return bool(result and result[0].is_staff)
+
+    def profile(self, request):
+        recorder = QueryRecorder(int(self.config['TOP_QUERIES']))
+        sampler = StackSampler(threading.get_ident(), float(self.config['SAMPLE_INTERVAL']))
+        profiler = cProfile.Profile()
+
+        wrappers = [conn.execute_wrapper(recorder) for conn in connections.all()]
+        for wrapper in wrappers:
+            wrapper.__enter__()
+        sampler.start()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            for wrapper in reversed(wrappers):
+                wrapper.__exit__(None, None, None)
+
+        try:
+            profile_id = self.write_results(request, response, profiler, sampler, recorder, elapsed)
+            response['X-Profile-Id'] = profile_id
+        except OSError as e:
+            print(f"Request profiling output failed: {e}")
+        response['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={recorder.total_time * 1000:.1f}'
+        )
+        return response
+
+    def endpoint_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        name = (match.view_name if match and match.view_name else request.path) or 'root'
+        return re.sub(r'[^A-Za-z0-9_.-]+', '_', f"{request.method}_{name}").strip('_')
+
+    def write_results(self, request, response, profiler, sampler, recorder, elapsed):
+        endpoint = self.endpoint_name(request)
+        directory = os.path.join(self.config['OUTPUT_DIR'], endpoint)
+        os.makedirs(directory, exist_ok=True)
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{random.randrange(16 ** 6):06x}"
+        base = os.path.join(directory, profile_id)
+
+        profiler.dump_stats(base + '.prof')
+        with open(base + '.folded', 'w') as f:
+            f.write(sampler.collapsed())
+        with open(base + '.json', 'w') as f:
+            json.dump({
+                'endpoint': endpoint,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'wall_ms': round(elapsed * 1000, 3),
+                'samples': sum(sampler.stacks.values()),
+                'queries': recorder.summary(),
+            }, f, indent=2)
+        return f"{endpoint}/{profile_id}"
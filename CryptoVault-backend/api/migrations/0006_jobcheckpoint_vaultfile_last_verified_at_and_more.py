@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_clouduploadlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='last_verified_at',
+            field=models.DateTimeField(blank=True, help_text='When blockchain_hash was last re-checked against the stored file', null=True),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='verification_status',
+            field=models.CharField(blank=True, choices=[('ok', 'Verified'), ('mismatch', 'Hash mismatch'), ('missing', 'File missing'), ('unhashed', 'No hash recorded'), ('error', 'Read error')], default='', help_text='Result of the last integrity check', max_length=16),
+        ),
+    ]
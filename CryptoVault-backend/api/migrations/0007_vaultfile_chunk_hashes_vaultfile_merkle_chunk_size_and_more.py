@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_jobcheckpoint_vaultfile_last_verified_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaultfile',
+            name='chunk_hashes',
+            field=models.TextField(blank=True, help_text='Concatenated hex Merkle leaf hashes, one per chunk', null=True),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='merkle_chunk_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Chunk size in bytes used for chunk_hashes', null=True),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='merkle_root',
+            field=models.CharField(blank=True, help_text='Merkle root over chunk_hashes (hex SHA-256)', max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_vaultfile_chunk_hashes_vaultfile_merkle_chunk_size_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnchorBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merkle_root', models.CharField(help_text="Merkle root over the batch's file hashes (hex SHA-256)", max_length=64)),
+                ('leaf_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('anchored_at', models.DateTimeField(blank=True, help_text='When the root was published by the anchor publisher', null=True)),
+                ('anchor_reference', models.CharField(blank=True, help_text='Reference returned by the anchor publisher (e.g. transaction id)', max_length=255, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='anchor_index',
+            field=models.PositiveIntegerField(blank=True, help_text='Leaf position of this file in its anchor batch', null=True),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='anchor_proof',
+            field=models.JSONField(blank=True, help_text='Inclusion proof of blockchain_hash in the anchor batch root', null=True),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='anchor_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='files', to='api.anchorbatch'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:22
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_anchorbatch_vaultfile_anchor_index_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vaultfile',
+            name='uploaded_file',
+            field=models.FileField(storage=api.models.get_vault_storage, upload_to=api.models.get_upload_path),
+        ),
+    ]
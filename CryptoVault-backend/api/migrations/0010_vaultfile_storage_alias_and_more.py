@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:23
+
+import api.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_alter_vaultfile_uploaded_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaultfile',
+            name='storage_alias',
+            field=models.CharField(blank=True, default='', help_text='STORAGES alias holding uploaded_file; blank for the default vault storage', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='vaultfile',
+            name='uploaded_file',
+            field=api.models.VaultFileField(storage=api.models.get_vault_storage, upload_to=api.models.get_upload_path),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_vaultfile_storage_alias_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clouduploadlog',
+            name='vault_file',
+            field=models.ForeignKey(blank=True, help_text='Vault file this upload mirrors, for server-side replication', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='replicas', to='api.vaultfile'),
+        ),
+    ]
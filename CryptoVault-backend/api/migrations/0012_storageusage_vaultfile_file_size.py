@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_clouduploadlog_vault_file'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='storage_usage', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('vault_bytes', models.BigIntegerField(default=0)),
+                ('vault_files', models.BigIntegerField(default=0)),
+                ('shared_out_bytes', models.BigIntegerField(default=0)),
+                ('shared_out_files', models.BigIntegerField(default=0)),
+                ('shared_in_bytes', models.BigIntegerField(default=0)),
+                ('shared_in_files', models.BigIntegerField(default=0)),
+                ('cloud_bytes', models.BigIntegerField(default=0)),
+                ('cloud_files', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, help_text='Size in bytes of the stored (possibly encrypted) file', null=True),
+        ),
+    ]
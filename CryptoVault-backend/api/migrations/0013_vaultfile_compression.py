@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_storageusage_vaultfile_file_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaultfile',
+            name='compression_codec',
+            field=models.CharField(blank=True, default='', help_text='Codec the plaintext was compressed with before encryption; blank for none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='original_size',
+            field=models.BigIntegerField(blank=True, help_text='Size in bytes of the uploaded plaintext', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_vaultfile_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaultfile',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When the file was deleted (tombstone awaiting blob collection)', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_vaultfile_deleted_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vaultfile',
+            index=models.Index(fields=['user', 'receiving_user', '-uploaded_at'], name='vaultfile_owner_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaultfile',
+            index=models.Index(fields=['receiving_user', '-uploaded_at'], name='vaultfile_received_recent_idx'),
+        ),
+    ]
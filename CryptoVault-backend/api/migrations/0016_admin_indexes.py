@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_vaultfile_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clouduploadlog',
+            index=models.Index(fields=['user', '-uploaded_at'], name='cloudupload_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clouduploadlog',
+            index=models.Index(fields=['uploaded_at'], name='cloudupload_uploaded_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clouduploadlog',
+            index=models.Index(fields=['s3_key'], name='cloudupload_s3_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaultfile',
+            index=models.Index(fields=['uploaded_at'], name='vaultfile_uploaded_at_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_admin_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='vaultfile',
+            name='vaultfile_owner_recent_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='vaultfile',
+            name='vaultfile_received_recent_idx',
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='download_count',
+            field=models.PositiveIntegerField(default=0, help_text='Downloads by the recipient so far'),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='When the share expires and the file is removed; blank to keep it', null=True),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='max_downloads',
+            field=models.PositiveIntegerField(blank=True, help_text='Downloads by the recipient after which the share expires; blank for no limit', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='vaultfile',
+            index=models.Index(fields=['user', 'receiving_user', '-uploaded_at', 'expires_at'], name='vaultfile_owner_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaultfile',
+            index=models.Index(fields=['receiving_user', '-uploaded_at', 'expires_at'], name='vaultfile_received_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaultfile',
+            index=models.Index(condition=models.Q(('expires_at__isnull', False)), fields=['expires_at', 'id'], name='vaultfile_expiring_idx'),
+        ),
+    ]
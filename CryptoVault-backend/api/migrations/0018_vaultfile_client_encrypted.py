@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_vaultfile_expiry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaultfile',
+            name='client_encrypted',
+            field=models.BooleanField(default=False, help_text="Encrypted by the client; encrypted_fernet_key holds the client's wrapped key"),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:21
+
+import api.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_storage_alias(apps, schema_editor):
+    # A blank alias used to mean "the storage uploads currently go to", so
+    # these rows are on the backend configured when this migration runs:
+    # 'default' (MEDIA_ROOT) unless the deployment stored blobs in GridFS
+    VaultFile = apps.get_model('api', 'VaultFile')
+    alias = getattr(settings, 'VAULT_STORAGE_ALIAS', 'default')
+    VaultFile._base_manager.filter(storage_alias='').update(storage_alias=alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_vaultfile_client_encrypted'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_storage_alias, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='vaultfile',
+            name='storage_alias',
+            field=models.CharField(default=api.models.vault_storage_alias, help_text='STORAGES alias holding uploaded_file', max_length=50),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_vaultfile_storage_alias_backfill'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaultfile',
+            name='replication_attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Failed replication attempts so far'),
+        ),
+        migrations.AddField(
+            model_name='vaultfile',
+            name='replication_retry_at',
+            field=models.DateTimeField(blank=True, help_text='Earliest time a failed replication is retried', null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+def mark_replicas(apps, schema_editor):
+    # Only replicate_vault linked log rows to a vault file so far; run
+    # reconcile_usage afterwards to drop them from the cloud counters
+    CloudUploadLog = apps.get_model('api', 'CloudUploadLog')
+    CloudUploadLog.objects.filter(vault_file__isnull=False).update(replica=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_vaultfile_replication_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clouduploadlog',
+            name='replica',
+            field=models.BooleanField(default=False, help_text="Created by server-side replication; not counted in the owner's cloud usage"),
+        ),
+        migrations.RunPython(mark_replicas, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.core.files.storage import storages
+from django.db.models.fields.files import FieldFile
 from django.utils import timezone
-import os
+
+from .date_hierarchy import IndexedDateHierarchyMixin
 
 User = get_user_model()
 
@@ -19,13 +23,151 @@ def get_upload_path(instance, filename):
 
     return f'secure_vault_files/{filename}'
 
+
+def get_vault_storage():
+    """Storage new vault blobs are written to: STORAGES[VAULT_STORAGE_ALIAS]."""
+    return storages[vault_storage_alias()]
+
+
+def vault_storage_alias():
+    """Default VaultFile.storage_alias: the alias new uploads are written to."""
+    return getattr(settings, 'VAULT_STORAGE_ALIAS', 'default')
+
+
+VERIFICATION_STATUS_CHOICES = [
+    ('ok', 'Verified'),
+    ('mismatch', 'Hash mismatch'),
+    ('missing', 'File missing'),
+    ('unhashed', 'No hash recorded'),
+    ('error', 'Read error'),
+]
+
+# Expiry of a share belongs to its receiver; cleared whenever the receiver changes
+SHARE_EXPIRY_RESET = {'expires_at': None, 'max_downloads': None, 'download_count': 0}
+
+
+class VaultFileQuerySet(models.QuerySet):
+    """
+    Deleting vault files only tombstones them (sets deleted_at); their blobs
+    are removed later by the collect_garbage command.
+    """
+
+    def alive(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def tombstoned(self):
+        return self.filter(deleted_at__isnull=False)
+
+    def unexpired(self):
+        """Files without an expiry or whose share has not expired yet."""
+        return self.filter(models.Q(expires_at__isnull=True) | models.Q(expires_at__gt=timezone.now()))
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+    def delete(self):
+        from .usage import apply_deltas, merge_deltas, vault_file_deltas
+
+        with transaction.atomic():
+            rows = list(
+                self.alive().select_for_update()
+                .values_list('id', 'user_id', 'receiving_user_id', 'file_size')
+            )
+            self.model._base_manager.filter(id__in=[row[0] for row in rows]).update(deleted_at=timezone.now())
+            apply_deltas(merge_deltas(*(vault_file_deltas(*row[1:], sign=-1) for row in rows)))
+        return len(rows), {self.model._meta.label: len(rows)}
+
+    delete.alters_data = True
+
+    def hard_delete(self):
+        """Delete the rows for real (their blobs are left to the caller)."""
+        return super().delete()
+
+    hard_delete.alters_data = True
+
+
+class VaultFileManager(models.Manager.from_queryset(VaultFileQuerySet)):
+    """Default manager: hides tombstoned files."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class IndexedDateVaultFileQuerySet(IndexedDateHierarchyMixin, VaultFileQuerySet):
+    pass
+
+
+class IndexedDateQuerySet(IndexedDateHierarchyMixin, models.QuerySet):
+    pass
+
+
+class VaultFieldFile(FieldFile):
+    """
+    FieldFile whose storage follows the row's storage_alias, so rows can
+    live on different backends while a vault is being migrated.
+    """
+
+    @property
+    def storage(self):
+        # Rows predating recorded aliases are backfilled by migration 0019;
+        # a blank alias is never resolved to the current upload storage
+        return storages[getattr(self.instance, 'storage_alias', '') or 'default']
+
+    @storage.setter
+    def storage(self, value):
+        # FieldFile assigns field.storage on init/unpickle; resolved per row instead
+        pass
+
+
+class VaultFileField(models.FileField):
+    attr_class = VaultFieldFile
+
+
+class AnchorBatch(models.Model):
+    """
+    Merkle tree over the blockchain_hash of a batch of VaultFiles. Anchoring
+    the root covers every file in the batch; each file keeps its own
+    inclusion proof.
+    """
+    merkle_root = models.CharField(max_length=64, help_text="Merkle root over the batch's file hashes (hex SHA-256)")
+    leaf_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+    anchored_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the root was published by the anchor publisher"
+    )
+    anchor_reference = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text="Reference returned by the anchor publisher (e.g. transaction id)"
+    )
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Batch {self.pk} ({self.leaf_count} files)"
+
+
 class VaultFile(models.Model):
     """
     Model to store uploaded files along with user association and blockchain hash for verification.
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_files')
     # File storage path - uses get_upload_path to determine location
-    uploaded_file = models.FileField(upload_to=get_upload_path)
+    uploaded_file = VaultFileField(upload_to=get_upload_path, storage=get_vault_storage)
+    file_size = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Size in bytes of the stored (possibly encrypted) file"
+    )
+    storage_alias = models.CharField(
+        max_length=50,
+        default=vault_storage_alias,
+        help_text="STORAGES alias holding uploaded_file"
+    )
     file_name = models.CharField(max_length=255)
     blockchain_hash = models.CharField(
         max_length=255,
@@ -54,14 +196,164 @@ class VaultFile(models.Model):
         null=True,
         help_text="Fernet key encrypted with AES key (base64 encoded)"
     )
+    # Uploaded already encrypted by the client; stored and served as-is
+    client_encrypted = models.BooleanField(
+        default=False,
+        help_text="Encrypted by the client; encrypted_fernet_key holds the client's wrapped key"
+    )
+    # Set when the file is deleted; the blob is removed by collect_garbage
+    deleted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="When the file was deleted (tombstone awaiting blob collection)"
+    )
+    # Optional expiry of shared files; expired shares are tombstoned by collect_garbage
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the share expires and the file is removed; blank to keep it"
+    )
+    max_downloads = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Downloads by the recipient after which the share expires; blank for no limit"
+    )
+    download_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Downloads by the recipient so far"
+    )
+    # Compression applied before encryption (see api/compression.py)
+    compression_codec = models.CharField(
+        max_length=10,
+        blank=True,
+        default='',
+        help_text="Codec the plaintext was compressed with before encryption; blank for none"
+    )
+    original_size = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Size in bytes of the uploaded plaintext"
+    )
+    # Integrity scrubber results (see scrub_integrity management command)
+    last_verified_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When blockchain_hash was last re-checked against the stored file"
+    )
+    verification_status = models.CharField(
+        max_length=16,
+        blank=True,
+        default='',
+        choices=VERIFICATION_STATUS_CHOICES,
+        help_text="Result of the last integrity check"
+    )
+    # Failed S3 mirror attempts (see replicate_vault command); the file is
+    # skipped until replication_retry_at and given up after MAX_FILE_ATTEMPTS
+    replication_attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Failed replication attempts so far"
+    )
+    replication_retry_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Earliest time a failed replication is retried"
+    )
+    # Optional Merkle tree over fixed-size chunks of the stored file, so byte
+    # ranges can be verified without reading the whole file
+    merkle_chunk_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Chunk size in bytes used for chunk_hashes"
+    )
+    merkle_root = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="Merkle root over chunk_hashes (hex SHA-256)"
+    )
+    chunk_hashes = models.TextField(
+        null=True,
+        blank=True,
+        help_text="Concatenated hex Merkle leaf hashes, one per chunk"
+    )
+    # Batched anchoring (see anchor_batches management command)
+    anchor_batch = models.ForeignKey(
+        AnchorBatch,
+        on_delete=models.SET_NULL,
+        related_name='files',
+        null=True,
+        blank=True
+    )
+    anchor_index = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Leaf position of this file in its anchor batch"
+    )
+    anchor_proof = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Inclusion proof of blockchain_hash in the anchor batch root"
+    )
+
+    objects = VaultFileManager()
+    all_objects = models.Manager.from_queryset(VaultFileQuerySet)()
+    # Admin changelist: live files, date hierarchy read from the index
+    changelist_objects = VaultFileManager.from_queryset(IndexedDateVaultFileQuerySet)()
+
+    class Meta:
+        indexes = [
+            # Listing endpoints: personal vault / sent files, newest first;
+            # expires_at lets the expiry filter run on the index entries
+            models.Index(fields=['user', 'receiving_user', '-uploaded_at', 'expires_at'], name='vaultfile_owner_recent_idx'),
+            # Files received by a user, newest first
+            models.Index(fields=['receiving_user', '-uploaded_at', 'expires_at'], name='vaultfile_received_recent_idx'),
+            # Expired share sweep, in (expires_at, id) keyset order
+            models.Index(
+                fields=['expires_at', 'id'],
+                name='vaultfile_expiring_idx',
+                condition=models.Q(expires_at__isnull=False),
+            ),
+            # Admin date hierarchy and date ranges over all users
+            models.Index(fields=['uploaded_at'], name='vaultfile_uploaded_at_idx'),
+        ]
 
     def __str__(self):
         return self.file_name
 
+    def get_chunk_hashes(self):
+        """Leaf hashes of the chunk tree as a list of bytes ([] if there is no tree)."""
+        if not self.chunk_hashes:
+            return []
+        return [bytes.fromhex(self.chunk_hashes[i:i + 64]) for i in range(0, len(self.chunk_hashes), 64)]
+
+    def record_download(self):
+        """
+        Count a download by the recipient. Returns False once max_downloads
+        is used up; the last allowed download also expires the share.
+        """
+        downloads = VaultFile.objects.filter(pk=self.pk)
+        if self.max_downloads is None:
+            return bool(downloads.update(download_count=models.F('download_count') + 1))
+        return bool(downloads.filter(download_count__lt=models.F('max_downloads')).update(
+            download_count=models.F('download_count') + 1,
+            expires_at=models.Case(
+                models.When(download_count__gte=models.F('max_downloads') - 1, then=models.Value(timezone.now())),
+                default=models.F('expires_at'),
+            ),
+        ))
+
     def delete(self, *args, **kwargs):
-        if self.uploaded_file and os.path.isfile(self.uploaded_file.path):
-            os.remove(self.uploaded_file.path)
-        super().delete(*args, **kwargs)
+        """Tombstone the file; the row and blob are removed by collect_garbage."""
+        result = VaultFile.all_objects.filter(pk=self.pk).delete()
+        self.deleted_at = timezone.now()
+        return result
+
+    def hard_delete(self):
+        """Remove the blob and the row right away."""
+        if self.uploaded_file:
+            self.uploaded_file.delete(save=False)
+        return super().delete()
 
 
 class CloudUploadLog(models.Model):
@@ -75,11 +367,82 @@ class CloudUploadLog(models.Model):
     file_size = models.BigIntegerField(null=True, blank=True, help_text="File size in bytes")
     content_type = models.CharField(max_length=255, null=True, blank=True)
     uploaded_at = models.DateTimeField(default=timezone.now)
+    # Set for server-side mirrors of vault files (see replicate_vault command)
+    vault_file = models.ForeignKey(
+        VaultFile,
+        on_delete=models.SET_NULL,
+        related_name='replicas',
+        null=True,
+        blank=True,
+        help_text="Vault file this upload mirrors, for server-side replication"
+    )
+    # Mirrors are server copies, not user uploads: they never count as cloud usage
+    replica = models.BooleanField(
+        default=False,
+        help_text="Created by server-side replication; not counted in the owner's cloud usage"
+    )
+
+    objects = models.Manager()
+    # Admin changelist, date hierarchy read from the index
+    changelist_objects = IndexedDateQuerySet.as_manager()
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Per-user log listing, newest first
+            models.Index(fields=['user', '-uploaded_at'], name='cloudupload_user_recent_idx'),
+            # Admin date hierarchy and exact key search
+            models.Index(fields=['uploaded_at'], name='cloudupload_uploaded_at_idx'),
+            models.Index(fields=['s3_key'], name='cloudupload_s3_key_idx'),
+        ]
         verbose_name = "Cloud Upload Log"
         verbose_name_plural = "Cloud Upload Logs"
     
     def __str__(self):
-        return f"{self.user.username} - {self.file_name} ({self.uploaded_at})"
\ No newline at end of file
+        return f"{self.user.username} - {self.file_name} ({self.uploaded_at})"
+
+
+class JobCheckpoint(models.Model):
+    """
+    Keyset cursor for long-running maintenance commands, so an interrupted
+    run resumes after the last processed primary key.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+class StorageUsage(models.Model):
+    """
+    Per-user storage counters, updated in the same transaction as the rows
+    they count (see api/usage.py) and rebuilt by reconcile_usage.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='storage_usage')
+    # Personal vault files uploaded by the user
+    vault_bytes = models.BigIntegerField(default=0)
+    vault_files = models.BigIntegerField(default=0)
+    # Files the user shared with someone else
+    shared_out_bytes = models.BigIntegerField(default=0)
+    shared_out_files = models.BigIntegerField(default=0)
+    # Files other users shared with this user
+    shared_in_bytes = models.BigIntegerField(default=0)
+    shared_in_files = models.BigIntegerField(default=0)
+    # CloudUploadLog entries
+    cloud_bytes = models.BigIntegerField(default=0)
+    cloud_files = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def owned_bytes(self):
+        """Bytes stored on the server for files this user uploaded."""
+        return self.vault_bytes + self.shared_out_bytes
+
+    @property
+    def owned_files(self):
+        return self.vault_files + self.shared_out_files
+
+    def __str__(self):
+        return f"{self.user_id}: {self.owned_bytes} bytes"
@@ -0,0 +1,143 @@
+"""
+Bulk user provisioning (see the provision_users command and
+UserProvisionView).
+
+Creating users one by one through /auth/register/ pays for a password hash
+and a single-row INSERT per account. Here the rows are checked in one pass
+(field validation, one username lookup per chunk), the slow part - password
+validation and hashing - runs in a process pool, and the users are inserted
+with bulk_create in chunked transactions while the pool keeps hashing.
+Every row gets a result in input order, like the other bulk endpoints.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from .bulk import chunked
+from .serializers import UserProvisionSerializer
+
+PROVISION_CHUNK_SIZE = 500
+
+USERNAME_TAKEN = 'A user with that username already exists.'
+USERNAME_REPEATED = 'This username appears more than once in the import.'
+
+
+def _init_worker():
+    # Workers started with spawn/forkserver do not inherit the app registry
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_password(row):
+    """(True, hash) or (False, messages) for a (username, email, password) row."""
+    username, email, password = row
+    try:
+        validate_password(password, get_user_model()(username=username, email=email))
+    except ValidationError as exc:
+        return False, exc.messages
+    return True, make_password(password)
+
+
+def _check_rows(items):
+    """Split items into per-index errors and (index, username, email, password) candidates."""
+    User = get_user_model()
+    errors = {}
+    candidates = []
+    seen = set()
+    for index, item in enumerate(items):
+        serializer = UserProvisionSerializer(data=item)
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+            continue
+        data = serializer.validated_data
+        username = User.normalize_username(data['username'])
+        if username in seen:
+            errors[index] = {'username': [USERNAME_REPEATED]}
+            continue
+        seen.add(username)
+        candidates.append((index, username, User.objects.normalize_email(data['email']), data['password']))
+
+    taken = set()
+    for chunk in chunked([username for _, username, _, _ in candidates], PROVISION_CHUNK_SIZE):
+        taken.update(User.objects.filter(username__in=chunk).values_list('username', flat=True))
+    pending = []
+    for candidate in candidates:
+        if candidate[1] in taken:
+            errors[candidate[0]] = {'username': [USERNAME_TAKEN]}
+        else:
+            pending.append(candidate)
+    return errors, pending
+
+
+def _insert(batch, results):
+    """bulk_create one chunk; rows that lost a race to another insert are retried one by one."""
+    User = get_user_model()
+    users = [user for _, user in batch]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+    except IntegrityError:
+        for index, user in batch:
+            user.pk = None
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+            except IntegrityError:
+                results[index] = {'index': index, 'status': 'error', 'errors': {'username': [USERNAME_TAKEN]}}
+            else:
+                results[index] = {'index': index, 'status': 'created', 'id': user.pk}
+        return
+    for index, user in batch:
+        results[index] = {'index': index, 'status': 'created', 'id': user.pk}
+
+
+def provision_users(items, workers=None, chunk_size=PROVISION_CHUNK_SIZE, on_chunk=None):
+    """
+    Create a user for every valid row of items (dicts with username, email and
+    password). Returns one result per row in input order:
+    {'index', 'status': 'created', 'id'} or {'index', 'status': 'error', 'errors'}.
+    on_chunk(created, done, total) is called after each inserted chunk.
+    """
+    User = get_user_model()
+    if workers is None:
+        workers = settings.USER_PROVISION_WORKERS
+    errors, pending = _check_rows(items)
+    results = {
+        index: {'index': index, 'status': 'error', 'errors': row_errors}
+        for index, row_errors in errors.items()
+    }
+    rows = [(username, email, password) for _, username, email, password in pending]
+
+    executor = None
+    if workers > 1 and len(rows) > 1:
+        # Imported here: multiprocessing is not needed to serve requests
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(rows)), initializer=_init_worker)
+    try:
+        if executor is not None:
+            # Small tasks per worker round trip, but enough of them to keep every worker busy
+            hashed = executor.map(_hash_password, rows, chunksize=max(1, min(64, len(rows) // (workers * 4))))
+        else:
+            hashed = map(_hash_password, rows)
+        batch = []
+        created = 0
+        for done, ((index, username, email, _), (valid, value)) in enumerate(zip(pending, hashed), start=1):
+            if not valid:
+                results[index] = {'index': index, 'status': 'error', 'errors': {'password': value}}
+            else:
+                batch.append((index, User(username=username, email=email, password=value)))
+            if len(batch) == chunk_size or (done == len(pending) and batch):
+                _insert(batch, results)
+                created += sum(1 for row, _ in batch if results[row]['status'] == 'created')
+                batch = []
+                if on_chunk is not None:
+                    on_chunk(created, done, len(pending))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return [results[index] for index in sorted(results)]
@@ -0,0 +1,244 @@
+"""
+Server-side mirroring of vault ciphertext to an S3-compatible endpoint.
+
+Each file is pushed with a multipart upload whose parts are read from the
+vault storage and sent concurrently over a pooled boto3 client. Transient
+S3 errors are retried by botocore and aggregate throughput can be capped.
+Every mirrored file gets a CloudUploadLog row linked to its VaultFile and
+marked as a replica (not counted in the owner's cloud usage), and files
+without one are picked up by the next pass. Files that fail are retried
+with exponential backoff, up to MAX_FILE_ATTEMPTS times. boto3 is an
+optional dependency; it is only imported when replication actually runs.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import VaultFile, CloudUploadLog
+from .utils import BandwidthLimiter
+
+REPLICATION_DEFAULTS = {
+    'ENABLED': False,
+    # e.g. http://localhost:9000 for MinIO or a local moto_server
+    'ENDPOINT_URL': None,
+    'BUCKET': None,
+    'REGION': None,
+    'ACCESS_KEY_ID': None,
+    'SECRET_ACCESS_KEY': None,
+    'PREFIX': 'vault/',
+    # Base used for CloudUploadLog.s3_url; defaults to <endpoint>/<bucket>
+    'PUBLIC_URL_BASE': None,
+    'PART_SIZE': 8 * 1024 * 1024,
+    'PART_CONCURRENCY': 8,
+    'MAX_POOL_CONNECTIONS': 16,
+    'MAX_ATTEMPTS': 5,
+    # Per file: passes that may fail before the file is given up on, and
+    # the delay after the first failure (doubled after each further one)
+    'MAX_FILE_ATTEMPTS': 8,
+    'RETRY_BACKOFF': 60,
+    'MAX_MBPS': 0,
+}
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def get_replication_settings():
+    config = dict(REPLICATION_DEFAULTS)
+    config.update(getattr(settings, 'VAULT_REPLICATION', {}) or {})
+    return config
+
+
+class S3Replicator:
+    """
+    Pushes VaultFile blobs to S3. One instance owns a boto3 client (whose
+    connection pool is shared by all threads) and a part upload pool.
+    """
+
+    def __init__(self, config=None, client=None):
+        self.config = config or get_replication_settings()
+        if not self.config['BUCKET']:
+            raise ImproperlyConfigured("VAULT_REPLICATION['BUCKET'] must be set for replication.")
+        self.part_size = max(int(self.config['PART_SIZE']), MIN_PART_SIZE)
+        self.limiter = BandwidthLimiter(int(float(self.config['MAX_MBPS']) * 1024 * 1024))
+        self.client = client or self._make_client()
+        self.part_executor = ThreadPoolExecutor(
+            max_workers=int(self.config['PART_CONCURRENCY']),
+            thread_name_prefix='s3-part',
+        )
+
+    def _make_client(self):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise ImproperlyConfigured("boto3 is required for S3 replication (pip install boto3).")
+        return boto3.client(
+            's3',
+            endpoint_url=self.config['ENDPOINT_URL'],
+            region_name=self.config['REGION'],
+            aws_access_key_id=self.config['ACCESS_KEY_ID'],
+            aws_secret_access_key=self.config['SECRET_ACCESS_KEY'],
+            config=Config(
+                max_pool_connections=int(self.config['MAX_POOL_CONNECTIONS']),
+                retries={'max_attempts': int(self.config['MAX_ATTEMPTS']), 'mode': 'adaptive'},
+            ),
+        )
+
+    def close(self):
+        self.part_executor.shutdown(wait=True)
+
+    def object_key(self, vault_file):
+        return f"{self.config['PREFIX']}{vault_file.uploaded_file.name}"
+
+    def object_url(self, key):
+        base = self.config['PUBLIC_URL_BASE']
+        if not base:
+            endpoint = self.config['ENDPOINT_URL'] or f"https://s3.{self.config['REGION'] or 'us-east-1'}.amazonaws.com"
+            base = f"{endpoint.rstrip('/')}/{self.config['BUCKET']}"
+        return f"{base.rstrip('/')}/{key}"
+
+    def _read_part(self, vault_file, offset, length):
+        storage = vault_file.uploaded_file.storage
+        with storage.open(vault_file.uploaded_file.name, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        self.limiter.consume(len(data))
+        return data
+
+    def _upload_part(self, vault_file, key, upload_id, part_number, offset, length):
+        data = self._read_part(vault_file, offset, length)
+        result = self.client.upload_part(
+            Bucket=self.config['BUCKET'],
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        return {'PartNumber': part_number, 'ETag': result['ETag']}
+
+    def upload(self, vault_file):
+        """Push one file, returning (key, size). Raises on failure."""
+        bucket = self.config['BUCKET']
+        key = self.object_key(vault_file)
+        size = vault_file.uploaded_file.storage.size(vault_file.uploaded_file.name)
+        metadata = {'blockchain-hash': vault_file.blockchain_hash or ''}
+
+        if size <= self.part_size:
+            self.client.put_object(
+                Bucket=bucket,
+                Key=key,
+                Body=self._read_part(vault_file, 0, size),
+                Metadata=metadata,
+            )
+            return key, size
+
+        upload_id = self.client.create_multipart_upload(Bucket=bucket, Key=key, Metadata=metadata)['UploadId']
+        try:
+            futures = [
+                self.part_executor.submit(
+                    self._upload_part, vault_file, key, upload_id,
+                    number, offset, min(self.part_size, size - offset)
+                )
+                for number, offset in enumerate(range(0, size, self.part_size), start=1)
+            ]
+            parts = [future.result() for future in futures]
+            self.client.complete_multipart_upload(
+                Bucket=bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts},
+            )
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            raise
+        return key, size
+
+    def replicate(self, vault_file):
+        """
+        Upload one file and build (but do not save) its CloudUploadLog row.
+        Returns (log, error).
+        """
+        try:
+            key, size = self.upload(vault_file)
+        except Exception as e:
+            return None, str(e)
+        return CloudUploadLog(
+            user_id=vault_file.user_id,
+            vault_file=vault_file,
+            replica=True,
+            file_name=vault_file.file_name,
+            s3_key=key,
+            s3_url=self.object_url(key),
+            file_size=size,
+            content_type='application/octet-stream',
+        ), None
+
+
+# Longest wait between two attempts at the same file
+MAX_RETRY_DELAY = timedelta(days=1)
+
+
+def pending_replication(max_attempts=None):
+    """
+    Vault files that have no mirrored copy logged yet, leaving out failed
+    ones still backing off or out of attempts.
+    """
+    if max_attempts is None:
+        max_attempts = int(get_replication_settings()['MAX_FILE_ATTEMPTS'])
+    return (
+        VaultFile.objects.filter(replicas__isnull=True, replication_attempts__lt=max_attempts)
+        .filter(models.Q(replication_retry_at__isnull=True) | models.Q(replication_retry_at__lte=timezone.now()))
+        .exclude(uploaded_file='')
+        .only('id', 'user_id', 'file_name', 'uploaded_file', 'storage_alias', 'blockchain_hash', 'receiving_user_id',
+              'replication_attempts')
+        .order_by('id')
+    )
+
+
+def record_failures(files, backoff):
+    """Count a failed attempt on each file and schedule its next try."""
+    now = timezone.now()
+    for vault_file in files:
+        vault_file.replication_attempts += 1
+        delay = timedelta(seconds=backoff * 2 ** (vault_file.replication_attempts - 1))
+        vault_file.replication_retry_at = now + min(delay, MAX_RETRY_DELAY)
+    VaultFile.objects.bulk_update(files, ['replication_attempts', 'replication_retry_at'])
+
+
+def replicate_pass(replicator, batch_size=50, workers=4, on_batch=None):
+    """
+    Mirror every pending file once; failures are retried on a later pass
+    after a backoff. Files are uploaded `workers` at a time
+    (each with its own concurrent parts); log rows are written per batch
+    from the calling thread. Returns (replicated, errors).
+    """
+    replicated, errors = 0, []
+    last_id = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='s3-file') as executor:
+        while True:
+            files = list(
+                pending_replication(int(replicator.config['MAX_FILE_ATTEMPTS'])).filter(id__gt=last_id)[:batch_size]
+            )
+            if not files:
+                break
+            logs, failed = [], []
+            for vault_file, (log, error) in zip(files, executor.map(replicator.replicate, files)):
+                if error:
+                    errors.append((vault_file.id, error))
+                    failed.append(vault_file)
+                else:
+                    logs.append(log)
+            with transaction.atomic():
+                CloudUploadLog.objects.bulk_create(logs)
+                if failed:
+                    record_failures(failed, float(replicator.config['RETRY_BACKOFF']))
+            replicated += len(logs)
+            last_id = files[-1].id
+            if on_batch:
+                on_batch(last_id, len(logs), len(files) - len(logs))
+    return replicated, errors
@@ -0,0 +1,128 @@
+"""
+Server-side search and filtering of vault file listings.
+
+Substring search on file_name is backed by a database-specific index:
+SQLite gets an external content FTS5 table with the trigram tokenizer, kept
+in sync by triggers; PostgreSQL a pg_trgm GIN index matching the expression
+Django generates for icontains. The index is (re)created after every
+migrate, since SQLite table rebuilds during migrations drop triggers.
+Without it searches fall back to a plain LIKE scan.
+"""
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'api_vaultfile_fts'
+# The trigram tokenizer cannot match terms shorter than one trigram
+FTS_MIN_TERM_LENGTH = 3
+
+SQLITE_FTS_TABLE = f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        file_name, content='api_vaultfile', content_rowid='id', tokenize='trigram'
+    )
+"""
+SQLITE_FTS_TRIGGERS = {
+    'api_vaultfile_fts_ai': f"""
+        CREATE TRIGGER api_vaultfile_fts_ai AFTER INSERT ON api_vaultfile BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, file_name) VALUES (new.id, new.file_name);
+        END
+    """,
+    'api_vaultfile_fts_ad': f"""
+        CREATE TRIGGER api_vaultfile_fts_ad AFTER DELETE ON api_vaultfile BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, file_name) VALUES ('delete', old.id, old.file_name);
+        END
+    """,
+    'api_vaultfile_fts_au': f"""
+        CREATE TRIGGER api_vaultfile_fts_au AFTER UPDATE OF file_name ON api_vaultfile BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, file_name) VALUES ('delete', old.id, old.file_name);
+            INSERT INTO {FTS_TABLE}(rowid, file_name) VALUES (new.id, new.file_name);
+        END
+    """,
+}
+POSTGRES_TRGM_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS api_vaultfile_name_trgm ON api_vaultfile "
+    "USING gin (UPPER(file_name::text) gin_trgm_ops)",
+]
+
+_fts_tables = {}
+
+
+def _ensure_sqlite_fts(cursor):
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+        [f'{FTS_TABLE}%'],
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    missing = [name for name in SQLITE_FTS_TRIGGERS if name not in existing]
+    if FTS_TABLE in existing and not missing:
+        return
+    cursor.execute(SQLITE_FTS_TABLE)
+    for name in missing:
+        cursor.execute(SQLITE_FTS_TRIGGERS[name])
+    # Rows written while a trigger was missing are picked up by the rebuild
+    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def ensure_search_index(using='default'):
+    """Create the file name search index for the database if it is missing."""
+    connection = connections[using]
+    if 'api_vaultfile' not in connection.introspection.table_names():
+        return
+    try:
+        # Savepoint, so a database without FTS5/pg_trgm only loses the index
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                _ensure_sqlite_fts(cursor)
+            elif connection.vendor == 'postgresql':
+                for statement in POSTGRES_TRGM_INDEX:
+                    cursor.execute(statement)
+    except DatabaseError as e:
+        print(f"File name search index unavailable: {e}")
+    _fts_tables.pop(connection.settings_dict['NAME'], None)
+
+
+def create_search_index(sender, using='default', **kwargs):
+    """post_migrate receiver."""
+    ensure_search_index(using)
+
+
+def has_fts_table(using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return False
+    key = connection.settings_dict['NAME']
+    if key not in _fts_tables:
+        _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+def search_file_name(queryset, term):
+    """Files whose file_name contains term (case-insensitive)."""
+    if len(term) >= FTS_MIN_TERM_LENGTH and has_fts_table(queryset.db):
+        phrase = '"' + term.replace('"', '""') + '"'
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (phrase,)
+        ))
+    return queryset.filter(file_name__icontains=term)
+
+
+def filter_vault_files(queryset, params):
+    """Apply validated VaultFileFilterSerializer data to a VaultFile queryset."""
+    if params.get('q'):
+        queryset = search_file_name(queryset, params['q'])
+    if params.get('name_prefix'):
+        queryset = queryset.filter(file_name__istartswith=params['name_prefix'])
+    if 'uploaded_after' in params:
+        queryset = queryset.filter(uploaded_at__gte=params['uploaded_after'])
+    if 'uploaded_before' in params:
+        queryset = queryset.filter(uploaded_at__lt=params['uploaded_before'])
+    if params.get('sender'):
+        queryset = queryset.filter(user__username=params['sender'])
+    if params.get('recipient'):
+        queryset = queryset.filter(receiving_user__username=params['recipient'])
+    if 'encrypted' in params:
+        # Client-encrypted blobs count as encrypted whatever their wrapped key
+        unencrypted = Q(client_encrypted=False) & (Q(encrypted_fernet_key__isnull=True) | Q(encrypted_fernet_key=''))
+        queryset = queryset.exclude(unencrypted) if params['encrypted'] else queryset.filter(unencrypted)
+    return queryset
@@ -1,8 +1,12 @@
 from rest_framework import serializers
+from django.db import transaction
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.utils import timezone
 from os.path import basename
-from .models import VaultFile, CloudUploadLog
+from .models import VaultFile, CloudUploadLog, AnchorBatch
+from .usage import record_cloud_uploads
 
 class VaultFileSerializer(serializers.ModelSerializer):
     # Full file URL for download/view
@@ -18,8 +22,27 @@ class VaultFileSerializer(serializers.ModelSerializer):
         allow_null=True
     )
 
+    # Optional expiry of a share (see VaultFile.expires_at / max_downloads)
+    max_downloads = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
     def get_file_name(self, obj):
         return basename(obj.uploaded_file.name)
+
+    def validate_expires_at(self, value):
+        if value is not None and value <= timezone.now():
+            raise serializers.ValidationError("Expiry must be in the future.")
+        return value
+
+    def validate(self, attrs):
+        # Uploads check this in save_sealed_upload/save_passthrough_upload,
+        # where the receiver (possibly given by username) is known
+        if self.instance is not None:
+            receiving_user = attrs.get('receiving_user', self.instance.receiving_user_id)
+            if receiving_user is None and (attrs.get('expires_at') or attrs.get('max_downloads')):
+                raise serializers.ValidationError(
+                    {'expires_at': ["Only shared files (with a receiving user) can expire."]}
+                )
+        return attrs
     
     def create(self, validated_data):
         # Extract receiving_user if present (it's passed from perform_create)
@@ -38,8 +61,14 @@ class VaultFileSerializer(serializers.ModelSerializer):
     class Meta:
         model = VaultFile
         # Includes id, uploaded_file (actual file), file_name, uploaded_at, user, blockchain_hash, receiving_user, aes_key, encrypted_fernet_key
-        fields = ['id', 'uploaded_file', 'file_name', 'uploaded_at', 'blockchain_hash', 'user', 'receiving_user', 'aes_key', 'encrypted_fernet_key']
-        read_only_fields = ('uploaded_at', 'user', 'encrypted_fernet_key')
+        fields = ['id', 'uploaded_file', 'file_name', 'uploaded_at', 'blockchain_hash', 'user', 'receiving_user', 'aes_key', 'encrypted_fernet_key', 'expires_at', 'max_downloads', 'download_count', 'client_encrypted']
+        # Hash, chunk tree and anchor fields are set only from the stored bytes
+        # (file_hash_fields / StreamHasher, hash_field_changes)
+        read_only_fields = (
+            'uploaded_at', 'user', 'encrypted_fernet_key', 'download_count', 'client_encrypted',
+            'blockchain_hash', 'merkle_chunk_size', 'merkle_root', 'chunk_hashes',
+            'anchor_batch', 'anchor_index', 'anchor_proof',
+        )
 
 # No changes to your UserRegistrationSerializer, as instructed
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -59,11 +88,142 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
+class UserProvisionSerializer(serializers.Serializer):
+    """
+    One row of a bulk user import (see api/provisioning.py). Username
+    uniqueness and the password validators are checked for the whole batch
+    there, not per row.
+    """
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField(max_length=254)
+    password = serializers.CharField(write_only=True)
+
+
+class CloudUploadLogListSerializer(serializers.ListSerializer):
+    """
+    Bulk form of CloudUploadLogSerializer. Items are validated one by one;
+    invalid items are reported in item_errors (keyed by position) instead of
+    failing the whole request, and valid ones are inserted with bulk_create
+    in chunked transactions, each also applying its chunk's usage counters.
+    """
+    bulk_chunk_size = 500
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Expected a list of items.']})
+        if self.max_length is not None and len(data) > self.max_length:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f'Ensure this list has no more than {self.max_length} items.']}
+            )
+        self.item_errors = {}
+        self.valid_indexes = []
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                validated.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                self.item_errors[index] = exc.detail
+            else:
+                self.valid_indexes.append(index)
+        return validated
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        instances = [model(**attrs) for attrs in validated_data]
+        for start in range(0, len(instances), self.bulk_chunk_size):
+            with transaction.atomic():
+                chunk = model.objects.bulk_create(instances[start:start + self.bulk_chunk_size])
+                record_cloud_uploads(chunk)
+        return instances
+
+    def item_results(self):
+        """Per-item outcome in request order, after save()."""
+        results = {
+            index: {'index': index, 'status': 'error', 'errors': errors}
+            for index, errors in self.item_errors.items()
+        }
+        for index, instance in zip(self.valid_indexes, self.instance or []):
+            results[index] = {'index': index, 'status': 'created', 'id': instance.pk}
+        return [results[index] for index in sorted(results)]
+
+
 class CloudUploadLogSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     user_id = serializers.IntegerField(read_only=True)
+    vault_file = serializers.PrimaryKeyRelatedField(read_only=True)
     
     class Meta:
         model = CloudUploadLog
-        fields = ['id', 'user', 'user_id', 'file_name', 's3_key', 's3_url', 'file_size', 'content_type', 'uploaded_at']
-        read_only_fields = ('uploaded_at', 'user', 'user_id')
\ No newline at end of file
+        fields = ['id', 'user', 'user_id', 'file_name', 's3_key', 's3_url', 'file_size', 'content_type', 'uploaded_at', 'vault_file']
+        read_only_fields = ('uploaded_at', 'user', 'user_id', 'vault_file')
+        list_serializer_class = CloudUploadLogListSerializer
+
+
+class AnchorBatchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnchorBatch
+        fields = ['id', 'merkle_root', 'leaf_count', 'created_at', 'anchored_at', 'anchor_reference']
+        read_only_fields = fields
+
+
+class VaultFileBulkSelectionSerializer(serializers.Serializer):
+    """
+    Selects the caller's own files for a bulk action, by id and/or filters.
+    At least one of ids, uploaded_before or scope is required.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    uploaded_before = serializers.DateTimeField(required=False)
+    scope = serializers.ChoiceField(choices=['vault', 'shared', 'all'], required=False)
+    shared_with = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False)
+
+    def validate(self, attrs):
+        if not any(key in attrs for key in ('ids', 'uploaded_before', 'scope')):
+            raise serializers.ValidationError("Provide 'ids', 'uploaded_before' or 'scope'.")
+        return attrs
+
+    def filter_queryset(self, queryset):
+        data = self.validated_data
+        if 'ids' in data:
+            queryset = queryset.filter(id__in=data['ids'])
+        if 'uploaded_before' in data:
+            queryset = queryset.filter(uploaded_at__lt=data['uploaded_before'])
+        if data.get('scope') == 'vault':
+            queryset = queryset.filter(receiving_user__isnull=True)
+        elif data.get('scope') == 'shared':
+            queryset = queryset.filter(receiving_user__isnull=False)
+        if 'shared_with' in data:
+            queryset = queryset.filter(receiving_user=data['shared_with'])
+        return queryset
+
+
+class VaultFileBulkReshareSerializer(VaultFileBulkSelectionSerializer):
+    # New receiver; null moves the files back to the owner's personal vault
+    receiving_user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), required=False, allow_null=True)
+    receiving_username = serializers.SlugRelatedField(
+        slug_field='username', queryset=User.objects.all(), required=False, source='receiving_user_by_name'
+    )
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if 'receiving_user_by_name' in attrs:
+            attrs['receiving_user'] = attrs.pop('receiving_user_by_name')
+        if 'receiving_user' not in attrs:
+            raise serializers.ValidationError("Provide 'receiving_user' or 'receiving_username'.")
+        return attrs
+
+
+class VaultFileFilterSerializer(serializers.Serializer):
+    """Query parameters accepted by the file listing endpoints."""
+    q = serializers.CharField(required=False, allow_blank=True, max_length=255)
+    name_prefix = serializers.CharField(required=False, allow_blank=True, max_length=255)
+    uploaded_after = serializers.DateTimeField(required=False)
+    uploaded_before = serializers.DateTimeField(required=False)
+    sender = serializers.CharField(required=False, allow_blank=True)
+    recipient = serializers.CharField(required=False, allow_blank=True)
+    encrypted = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        if attrs.get('encrypted') is None:
+            attrs.pop('encrypted', None)
+        return attrs
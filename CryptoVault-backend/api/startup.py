@@ -0,0 +1,85 @@
+"""
+Cold-start measurement for the Django backend (see bench_startup command
+and the start-up budget test).
+
+A fresh interpreter is started with `-X importtime`, runs django.setup(),
+builds the WSGI application and imports the URLconf, i.e. what a worker
+does before serving its first request. Its import log is parsed to find
+the most expensive modules and any optional subsystem that was loaded
+eagerly.
+"""
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Only needed by specific features; none of them should load at start-up
+LAZY_MODULES = ('pymongo', 'gridfs', 'boto3', 'botocore', 'cryptography', 'zstandard',
+                'concurrent.futures.process')
+
+STARTUP_SNIPPET = """
+import importlib
+import time
+
+start = time.perf_counter()
+import django
+django.setup()
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+importlib.import_module(settings.ROOT_URLCONF)
+print(f"startup_ms={(time.perf_counter() - start) * 1000:.1f}")
+"""
+
+
+def parse_importtime(stderr):
+    """
+    (name, self_us, cumulative_us) for every line of -X importtime output,
+    in import order.
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        modules.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return modules
+
+
+def measure_startup(settings_module=None):
+    """
+    Start a worker-like interpreter once and return a dict with total_ms
+    (wall time of the start-up), modules (parsed importtime log) and eager
+    (LAZY_MODULES that were imported).
+    """
+    env = dict(os.environ)
+    env['DJANGO_SETTINGS_MODULE'] = settings_module or os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_SNIPPET],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Start-up failed:\n{result.stderr[-2000:]}")
+    total_ms = None
+    for line in result.stdout.splitlines():
+        if line.startswith('startup_ms='):
+            total_ms = float(line.split('=', 1)[1])
+    modules = parse_importtime(result.stderr)
+    loaded = {name for name, _, _ in modules}
+    return {
+        'total_ms': total_ms,
+        'modules': modules,
+        'eager': [name for name in LAZY_MODULES if name in loaded],
+    }
+
+
+def slowest_modules(modules, count=15, key='cumulative'):
+    index = 2 if key == 'cumulative' else 1
+    return sorted(modules, key=lambda module: module[index], reverse=True)[:count]
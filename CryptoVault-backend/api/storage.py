@@ -0,0 +1,139 @@
+import posixpath
+import re
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.timezone import make_aware, is_naive
+
+from .utils import DB_NAME, MONGO_URI, get_shared_mongo_client
+
+
+class GridFSFile(File):
+    """
+    Read-only file backed by a GridOut. GridFS fetches chunks from the
+    server only as they are read, so downloads never load the whole blob.
+    """
+
+    def __init__(self, grid_out, name):
+        super().__init__(grid_out, name)
+        self.size = grid_out.length
+        self.mode = 'rb'
+
+
+@deconstructible
+class GridFSStorage(Storage):
+    """
+    Django storage backend that keeps files in MongoDB GridFS.
+
+    Files are streamed into GridFS chunk by chunk on save and read lazily on
+    open. All instances share the process-wide pooled MongoClient from
+    api.utils, so several stateless app nodes can use one blob store.
+    Pass `database` to run against an already opened database object
+    (e.g. an in-process stand-in such as mongomock in tests) instead of
+    connecting to MONGO_URI.
+    """
+
+    def __init__(self, uri=None, database_name=None, bucket_name='vault',
+                 chunk_size=255 * 1024, base_url=None, database=None):
+        self.uri = uri
+        self.database_name = database_name or DB_NAME
+        self.bucket_name = bucket_name
+        self.chunk_size = chunk_size
+        self.base_url = base_url
+        self._database = database
+
+    @property
+    def database(self):
+        if self._database is not None:
+            return self._database
+        return get_shared_mongo_client(self.uri or MONGO_URI)[self.database_name]
+
+    @property
+    def bucket(self):
+        import gridfs
+        return gridfs.GridFSBucket(
+            self.database,
+            bucket_name=self.bucket_name,
+            chunk_size_bytes=self.chunk_size,
+        )
+
+    @property
+    def files_collection(self):
+        return self.database[f'{self.bucket_name}.files']
+
+    def _file_doc(self, name, projection=None):
+        return self.files_collection.find_one(
+            {'filename': name}, projection, sort=[('uploadDate', -1)]
+        )
+
+    def _open(self, name, mode='rb'):
+        if 'w' in mode or 'a' in mode or '+' in mode:
+            raise ValueError("GridFSStorage files can only be opened for reading.")
+        import gridfs
+        try:
+            grid_out = self.bucket.open_download_stream_by_name(name)
+        except gridfs.errors.NoFile:
+            raise FileNotFoundError(f"No GridFS file named {name!r}")
+        return GridFSFile(grid_out, name)
+
+    def _save(self, name, content):
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        metadata = {}
+        content_type = getattr(content, 'content_type', None)
+        if content_type:
+            metadata['content_type'] = content_type
+        with self.bucket.open_upload_stream(name, metadata=metadata or None) as stream:
+            for chunk in content.chunks(chunk_size=self.chunk_size):
+                stream.write(chunk)
+        return name
+
+    def delete(self, name):
+        # Same as GridFSBucket.delete, but for every revision of the name
+        file_ids = [doc['_id'] for doc in self.files_collection.find({'filename': name}, {'_id': 1})]
+        if file_ids:
+            self.files_collection.delete_many({'_id': {'$in': file_ids}})
+            self.database[f'{self.bucket_name}.chunks'].delete_many({'files_id': {'$in': file_ids}})
+
+    def exists(self, name):
+        return self._file_doc(name, {'_id': 1}) is not None
+
+    def size(self, name):
+        doc = self._file_doc(name, {'length': 1})
+        if doc is None:
+            raise FileNotFoundError(f"No GridFS file named {name!r}")
+        return doc['length']
+
+    def listdir(self, path):
+        prefix = path.rstrip('/') + '/' if path else ''
+        directories, files = set(), set()
+        query = {'filename': {'$regex': '^' + re.escape(prefix)}} if prefix else {}
+        for doc in self.files_collection.find(query, {'filename': 1}):
+            relative = doc['filename'][len(prefix):]
+            head, sep, _ = relative.partition('/')
+            (directories if sep else files).add(head)
+        return sorted(directories), sorted(files)
+
+    def _upload_date(self, name):
+        doc = self._file_doc(name, {'uploadDate': 1})
+        if doc is None:
+            raise FileNotFoundError(f"No GridFS file named {name!r}")
+        value = doc['uploadDate']
+        # GridFS stores UTC; pymongo returns naive datetimes by default
+        return make_aware(value, timezone=dt_timezone.utc) if is_naive(value) else value
+
+    def get_modified_time(self, name):
+        return self._upload_date(name)
+
+    def get_created_time(self, name):
+        return self._upload_date(name)
+
+    def url(self, name):
+        # Keeps serializer output shaped like local media URLs. GridFS blobs
+        # are not served by the /media/ view; clients download them through
+        # the files API (download_encrypted / decrypt_and_download).
+        base_url = self.base_url if self.base_url is not None else settings.MEDIA_URL
+        return posixpath.join(base_url, name)
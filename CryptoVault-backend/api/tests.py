@@ -1,3 +1,1083 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .admission import AdmissionController
+from .anchoring import build_anchor_batch, verify_file_anchor
+from .compression import available_codec
+from .garbage import sweep_expired_shares
+from .integrity import scrub_pass
+from .listing import serialize_file_listing
+from .middleware import RequestProfilingMiddleware
+from .replication import REPLICATION_DEFAULTS, S3Replicator, replicate_pass
+from .models import CloudUploadLog, StorageUsage, VaultFile
+from .search import FTS_TABLE, has_fts_table, search_file_name
+from .serializers import CloudUploadLogListSerializer, VaultFileSerializer
+from .startup import measure_startup, slowest_modules
+from .storage import GridFSStorage
+from .usage import get_usage, reconcile_users
+
+
+class StartupBudgetTests(SimpleTestCase):
+    """Cold start of a worker (django.setup + WSGI app + URLconf)."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.startup = measure_startup()
+
+    def test_cold_start_within_budget(self):
+        slowest = ', '.join(
+            f"{name} ({cumulative_us // 1000} ms)"
+            for name, _, cumulative_us in slowest_modules(self.startup['modules'], 5)
+        )
+        self.assertLessEqual(
+            self.startup['total_ms'], settings.STARTUP_IMPORT_BUDGET_MS,
+            f"Start-up took {self.startup['total_ms']:.0f} ms; slowest imports: {slowest}"
+        )
+
+    def test_optional_subsystems_load_lazily(self):
+        self.assertEqual(self.startup['eager'], [], "Imported at start-up instead of on first use")
+
+
+class RequestProfilingTests(TestCase):
+    """Which requests RequestProfilingMiddleware profiles, and what it records."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'staff-pass-123', is_staff=True)
+        cls.member = User.objects.create_user('member', 'member@example.com', 'member-pass-123')
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp(prefix='profiles_')
+        self.addCleanup(shutil.rmtree, self.output_dir, ignore_errors=True)
+        self.factory = RequestFactory()
+
+    def middleware(self, **config):
+        def view(request):
+            # Two queries for the recorder to count
+            list(get_user_model().objects.all())
+            get_user_model().objects.count()
+            return HttpResponse('ok')
+        config = {'ENABLED': True, 'OUTPUT_DIR': self.output_dir, **config}
+        with override_settings(REQUEST_PROFILING=config):
+            return RequestProfilingMiddleware(view)
+
+    def request(self, user=None, header=False):
+        request = self.factory.get('/api/v1/usage/', **({'HTTP_X_PROFILE_REQUEST': '1'} if header else {}))
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_disabled_middleware_drops_out(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            self.middleware(ENABLED=False, SAMPLE_RATE=1.0)
+
+    def test_header_profiles_staff_requests_only(self):
+        middleware = self.middleware()
+        self.assertNotIn('X-Profile-Id', middleware(self.request()))
+        self.assertNotIn('X-Profile-Id', middleware(self.request(self.member, header=True)))
+        response = middleware(self.request(self.staff, header=True))
+        self.assertIn('X-Profile-Id', response)
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+    def test_sampling(self):
+        self.assertNotIn('X-Profile-Id', self.middleware(SAMPLE_RATE=0.0)(self.request()))
+        response = self.middleware(SAMPLE_RATE=1.0)(self.request())
+        base = os.path.join(self.output_dir, response['X-Profile-Id'])
+        with open(base + '.json') as f:
+            summary = json.load(f)
+        self.assertEqual(summary['queries']['count'], 2)
+        self.assertEqual(len(summary['queries']['slowest']), 2)
+        self.assertTrue(os.path.exists(base + '.prof'))
+        self.assertTrue(os.path.exists(base + '.folded'))
+
+
+try:
+    import mongomock
+    import mongomock.gridfs
+except ImportError:
+    mongomock = None
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class GridFSStorageTests(SimpleTestCase):
+    """GridFSStorage against mongomock's in-process MongoDB."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        mongomock.gridfs.enable_gridfs_integration()
+
+    def setUp(self):
+        # Small chunks, so a file spans several GridFS chunk documents
+        self.storage = GridFSStorage(database=mongomock.MongoClient()['vault_test'], chunk_size=4,
+                                     base_url='/media/')
+
+    def test_save_open_exists_size_delete(self):
+        name = self.storage.save('secure_vault_files/report.bin', ContentFile(b'encrypted report bytes'))
+        self.assertEqual(name, 'secure_vault_files/report.bin')
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 22)
+        with self.storage.open(name) as f:
+            self.assertEqual(f.size, 22)
+            self.assertEqual(f.read(), b'encrypted report bytes')
+        self.assertEqual(self.storage.url(name), '/media/secure_vault_files/report.bin')
+        self.assertEqual(self.storage.listdir('secure_vault_files'), ([], ['report.bin']))
+        self.assertIsNotNone(self.storage.get_modified_time(name).tzinfo)
+
+        # Taken names get a new one instead of a second revision
+        other = self.storage.save(name, ContentFile(b'other'))
+        self.assertNotEqual(other, name)
+
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        with self.assertRaises(FileNotFoundError):
+            self.storage.open(name)
+        with self.assertRaises(FileNotFoundError):
+            self.storage.size(name)
+        with self.assertRaises(ValueError):
+            self.storage.open(other, 'wb')
+
+
+class LeanListingTests(TestCase):
+    """The lean listing path must match VaultFileSerializer field for field."""
+
+    def test_matches_serializer_output(self):
+        User = get_user_model()
+        owner = User.objects.create(username='owner')
+        recipient = User.objects.create(username='recipient')
+        expires_at = timezone.now() + timedelta(days=7)
+        for name, receiving_user, blockchain_hash, expiry in [
+            ('secure_vault_files/report.pdf', None, 'f' * 64, {}),
+            ('secure_vault_files/quarterly report (final).pdf', None, None, {}),
+            ('sharedfiles/r\u00e9sum\u00e9 #2.txt', recipient, 'a' * 64,
+             {'expires_at': expires_at, 'max_downloads': 3, 'download_count': 1}),
+        ]:
+            VaultFile.objects.create(
+                user=owner, receiving_user=receiving_user, uploaded_file=name,
+                file_name=name.rpartition('/')[2], blockchain_hash=blockchain_hash,
+                aes_key='key', encrypted_fernet_key='c' * 20, **expiry
+            )
+        request = RequestFactory().get('/api/v1/files/')
+        queryset = VaultFile.objects.filter(user=owner).order_by('-uploaded_at')
+
+        expected = VaultFileSerializer(queryset, many=True, context={'request': request}).data
+        self.assertEqual(serialize_file_listing(queryset, request), [dict(row) for row in expected])
+
+
+class AnchorBatchTests(TestCase):
+    def test_inclusion_proofs_verify_against_root(self):
+        owner = get_user_model().objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+        # Odd leaf count, so one level promotes its last node unchanged
+        VaultFile.objects.bulk_create([
+            VaultFile(user=owner, uploaded_file=f'secure_vault_files/{i}.txt', file_name=f'{i}.txt',
+                      blockchain_hash=hashlib.sha256(str(i).encode()).hexdigest())
+            for i in range(7)
+        ])
+        batch = build_anchor_batch()
+        self.assertEqual(batch.leaf_count, 7)
+        files = list(VaultFile.objects.select_related('anchor_batch').order_by('anchor_index'))
+        self.assertEqual([f.anchor_index for f in files], list(range(7)))
+        for vault_file in files:
+            with self.subTest(index=vault_file.anchor_index):
+                self.assertTrue(verify_file_anchor(vault_file))
+                vault_file.blockchain_hash = hashlib.sha256(b'modified').hexdigest()
+                self.assertFalse(verify_file_anchor(vault_file))
+
+        # A valid proof of one file does not verify another file's hash
+        files[0].anchor_proof = files[1].anchor_proof
+        files[0].blockchain_hash = hashlib.sha256(b'0').hexdigest()
+        self.assertFalse(verify_file_anchor(files[0]))
+        self.assertIsNone(build_anchor_batch())
+
+    def test_metadata_update_cannot_change_the_hash(self):
+        owner = get_user_model().objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+        vault_file = VaultFile.objects.create(
+            user=owner, uploaded_file='secure_vault_files/plan.txt', file_name='plan.txt',
+            blockchain_hash=hashlib.sha256(b'plan').hexdigest()
+        )
+        build_anchor_batch()
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+        response = api.patch(f'/api/v1/files/{vault_file.id}/', {
+            'blockchain_hash': '0' * 64, 'merkle_root': '0' * 64, 'anchor_index': 5, 'aes_key': 'new-key',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        vault_file.refresh_from_db()
+        self.assertEqual(vault_file.aes_key, 'new-key')
+        self.assertEqual(vault_file.blockchain_hash, hashlib.sha256(b'plan').hexdigest())
+        self.assertEqual(vault_file.anchor_index, 0)
+        self.assertTrue(verify_file_anchor(vault_file))
+
+
+class CryptoAdmissionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix='admission_')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    def setUp(self):
+        owner = get_user_model().objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+        self.controller = AdmissionController(max_concurrent=1, max_bytes=1024 * 1024, queue_timeout=0.05, retry_after=7)
+        patcher = mock.patch('api.admission._controller', self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, size):
+        return self.api.post('/api/v1/uploadfiles/', {
+            'uploaded_file': SimpleUploadedFile('plan.txt', b'p' * size),
+            'aes_key': 'owner-aes-key',
+        }, format='multipart')
+
+    def test_over_budget_returns_503_with_retry_after(self):
+        with self.controller.admit(1024):
+            response = self.upload(1024)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertFalse(VaultFile.all_objects.exists())
+        self.assertEqual(self.controller.stats()['rejected_total'], 1)
+
+        # Once the slot is free the same upload is admitted
+        self.assertEqual(self.upload(1024).status_code, 201)
+        self.assertEqual(self.controller.stats()['bytes_in_use'], 0)
+
+    def test_file_larger_than_budget_returns_413(self):
+        response = self.upload(512 * 1024)
+        self.assertEqual(response.status_code, 413)
+
+    def test_failed_download_is_not_counted(self):
+        recipient = get_user_model().objects.create_user('recipient', 'recipient@example.com', 'recipient-pass-123')
+        response = self.api.post('/api/v1/uploadfiles/', {
+            'uploaded_file': SimpleUploadedFile('plan.txt', b'p' * 1024),
+            'aes_key': 'owner-aes-key',
+            'receiving_user': recipient.id,
+            'max_downloads': 1,
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        vault_file = VaultFile.objects.get(pk=response.data['id'])
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(recipient)}')
+
+        def download():
+            return api.post(f'/api/v1/files/{vault_file.id}/decrypt_and_download/',
+                            {'decryption_key': 'owner-aes-key'}, format='json')
+
+        with self.controller.admit(1024):
+            self.assertEqual(download().status_code, 503)
+        with mock.patch('api.views.decrypt_file', side_effect=ValueError('bad token')):
+            self.assertEqual(download().status_code, 500)
+        vault_file.refresh_from_db()
+        self.assertEqual(vault_file.download_count, 0)
+
+        response = download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'p' * 1024)
+        vault_file.refresh_from_db()
+        self.assertEqual(vault_file.download_count, 1)
+
+
+class FileSearchTests(TestCase):
+    """Listing filters, and that name search goes through the trigram index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+        cls.peer = User.objects.create_user('peer', 'peer@example.com', 'peer-pass-123')
+        now = timezone.now()
+        rows = [
+            # (name, sender, recipient, days ago, encrypted)
+            ('Quarterly_Report.pdf', cls.owner, None, 1, True),
+            ('report_draft.txt', cls.owner, cls.peer, 10, False),
+            ('holiday.jpg', cls.owner, None, 40, True),
+            ('peer_report.docx', cls.peer, cls.owner, 5, True),
+            ('notes.md', cls.peer, cls.owner, 20, False),
+            ('Re.txt', cls.owner, None, 2, False),
+        ]
+        cls.ids = {}
+        for name, sender, recipient, days, encrypted in rows:
+            vault_file = VaultFile.objects.create(
+                user=sender, receiving_user=recipient, file_name=name,
+                uploaded_file=f'secure_vault_files/{name}', encrypted_fernet_key='wrapped' if encrypted else None,
+            )
+            VaultFile.objects.filter(pk=vault_file.pk).update(uploaded_at=now - timedelta(days=days))
+            cls.ids[name] = vault_file.id
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.owner)}')
+
+    def names(self, url='/api/v1/files/', **params):
+        response = self.api.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        ids = {row['id'] for row in response.data}
+        return {name for name, pk in self.ids.items() if pk in ids}
+
+    def test_filters(self):
+        week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+        month_ago = (timezone.now() - timedelta(days=30)).isoformat()
+        for params, expected in [
+            ({'q': 'report'}, {'Quarterly_Report.pdf', 'report_draft.txt', 'peer_report.docx'}),
+            ({'q': 'REPORT_d'}, {'report_draft.txt'}),
+            # Shorter than a trigram: falls back to a substring scan
+            ({'q': 're'}, {'Quarterly_Report.pdf', 'report_draft.txt', 'peer_report.docx', 'Re.txt'}),
+            ({'q': '100%'}, set()),
+            ({'name_prefix': 'rep'}, {'report_draft.txt'}),
+            ({'uploaded_after': week_ago}, {'Quarterly_Report.pdf', 'peer_report.docx', 'Re.txt'}),
+            ({'uploaded_after': month_ago, 'uploaded_before': week_ago}, {'report_draft.txt', 'notes.md'}),
+            ({'sender': 'peer'}, {'peer_report.docx', 'notes.md'}),
+            ({'recipient': 'peer'}, {'report_draft.txt'}),
+            ({'encrypted': 'true'}, {'Quarterly_Report.pdf', 'holiday.jpg', 'peer_report.docx'}),
+            ({'encrypted': 'false'}, {'report_draft.txt', 'notes.md', 'Re.txt'}),
+            ({'q': 'report', 'sender': 'owner', 'encrypted': 'false'}, {'report_draft.txt'}),
+        ]:
+            with self.subTest(params=params):
+                self.assertEqual(self.names(**params), expected)
+        self.assertEqual(self.names('/api/v1/files/received_files/', q='report'), {'peer_report.docx'})
+        self.assertEqual(self.api.get('/api/v1/files/', {'uploaded_after': 'yesterday'}).status_code, 400)
+
+    def test_client_encrypted_counts_as_encrypted(self):
+        response = self.api.post('/api/v1/uploadfiles/', {
+            'uploaded_file': SimpleUploadedFile('sealed.bin', b'ciphertext'),
+            'client_encrypted': 'true',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('encrypted_fernet_key', response.json())
+        self.assertFalse(VaultFile.all_objects.filter(file_name='sealed.bin').exists())
+
+        # Rows stored before the wrapped key was required
+        self.ids['sealed.bin'] = VaultFile.objects.create(
+            user=self.owner, file_name='sealed.bin', uploaded_file='secure_vault_files/sealed.bin', client_encrypted=True
+        ).id
+        self.assertIn('sealed.bin', self.names(encrypted='true'))
+        self.assertNotIn('sealed.bin', self.names(encrypted='false'))
+
+    def test_index_follows_renames(self):
+        VaultFile.objects.filter(pk=self.ids['notes.md']).update(file_name='meeting_notes.md')
+        self.assertEqual(self.names(q='meeting'), {'notes.md'})
+        self.assertEqual(self.names(q='notes'), {'notes.md'})
+
+    def test_name_search_uses_trigram_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("FTS5 plan check is SQLite specific")
+        self.assertTrue(has_fts_table())
+        plan = search_file_name(VaultFile.objects.all(), 'report').explain()
+        self.assertIn('VIRTUAL TABLE INDEX', plan)
+        self.assertIn(FTS_TABLE, plan)
+        # Matching rows are then fetched by rowid, not found by scanning file_name
+        self.assertIn('rowid=?', plan)
+
+
+class ExpiringShareTests(TestCase):
+    """Shares past expires_at or max_downloads disappear and are swept."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.owner = User.objects.create(username='owner')
+        self.recipient = User.objects.create(username='recipient')
+
+    def share(self, **expiry):
+        return VaultFile.objects.create(
+            user=self.owner, receiving_user=self.recipient, uploaded_file='sharedfiles/share.txt',
+            file_name='share.txt', file_size=10, **expiry
+        )
+
+    def test_expired_shares_are_hidden_and_swept(self):
+        live = self.share(expires_at=timezone.now() + timedelta(hours=1))
+        expired = self.share(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(list(VaultFile.objects.unexpired()), [live])
+
+        self.assertEqual(sweep_expired_shares(batch_size=1), 1)
+        self.assertEqual(list(VaultFile.objects.all()), [live])
+        self.assertIsNotNone(VaultFile.all_objects.get(pk=expired.pk).deleted_at)
+
+    def test_last_allowed_download_expires_the_share(self):
+        capped = self.share(max_downloads=2)
+        self.assertTrue(capped.record_download())
+        self.assertTrue(capped.record_download())
+        self.assertFalse(capped.record_download())
+        capped.refresh_from_db()
+        self.assertEqual(capped.download_count, 2)
+        self.assertFalse(VaultFile.objects.unexpired().filter(pk=capped.pk).exists())
+
+    def test_unsharing_clears_expiry(self):
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.owner)}')
+        patched = self.share(expires_at=timezone.now() + timedelta(hours=1), max_downloads=3)
+        bulk = self.share(expires_at=timezone.now() + timedelta(hours=1), download_count=1)
+
+        response = api.patch(f'/api/v1/files/{patched.id}/', {'receiving_user': None}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = api.post('/api/v1/files/bulk_reshare/', {'ids': [bulk.id], 'receiving_user': None}, format='json')
+        self.assertEqual(response.json()['updated'], 1)
+        for vault_file in (patched, bulk):
+            vault_file.refresh_from_db()
+            self.assertEqual((vault_file.expires_at, vault_file.max_downloads, vault_file.download_count), (None, None, 0))
+
+        with mock.patch('api.garbage.timezone.now', return_value=timezone.now() + timedelta(hours=2)):
+            self.assertEqual(sweep_expired_shares(), 0)
+        self.assertEqual(VaultFile.objects.filter(pk__in=[patched.pk, bulk.pk]).count(), 2)
+
+        response = api.patch(f'/api/v1/files/{patched.id}/',
+                             {'expires_at': (timezone.now() + timedelta(hours=1)).isoformat()}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expires_at', response.json())
+
+
+class ScrubIntegrityTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix='scrub_')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = get_user_model().objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+
+    def stored_file(self, name, content, stored=None):
+        vault_file = VaultFile.objects.create(
+            user=self.owner, file_name=name, blockchain_hash=hashlib.sha256(content).hexdigest()
+        )
+        vault_file.uploaded_file.save(name, ContentFile(content if stored is None else stored), save=False)
+        vault_file.save(update_fields=['uploaded_file'])
+        return vault_file
+
+    def test_scrub_pass_records_each_outcome(self):
+        ok = self.stored_file('ok.txt', b'intact contents')
+        corrupted = self.stored_file('corrupted.txt', b'original contents', stored=b'tampered contents')
+        missing = self.stored_file('missing.txt', b'gone')
+        missing.uploaded_file.storage.delete(missing.uploaded_file.name)
+        broken = self.stored_file('broken.txt', b'unreadable')
+        real_open = FileSystemStorage.open
+
+        def flaky_open(storage, name, mode='rb'):
+            if name == broken.uploaded_file.name:
+                raise RuntimeError('backend unavailable')
+            return real_open(storage, name, mode)
+
+        with mock.patch.object(FileSystemStorage, 'open', flaky_open):
+            totals = scrub_pass(batch_size=2, workers=2)
+
+        self.assertEqual(totals, {'ok': 1, 'mismatch': 1, 'missing': 1, 'error': 1})
+        statuses = dict(VaultFile.objects.values_list('id', 'verification_status'))
+        self.assertEqual(statuses, {ok.id: 'ok', corrupted.id: 'mismatch', missing.id: 'missing', broken.id: 'error'})
+
+
+class CompressionRoundtripTests(TestCase):
+    """compress -> encrypt on upload, decrypt -> decompress on download."""
+    PLAINTEXT = b''.join(f'line {i}: quarterly vault report\n'.encode() for i in range(4000))
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix='compression_')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    def setUp(self):
+        owner = get_user_model().objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+
+    def upload(self, codec):
+        with override_settings(VAULT_COMPRESSION={'CODEC': codec}):
+            response = self.api.post('/api/v1/uploadfiles/', {
+                'uploaded_file': SimpleUploadedFile('report.txt', self.PLAINTEXT, content_type='text/plain'),
+                'aes_key': 'owner-aes-key',
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        return VaultFile.objects.get(pk=response.data['id'])
+
+    def download(self, vault_file):
+        return self.api.post(f'/api/v1/files/{vault_file.id}/decrypt_and_download/',
+                             {'decryption_key': 'owner-aes-key'}, format='json')
+
+    def test_roundtrip_per_codec(self):
+        for codec in ('zlib', 'lzma', 'zstd'):
+            with self.subTest(codec=codec):
+                vault_file = self.upload(codec)
+                # zstd falls back to zlib without the zstandard package
+                self.assertEqual(vault_file.compression_codec, available_codec(codec))
+                self.assertEqual(vault_file.original_size, len(self.PLAINTEXT))
+                self.assertLess(vault_file.file_size, len(self.PLAINTEXT) // 4)
+                with vault_file.uploaded_file.open('rb') as f:
+                    self.assertNotIn(b'quarterly vault report', f.read())
+                response = self.download(vault_file)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, self.PLAINTEXT)
+
+    def test_uncompressed_roundtrip(self):
+        vault_file = self.upload('')
+        self.assertEqual(vault_file.compression_codec, '')
+        self.assertGreater(vault_file.file_size, len(self.PLAINTEXT))
+        self.assertEqual(self.download(vault_file).content, self.PLAINTEXT)
+
+    def test_replaced_content_is_sealed(self):
+        vault_file = self.upload('zlib')
+        revised = b'revised vault report\n' * 500
+
+        def replace(content):
+            return self.api.put(f'/api/v1/uploadfiles/{vault_file.id}/', {
+                'uploaded_file': SimpleUploadedFile('revised.txt', content),
+                'aes_key': 'owner-aes-key',
+            }, format='multipart')
+
+        response = replace(revised)
+        self.assertEqual(response.status_code, 200)
+        vault_file.refresh_from_db()
+        self.assertEqual((vault_file.compression_codec, vault_file.original_size), ('', len(revised)))
+        with vault_file.uploaded_file.open('rb') as f:
+            self.assertNotIn(b'revised vault report', f.read())
+        response = self.download(vault_file)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, revised)
+
+        # Growth past the quota is refused; the stored file is unchanged
+        with override_settings(VAULT_QUOTA_BYTES=vault_file.file_size + 1024):
+            response = replace(revised * 4)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('quota', response.data['detail'])
+        self.assertEqual(self.download(vault_file).content, revised)
+
+    def test_unknown_codec_is_an_error(self):
+        vault_file = self.upload('zlib')
+        VaultFile.objects.filter(pk=vault_file.pk).update(compression_codec='brotli')
+        response = self.download(vault_file)
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.data['error'], 'Failed to decrypt file.')
+
+
+class StorageMigrationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        root = tempfile.mkdtemp(prefix='storage_migration_')
+        cls.addClassCleanup(shutil.rmtree, root, ignore_errors=True)
+        cls.enterClassContext(override_settings(
+            MEDIA_ROOT=os.path.join(root, 'media'),
+            STORAGES={
+                **settings.STORAGES,
+                'archive': {
+                    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                    'OPTIONS': {'location': os.path.join(root, 'archive')},
+                },
+            },
+        ))
+        super().setUpClass()
+
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+
+    def stored_file(self, content):
+        vault_file = VaultFile(user=self.owner, file_name='report.bin', blockchain_hash=hashlib.sha256(content).hexdigest())
+        vault_file.uploaded_file.save('report.bin', ContentFile(content))
+        return vault_file
+
+    def test_rows_keep_the_storage_they_were_written_to(self):
+        vault_file = self.stored_file(b'stays on default')
+        self.assertEqual(vault_file.storage_alias, 'default')
+        with override_settings(VAULT_STORAGE_ALIAS='archive'):
+            self.assertEqual(VaultFile(user=self.owner).storage_alias, 'archive')
+            vault_file = VaultFile.objects.get(pk=vault_file.pk)
+            with vault_file.uploaded_file.open('rb') as f:
+                self.assertEqual(f.read(), b'stays on default')
+
+    def test_migrate_storage_moves_rows_between_storages(self):
+        vault_file = self.stored_file(b'moving to the archive')
+        source_name = vault_file.uploaded_file.name
+        call_command('migrate_storage', '--from', 'default', '--to', 'archive', '--delete-source', stdout=StringIO())
+
+        vault_file.refresh_from_db()
+        self.assertEqual(vault_file.storage_alias, 'archive')
+        self.assertIs(vault_file.uploaded_file.storage, storages['archive'])
+        with vault_file.uploaded_file.open('rb') as f:
+            self.assertEqual(f.read(), b'moving to the archive')
+        self.assertFalse(storages['default'].exists(source_name))
+        self.assertEqual(scrub_pass(), {'ok': 1})
+
+
+try:
+    import boto3
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+
+@unittest.skipIf(mock_aws is None, "boto3/moto are not installed")
+class ReplicationTests(TestCase):
+    """S3 replication against moto's in-process S3."""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix='replication_')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    def setUp(self):
+        self.enterContext(mock.patch.dict(os.environ, {
+            'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing', 'AWS_DEFAULT_REGION': 'us-east-1',
+        }))
+        self.enterContext(mock_aws())
+        self.s3 = boto3.client('s3', region_name='us-east-1')
+        self.s3.create_bucket(Bucket='vault-mirror')
+        self.replicator = S3Replicator(dict(REPLICATION_DEFAULTS, BUCKET='vault-mirror', REGION='us-east-1',
+                                            PART_SIZE=5 * 1024 * 1024, PART_CONCURRENCY=2, RETRY_BACKOFF=60, MAX_FILE_ATTEMPTS=2))
+        self.addCleanup(self.replicator.close)
+        self.owner = get_user_model().objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+
+    def stored_file(self, name, content):
+        vault_file = VaultFile(user=self.owner, file_name=name, file_size=len(content),
+                               blockchain_hash=hashlib.sha256(content).hexdigest())
+        vault_file.uploaded_file.save(name, ContentFile(content))
+        return vault_file
+
+    def test_multipart_upload_and_log_rows(self):
+        # Larger than one part (S3's 5 MiB minimum), so it goes multipart
+        large = os.urandom(6 * 1024 * 1024)
+        big = self.stored_file('big.bin', large)
+        small = self.stored_file('small.bin', b'small ciphertext')
+
+        replicated, errors = replicate_pass(self.replicator)
+        self.assertEqual((replicated, errors), (2, []))
+
+        big_log = CloudUploadLog.objects.get(vault_file=big)
+        self.assertEqual(big_log.s3_key, f'vault/{big.uploaded_file.name}')
+        self.assertEqual(big_log.file_size, len(large))
+        self.assertEqual(big_log.user_id, self.owner.id)
+        head = self.s3.head_object(Bucket='vault-mirror', Key=big_log.s3_key)
+        self.assertTrue(head['ETag'].strip('"').endswith('-2'), "expected a two-part multipart upload")
+        self.assertEqual(head['Metadata']['blockchain-hash'], big.blockchain_hash)
+        body = self.s3.get_object(Bucket='vault-mirror', Key=big_log.s3_key)['Body'].read()
+        self.assertEqual(body, large)
+        small_log = CloudUploadLog.objects.get(vault_file=small)
+        self.assertEqual(
+            self.s3.get_object(Bucket='vault-mirror', Key=small_log.s3_key)['Body'].read(), b'small ciphertext'
+        )
+        self.assertEqual(self.s3.list_multipart_uploads(Bucket='vault-mirror').get('Uploads', []), [])
+
+        # Mirrors are not the owner's uploads: no cloud usage, also after a reconcile
+        self.assertTrue(big_log.replica and small_log.replica)
+        for _ in range(2):
+            usage = get_usage(self.owner)
+            self.assertEqual((usage.cloud_files, usage.cloud_bytes), (0, 0))
+            reconcile_users([self.owner.id])
+
+        # Nothing left to mirror
+        self.assertEqual(replicate_pass(self.replicator), (0, []))
+
+    def test_failing_file_backs_off_and_gives_up(self):
+        broken = self.stored_file('broken.bin', b'lost')
+        broken.uploaded_file.storage.delete(broken.uploaded_file.name)
+
+        replicated, errors = replicate_pass(self.replicator)
+        self.assertEqual((replicated, [file_id for file_id, _ in errors]), (0, [broken.id]))
+        broken.refresh_from_db()
+        self.assertEqual(broken.replication_attempts, 1)
+        self.assertGreater(broken.replication_retry_at, timezone.now() + timedelta(seconds=50))
+
+        # Backing off: the next pass skips it
+        self.assertEqual(replicate_pass(self.replicator), (0, []))
+
+        VaultFile.objects.filter(pk=broken.pk).update(replication_retry_at=timezone.now())
+        self.assertEqual(len(replicate_pass(self.replicator)[1]), 1)
+        broken.refresh_from_db()
+        self.assertEqual(broken.replication_attempts, 2)
+        self.assertGreater(broken.replication_retry_at, timezone.now() + timedelta(seconds=110))
+
+        # Out of attempts
+        VaultFile.objects.filter(pk=broken.pk).update(replication_retry_at=timezone.now())
+        self.assertEqual(replicate_pass(self.replicator), (0, []))
+
+
+@override_settings(VAULT_MERKLE_CHUNK_SIZE=1024)
+class VerifyChunksTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix='verify_chunks_')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    def setUp(self):
+        owner = get_user_model().objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(owner)}')
+        response = self.api.post('/api/v1/uploadfiles/', {
+            'uploaded_file': SimpleUploadedFile('chunks.bin', bytes(range(256)) * 16),
+            'client_encrypted': 'true',
+            'encrypted_fernet_key': 'client-wrapped-key',
+        }, format='multipart')
+        self.vault_file = VaultFile.objects.get(pk=response.data['id'])
+        self.url = f'/api/v1/files/{self.vault_file.id}/verify_chunks/'
+
+    def test_tampered_chunk_is_reported(self):
+        response = self.api.get(self.url)
+        self.assertTrue(response.data['valid'])
+        self.assertEqual(response.data['chunk_count'], 4)
+
+        path = self.vault_file.uploaded_file.path
+        with open(path, 'r+b') as f:
+            f.seek(2 * 1024 + 10)
+            f.write(b'\xff\xff')
+        response = self.api.get(self.url)
+        self.assertFalse(response.data['valid'])
+        self.assertEqual([chunk['valid'] for chunk in response.data['chunks']], [True, True, False, True])
+        response = self.api.get(self.url, {'start': 0, 'end': 2048})
+        self.assertTrue(response.data['valid'])
+        response = self.api.get(self.url, {'chunks': '2'})
+        self.assertFalse(response.data['valid'])
+
+    def test_range_beyond_end_of_file(self):
+        response = self.api.get(self.url, {'start': 4 * 1024, 'end': 8 * 1024})
+        self.assertEqual(response.status_code, 416)
+        response = self.api.get(self.url, {'chunks': ''})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserProvisioningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.existing = User.objects.create_user('existing', 'existing@example.com', 'existing-pass-123')
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin-pass-123')
+
+    @override_settings(USER_PROVISION_WORKERS=1)
+    def test_csv_import_reports_row_errors(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        body = (
+            'username,email,password\n'
+            'alice,Alice@EXAMPLE.com,Alice-pass-123\n'
+            'existing,other@example.com,Other-pass-123\n'
+            'alice,alice2@example.com,Alice-pass-456\n'
+            'bob,not-an-email,Bob-pass-123\n'
+        )
+        response = client.post('/api/v1/users/bulk/', body, content_type='text/csv')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['created', 'error', 'error', 'error'])
+        self.assertIn('username', response.data['results'][1]['errors'])
+        self.assertIn('username', response.data['results'][2]['errors'])
+        self.assertIn('email', response.data['results'][3]['errors'])
+        alice = get_user_model().objects.get(pk=response.data['results'][0]['id'])
+        self.assertEqual(alice.email, 'Alice@example.com')
+        self.assertTrue(alice.check_password('Alice-pass-123'))
+
+    @override_settings(USER_PROVISION_MAX_ITEMS=2)
+    def test_request_size_is_capped(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.admin)}')
+        items = [{'username': f'user{i}', 'email': f'user{i}@example.com', 'password': f'User-pass-{i}'} for i in range(3)]
+        response = client.post('/api/v1/users/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('provision_users', response.data['non_field_errors'][0])
+        self.assertFalse(get_user_model().objects.filter(username__startswith='user').exists())
+
+    def test_command_hashes_in_process_pool(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as source:
+            for i in range(6):
+                source.write(f'{{"username": "staff{i}", "email": "staff{i}@example.com", "password": "Staff-pass-{i}"}}\n')
+            source.flush()
+            call_command('provision_users', source.name, '--workers', '2', '--batch-size', '4', stdout=StringIO())
+        users = get_user_model().objects.filter(username__startswith='staff')
+        self.assertEqual(users.count(), 6)
+        self.assertTrue(all(user.check_password(f'Staff-pass-{user.username[-1]}') for user in users))
+
+
+class QueryTimer:
+    """connection.execute_wrapper adding up the time spent in queries."""
+
+    def __init__(self):
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total += time.perf_counter() - started
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTests(TestCase):
+    """
+    Exact number of SQL queries, and their total time, for every endpoint in
+    api/urls.py and users/urls.py. Listings are seeded with ROWS rows, so a
+    query per row (N+1) changes the count by ROWS and fails the test.
+    """
+    ROWS = 50
+    QUERY_TIME_BUDGET_MS = 250
+    CLOUD_LOG = {'file_name': 'report.pdf', 's3_key': 'vault/report.pdf',
+                 's3_url': 'https://vault.s3.amazonaws.com/vault/report.pdf', 'file_size': 2048}
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp(prefix='query_budget_')
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'owner-pass-123')
+        cls.peer = User.objects.create_user('peer', 'peer@example.com', 'peer-pass-123')
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'admin-pass-123')
+
+        # One real encrypted upload for the detail endpoints
+        client = cls.client_for(cls.owner)
+        response = client.post('/api/v1/uploadfiles/', {
+            'uploaded_file': SimpleUploadedFile('notes.txt', b'vault notes ' * 4096),
+            'aes_key': 'owner-aes-key',
+        }, format='multipart')
+        cls.file_id = response.data['id']
+
+        VaultFile.objects.bulk_create(
+            [
+                VaultFile(user=cls.owner, receiving_user=cls.peer if i % 2 else None,
+                          uploaded_file=f'secure_vault_files/owned_{i}.txt', file_name=f'owned_{i}.txt',
+                          blockchain_hash=f'{i:064x}', aes_key='key', file_size=100)
+                for i in range(cls.ROWS)
+            ] + [
+                VaultFile(user=cls.peer, receiving_user=cls.owner,
+                          uploaded_file=f'secure_vault_files/received_{i}.txt', file_name=f'received_{i}.txt',
+                          file_size=100)
+                for i in range(cls.ROWS)
+            ]
+        )
+        CloudUploadLog.objects.bulk_create([
+            CloudUploadLog(user=cls.owner, vault_file_id=cls.file_id, **dict(cls.CLOUD_LOG, s3_key=f'vault/{i}'))
+            for i in range(cls.ROWS)
+        ])
+        cls.batch = build_anchor_batch()
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def setUp(self):
+        self.api = self.client_for(self.owner)
+
+    def assertQueryBudget(self, expected_queries, method, url, data=None, client=None, **kwargs):
+        """Call the endpoint and check its query count and total query time."""
+        timer = QueryTimer()
+        with CaptureQueriesContext(connection) as queries, connection.execute_wrapper(timer):
+            response = getattr(client or self.api, method)(url, data, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        executed = '\n'.join(query['sql'] for query in queries.captured_queries)
+        self.assertEqual(
+            len(queries), expected_queries,
+            f"{method.upper()} {url} ran {len(queries)} queries, expected {expected_queries}:\n{executed}"
+        )
+        self.assertLessEqual(
+            timer.total * 1000, self.QUERY_TIME_BUDGET_MS,
+            f"{method.upper()} {url} spent {timer.total * 1000:.0f} ms in queries"
+        )
+        return response
+
+    def test_file_listings(self):
+        owned = self.ROWS // 2 + 1
+        for url, rows in [
+            ('/api/v1/uploadfiles/', 2 * self.ROWS + 1),
+            ('/api/v1/files/', 2 * self.ROWS + 1),
+            ('/api/v1/files/vault_files/', owned),
+            ('/api/v1/files/shared_files/', self.ROWS),
+            ('/api/v1/files/received_files/', self.ROWS),
+        ]:
+            with self.subTest(url=url):
+                response = self.assertQueryBudget(2, 'get', url)
+                self.assertEqual(len(response.data), rows)
+
+    def test_file_detail(self):
+        for url in (f'/api/v1/files/{self.file_id}/', f'/api/v1/uploadfiles/{self.file_id}/'):
+            with self.subTest(url=url):
+                response = self.assertQueryBudget(2, 'get', url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_file_upload(self):
+        response = self.assertQueryBudget(5, 'post', '/api/v1/uploadfiles/', {
+            'uploaded_file': SimpleUploadedFile('plan.txt', b'plan ' * 1024),
+            'aes_key': 'owner-aes-key',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+    def test_client_encrypted_upload(self):
+        response = self.assertQueryBudget(5, 'post', '/api/v1/uploadfiles/', {
+            'uploaded_file': SimpleUploadedFile('plan.bin', b'ciphertext ' * 1024),
+            'client_encrypted': 'true',
+            'encrypted_fernet_key': 'client-wrapped-key',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['client_encrypted'])
+
+    def test_file_update(self):
+        response = self.assertQueryBudget(6, 'put', f'/api/v1/uploadfiles/{self.file_id}/', {
+            'uploaded_file': SimpleUploadedFile('notes.txt', b'new notes ' * 1024),
+            'aes_key': 'owner-aes-key',
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+
+    def test_file_metadata_update(self):
+        # One targeted UPDATE; the stored file is not read or rehashed
+        with mock.patch('api.views.StreamHasher') as hasher:
+            response = self.assertQueryBudget(
+                13, 'patch', f'/api/v1/files/{self.file_id}/', {'receiving_user': self.peer.pk}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        hasher.assert_not_called()
+
+    def test_file_delete(self):
+        response = self.assertQueryBudget(7, 'delete', f'/api/v1/uploadfiles/{self.file_id}/')
+        self.assertEqual(response.status_code, 204)
+
+    def test_decrypt_and_download(self):
+        response = self.assertQueryBudget(
+            2, 'post', f'/api/v1/files/{self.file_id}/decrypt_and_download/',
+            {'decryption_key': 'owner-aes-key'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_download_encrypted(self):
+        response = self.assertQueryBudget(2, 'get', f'/api/v1/files/{self.file_id}/download_encrypted/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_verify_chunks(self):
+        response = self.assertQueryBudget(2, 'get', f'/api/v1/files/{self.file_id}/verify_chunks/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_proof(self):
+        response = self.assertQueryBudget(3, 'get', f'/api/v1/files/{self.file_id}/proof/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_bulk_actions(self):
+        response = self.assertQueryBudget(
+            14, 'post', '/api/v1/files/bulk_reshare/', {'scope': 'vault', 'receiving_username': 'peer'}, format='json'
+        )
+        self.assertEqual(response.data['updated'], self.ROWS // 2 + 1)
+        response = self.assertQueryBudget(8, 'post', '/api/v1/files/bulk_delete/', {'scope': 'all'}, format='json')
+        self.assertEqual(response.data['deleted'], self.ROWS + 1)
+
+    def test_cloud_upload_logs(self):
+        response = self.assertQueryBudget(2, 'get', '/api/v1/cloud-uploads/')
+        self.assertEqual(len(response.data), self.ROWS)
+        response = self.assertQueryBudget(5, 'post', '/api/v1/cloud-uploads/', self.CLOUD_LOG, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.assertQueryBudget(
+            5, 'post', '/api/v1/cloud-uploads/bulk/', [self.CLOUD_LOG] * self.ROWS, format='json'
+        )
+        self.assertEqual(response.data['created'], self.ROWS)
+
+        # Smaller chunks: each commits its own rows and usage counters
+        before = StorageUsage.objects.get(user=self.owner).cloud_files
+        with mock.patch.object(CloudUploadLogListSerializer, 'bulk_chunk_size', 20):
+            response = self.assertQueryBudget(
+                13, 'post', '/api/v1/cloud-uploads/bulk/', [self.CLOUD_LOG] * self.ROWS, format='json'
+            )
+        self.assertEqual(response.data['created'], self.ROWS)
+        self.assertEqual(StorageUsage.objects.get(user=self.owner).cloud_files, before + self.ROWS)
+
+    @override_settings(USER_PROVISION_WORKERS=1)
+    def test_user_provisioning(self):
+        users = [{'username': f'hire{i}', 'email': f'hire{i}@example.com', 'password': f'Hire-pass-{i}'}
+                 for i in range(self.ROWS)]
+        response = self.assertQueryBudget(
+            5, 'post', '/api/v1/users/bulk/', users, format='json', client=self.client_for(self.admin)
+        )
+        self.assertEqual(response.data['created'], self.ROWS)
+        response = self.assertQueryBudget(1, 'post', '/api/v1/users/bulk/', users, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_anchor_batch(self):
+        response = self.assertQueryBudget(2, 'get', f'/api/v1/anchors/{self.batch.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_exports(self):
+        for url in ('/api/v1/export/files/', '/api/v1/export/cloud-uploads/'):
+            with self.subTest(url=url):
+                response = self.assertQueryBudget(2, 'get', url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_usage(self):
+        response = self.assertQueryBudget(2, 'get', '/api/v1/usage/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_crypto_stats(self):
+        response = self.assertQueryBudget(1, 'get', '/api/v1/crypto-stats/', client=self.client_for(self.admin))
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_changelists(self):
+        self.client.force_login(self.admin)
+        # Steady state: the FTS table lookup is cached per process
+        has_fts_table()
+        for url, params, expected in [
+            ('/admin/api/vaultfile/', {}, 8),
+            ('/admin/api/vaultfile/', {'q': 'owned_1'}, 7),
+            ('/admin/api/vaultfile/', {'q': 'peer'}, 7),
+            ('/admin/api/clouduploadlog/', {}, 8),
+        ]:
+            with self.subTest(url=url, params=params):
+                response = self.assertQueryBudget(expected, 'get', url, params, client=self.client)
+                self.assertEqual(response.status_code, 200)
+
+    def test_indexed_date_hierarchy_matches_distinct_dates(self):
+        queryset = VaultFile.objects.all()
+        indexed = VaultFile.changelist_objects.all()
+        with mock.patch('api.date_hierarchy.FILTERED_COUNT_LIMIT', 10):
+            for kind in ('year', 'month', 'day'):
+                with self.subTest(kind=kind):
+                    self.assertEqual(
+                        list(indexed.datetimes('uploaded_at', kind)),
+                        list(queryset.datetimes('uploaded_at', kind))
+                    )
+
+    def test_register(self):
+        response = self.assertQueryBudget(2, 'post', '/api/v1/auth/register/', {
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 'Unusual-pass-42',
+        }, format='json', client=APIClient())
+        self.assertEqual(response.status_code, 201)
+
+    def test_login_and_refresh(self):
+        with tempfile.NamedTemporaryFile() as login_list, mock.patch('users.views.LOGIN_LIST_FILE', login_list.name):
+            response = self.assertQueryBudget(1, 'post', '/api/v1/auth/login/', {
+                'username': 'owner', 'password': 'owner-pass-123',
+            }, format='json', client=APIClient())
+        self.assertEqual(response.status_code, 200)
+        response = self.assertQueryBudget(1, 'post', '/api/v1/auth/token/refresh/', {
+            'refresh': str(RefreshToken.for_user(self.owner)),
+        }, format='json', client=APIClient())
+        self.assertEqual(response.status_code, 200)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SecureFileViewSet, FileUploadView, CustomAuthToken, UserRegistrationView, CloudUploadLogView
+from .views import SecureFileViewSet, FileUploadView, CustomAuthToken, UserRegistrationView, CloudUploadLogView, CloudUploadLogBulkView, AnchorBatchView, CryptoAdmissionStatsView, StorageUsageView, MetadataExportView, UserProvisionView
 
 # For router-based viewset handling
 router = DefaultRouter(trailing_slash=True)  # Changed to True for action endpoints
@@ -35,4 +35,21 @@ urlpatterns = [
     
     # Cloud upload logs
     path('cloud-uploads/', CloudUploadLogView.as_view(), name='cloud-upload-logs'),
+    path('cloud-uploads/bulk/', CloudUploadLogBulkView.as_view(), name='cloud-upload-logs-bulk'),
+
+    # Bulk user provisioning (admin only)
+    path('users/bulk/', UserProvisionView.as_view(), name='users-bulk'),
+
+    # Merkle anchor batches
+    path('anchors/<int:pk>/', AnchorBatchView.as_view(), name='anchor-batch-detail'),
+
+    # Streaming metadata exports (NDJSON / CSV)
+    path('export/files/', MetadataExportView.as_view(), {'kind': 'files'}, name='export-files'),
+    path('export/cloud-uploads/', MetadataExportView.as_view(), {'kind': 'cloud-uploads'}, name='export-cloud-uploads'),
+
+    # Per-user storage usage
+    path('usage/', StorageUsageView.as_view(), name='storage-usage'),
+
+    # Crypto admission controller stats
+    path('crypto-stats/', CryptoAdmissionStatsView.as_view(), name='crypto-admission-stats'),
 ]
\ No newline at end of file
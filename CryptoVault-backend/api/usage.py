@@ -0,0 +1,172 @@
+"""
+Per-user storage usage counters and quota checks.
+
+Counters live in StorageUsage and are adjusted with F() expressions inside
+the transaction that creates, re-shares or deletes the counted rows, so
+reading a user's usage is a single primary-key lookup. reconcile_usage
+rebuilds them from scratch if they ever drift (e.g. after raw SQL deletes).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import CloudUploadLog, StorageUsage, VaultFile
+
+COUNTER_FIELDS = [
+    'vault_bytes', 'vault_files',
+    'shared_out_bytes', 'shared_out_files',
+    'shared_in_bytes', 'shared_in_files',
+    'cloud_bytes', 'cloud_files',
+]
+
+# Content-Length covers the whole multipart body; allow for its framing
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class QuotaExceeded(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Storage quota exceeded.'
+    default_code = 'quota_exceeded'
+
+
+def vault_file_deltas(user_id, receiving_user_id, size, sign=1):
+    """Counter changes for adding (sign=1) or removing (sign=-1) one vault file."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    size = size or 0
+    if receiving_user_id:
+        deltas[user_id]['shared_out_bytes'] += sign * size
+        deltas[user_id]['shared_out_files'] += sign
+        deltas[receiving_user_id]['shared_in_bytes'] += sign * size
+        deltas[receiving_user_id]['shared_in_files'] += sign
+    else:
+        deltas[user_id]['vault_bytes'] += sign * size
+        deltas[user_id]['vault_files'] += sign
+    return deltas
+
+
+def merge_deltas(*all_deltas):
+    merged = defaultdict(lambda: defaultdict(int))
+    for deltas in all_deltas:
+        for user_id, fields in deltas.items():
+            for field, delta in fields.items():
+                merged[user_id][field] += delta
+    return merged
+
+
+def apply_deltas(deltas):
+    """Apply {user_id: {field: delta}} with one UPDATE per user."""
+    for user_id, fields in deltas.items():
+        changes = {field: F(field) + delta for field, delta in fields.items() if delta}
+        if not changes:
+            continue
+        changes['updated_at'] = timezone.now()
+        if not StorageUsage.objects.filter(user_id=user_id).update(**changes):
+            StorageUsage.objects.get_or_create(user_id=user_id)
+            StorageUsage.objects.filter(user_id=user_id).update(**changes)
+
+
+def record_vault_file(vault_file, sign=1):
+    apply_deltas(vault_file_deltas(vault_file.user_id, vault_file.receiving_user_id, vault_file.file_size, sign))
+
+
+def record_cloud_uploads(logs, sign=1):
+    deltas = defaultdict(lambda: defaultdict(int))
+    for log in logs:
+        if log.replica:
+            continue
+        deltas[log.user_id]['cloud_bytes'] += sign * (log.file_size or 0)
+        deltas[log.user_id]['cloud_files'] += sign
+    apply_deltas(deltas)
+
+
+def get_usage(user):
+    usage, _ = StorageUsage.objects.get_or_create(user=user)
+    return usage
+
+
+def get_quota():
+    return getattr(settings, 'VAULT_QUOTA_BYTES', None), getattr(settings, 'VAULT_QUOTA_FILES', None)
+
+
+def check_quota(user, incoming_bytes, incoming_files=1, lock=False):
+    """
+    Raise QuotaExceeded if storing incoming_bytes more would take the user
+    over VAULT_QUOTA_BYTES / VAULT_QUOTA_FILES. With lock=True the usage row
+    is locked until the end of the surrounding transaction, so concurrent
+    uploads cannot both squeeze under the limit.
+    """
+    max_bytes, max_files = get_quota()
+    if not max_bytes and not max_files:
+        return
+    usage = get_usage(user)
+    if lock:
+        usage = StorageUsage.objects.select_for_update().get(pk=usage.pk)
+    if max_bytes and usage.owned_bytes + incoming_bytes > max_bytes:
+        raise QuotaExceeded(
+            f'Storage quota exceeded: {usage.owned_bytes} of {max_bytes} bytes used.'
+        )
+    if max_files and usage.owned_files + incoming_files > max_files:
+        raise QuotaExceeded(
+            f'File quota exceeded: {usage.owned_files} of {max_files} files used.'
+        )
+
+
+def check_upload_quota(request):
+    """Quota check from Content-Length, before the upload body is read."""
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    check_quota(request.user, max(content_length - MULTIPART_OVERHEAD, 0))
+
+
+def backfill_file_sizes(batch_size=500):
+    """Fill VaultFile.file_size for rows stored before it was recorded."""
+    filled = 0
+    last_id = 0
+    while True:
+        files = list(
+            VaultFile.objects.filter(id__gt=last_id, file_size__isnull=True)
+            .exclude(uploaded_file='')
+            .only('id', 'uploaded_file', 'storage_alias')
+            .order_by('id')[:batch_size]
+        )
+        if not files:
+            return filled
+        for vault_file in files:
+            try:
+                vault_file.file_size = vault_file.uploaded_file.size
+            except OSError:
+                vault_file.file_size = 0
+        VaultFile.objects.bulk_update(files, ['file_size'])
+        filled += len(files)
+        last_id = files[-1].id
+
+
+def reconcile_users(user_ids):
+    """Recompute the counters of user_ids from the VaultFile and CloudUploadLog tables."""
+    totals = {user_id: dict.fromkeys(COUNTER_FIELDS, 0) for user_id in user_ids}
+
+    def fill(queryset, group_field, prefix):
+        rows = queryset.order_by().values(group_field).annotate(total=Sum('file_size'), count=Count('id'))
+        for row in rows:
+            totals[row[group_field]][f'{prefix}_bytes'] = row['total'] or 0
+            totals[row[group_field]][f'{prefix}_files'] = row['count']
+
+    fill(VaultFile.objects.filter(user_id__in=user_ids, receiving_user__isnull=True), 'user_id', 'vault')
+    fill(VaultFile.objects.filter(user_id__in=user_ids, receiving_user__isnull=False), 'user_id', 'shared_out')
+    fill(VaultFile.objects.filter(receiving_user_id__in=user_ids), 'receiving_user_id', 'shared_in')
+    fill(CloudUploadLog.objects.filter(user_id__in=user_ids, replica=False), 'user_id', 'cloud')
+
+    with transaction.atomic():
+        StorageUsage.objects.bulk_create(
+            [StorageUsage(user_id=user_id, **fields) for user_id, fields in totals.items()],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=COUNTER_FIELDS + ['updated_at'],
+        )
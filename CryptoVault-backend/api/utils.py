@@ -1,42 +1,74 @@
-from pymongo import MongoClient
-import gridfs
-import os
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.backends import default_backend
 import base64
+import hashlib
+import os
+import threading
+import time
+
+# pymongo/gridfs and the cryptography primitives are imported on first use,
+# so worker start-up does not pay for subsystems a process may never touch.
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DB_NAME = os.getenv("DB_NAME", "filesDB")
 
-# MongoDB connection (optional - only used if MongoDB is needed)
-# Lazy initialization to avoid errors if MongoDB is not running
-_client = None
-_db = None
-_fs = None
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+
+# MongoDB connection (optional - only used if MongoDB is needed).
+# One pooled MongoClient per URI and process; clients are created lazily and
+# with connect=False, so nothing talks to MongoDB until it is actually used.
+_mongo_clients = {}
+_mongo_clients_lock = threading.Lock()
+
+
+def get_shared_mongo_client(uri: str = MONGO_URI):
+    """Process-wide pooled MongoClient for uri (re-created after fork)."""
+    from pymongo import MongoClient
+
+    key = (uri, os.getpid())
+    with _mongo_clients_lock:
+        client = _mongo_clients.get(key)
+        if client is None:
+            client = MongoClient(
+                uri,
+                serverSelectionTimeoutMS=2000,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                connect=False,
+            )
+            _mongo_clients[key] = client
+    return client
+
 
 def get_mongo_client():
-    """Get MongoDB client (lazy initialization)"""
-    global _client, _db, _fs
-    if _client is None:
-        try:
-            _client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=2000)
-            _db = _client[DB_NAME]
-            _fs = gridfs.GridFS(_db)
-        except Exception as e:
-            print(f"Warning: MongoDB connection failed: {e}. MongoDB features will be unavailable.")
-    return _client, _db, _fs
-
-# For backward compatibility, but won't fail if MongoDB is unavailable
-try:
-    client, db, fs = get_mongo_client()
-except Exception:
-    client = db = fs = None
+    """Get MongoDB client, database and GridFS handle (lazy initialization)"""
+    try:
+        import gridfs
+
+        client = get_shared_mongo_client()
+        db = client[DB_NAME]
+        return client, db, gridfs.GridFS(db)
+    except Exception as e:
+        print(f"Warning: MongoDB connection failed: {e}. MongoDB features will be unavailable.")
+        return None, None, None
+
+
+def __getattr__(name):
+    # For backward compatibility: module-level client/db/fs, built on first access
+    if name in ('client', 'db', 'fs'):
+        client, db, fs = get_mongo_client()
+        globals().update(client=client, db=db, fs=fs)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _fernet(key: bytes):
+    from cryptography.fernet import Fernet
+
+    return Fernet(key)
 
 
 def generate_fernet_key():
     """Generate a new Fernet key."""
+    from cryptography.fernet import Fernet
+
     return Fernet.generate_key()
 
 
@@ -46,6 +78,10 @@ def derive_aes_key_from_password(password: str, salt: bytes = None) -> bytes:
     If salt is None, generates a new salt.
     Returns (key, salt) tuple.
     """
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+    from cryptography.hazmat.backends import default_backend
+
     if salt is None:
         salt = os.urandom(16)
     
@@ -69,7 +105,7 @@ def encrypt_fernet_key_with_aes(fernet_key: bytes, aes_key: str) -> str:
     derived_key, salt = derive_aes_key_from_password(aes_key)
     
     # Use Fernet to encrypt the Fernet key (Fernet uses AES-128)
-    fernet_encryptor = Fernet(derived_key)
+    fernet_encryptor = _fernet(derived_key)
     encrypted_key = fernet_encryptor.encrypt(fernet_key)
     
     # Combine salt and encrypted key, then base64 encode
@@ -93,7 +129,7 @@ def decrypt_fernet_key_with_aes(encrypted_fernet_key: str, aes_key: str) -> byte
     derived_key, _ = derive_aes_key_from_password(aes_key, salt)
     
     # Decrypt the Fernet key
-    fernet_decryptor = Fernet(derived_key)
+    fernet_decryptor = _fernet(derived_key)
     return fernet_decryptor.decrypt(encrypted_key)
 
 
@@ -102,7 +138,7 @@ def encrypt_file(file_path: str, fernet_key: bytes) -> bytes:
     Encrypt a file using a Fernet key.
     Returns the encrypted file content as bytes.
     """
-    fernet = Fernet(fernet_key)
+    fernet = _fernet(fernet_key)
     
     with open(file_path, 'rb') as f:
         file_data = f.read()
@@ -111,11 +147,62 @@ def encrypt_file(file_path: str, fernet_key: bytes) -> bytes:
     return encrypted_data
 
 
+def encrypt_data(data: bytes, fernet_key: bytes) -> bytes:
+    """
+    Encrypt in-memory data using a Fernet key.
+    Returns the encrypted content as bytes.
+    """
+    return _fernet(fernet_key).encrypt(data)
+
+
 def decrypt_file(encrypted_data: bytes, fernet_key: bytes) -> bytes:
     """
     Decrypt file data using a Fernet key.
     Returns the decrypted file content as bytes.
     """
-    fernet = Fernet(fernet_key)
+    fernet = _fernet(fernet_key)
     decrypted_data = fernet.decrypt(encrypted_data)
     return decrypted_data
+
+
+class BandwidthLimiter:
+    """
+    Token bucket shared between threads to cap aggregate I/O throughput.
+    A rate of 0 or None disables limiting.
+    """
+
+    def __init__(self, bytes_per_second, burst=None):
+        self.rate = bytes_per_second or 0
+        self.capacity = burst or self.rate
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int):
+        """Account for nbytes of I/O, sleeping until the budget allows it."""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= nbytes
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def sha256_stream(fileobj, chunk_size: int = 1024 * 1024, limiter: BandwidthLimiter = None) -> str:
+    """
+    SHA-256 of a file-like object read in chunks, so large files are never
+    held in memory. Returns the hex digest.
+    """
+    digest = hashlib.sha256()
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        if limiter:
+            limiter.consume(len(chunk))
+        digest.update(chunk)
+    return digest.hexdigest()
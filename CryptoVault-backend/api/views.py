@@ -1,31 +1,223 @@
 from rest_framework import generics, parsers, viewsets, status
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.http import HttpResponse, Http404
-from .serializers import UserRegistrationSerializer, VaultFileSerializer, CloudUploadLogSerializer
-from .models import VaultFile, CloudUploadLog
+from django.db import models, transaction
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.http import HttpResponse, Http404, StreamingHttpResponse
+from .serializers import (
+    UserRegistrationSerializer,
+    VaultFileSerializer,
+    CloudUploadLogSerializer,
+    AnchorBatchSerializer,
+    VaultFileBulkSelectionSerializer,
+    VaultFileBulkReshareSerializer,
+    VaultFileFilterSerializer,
+)
+from .models import SHARE_EXPIRY_RESET, VaultFile, CloudUploadLog, AnchorBatch
 from .utils import (
     generate_fernet_key,
     encrypt_fernet_key_with_aes,
     decrypt_fernet_key_with_aes,
-    encrypt_file,
+    encrypt_data,
     decrypt_file
 )
-import hashlib
-import os
-import tempfile
+from .integrity import (
+    ChunkVerificationError,
+    chunk_tree_is_consistent,
+    has_chunk_tree,
+    iter_chunks,
+    iter_verified_chunks,
+    file_hash_fields,
+    hash_field_changes,
+    HashingFile,
+    StreamHasher,
+)
+from .anchoring import verify_file_anchor
+from .admission import enforce_upload_size, get_admission_controller, reserve_crypto_memory
+from .parsers import CSVParser, NDJSONParser
+from .provisioning import provision_users
+from .compression import compress_upload, decompress_data
+from .bulk import bulk_delete_files, bulk_reshare_files
+from .search import filter_vault_files
+from .export import EXPORTS, EXPORT_FORMATS, iter_export
+from .listing import serialize_file_listing
+from .usage import (
+    check_quota,
+    check_upload_quota,
+    get_quota,
+    get_usage,
+    merge_deltas,
+    apply_deltas,
+    record_cloud_uploads,
+    record_vault_file,
+    vault_file_deltas,
+)
 
 User = get_user_model()
 
 
+def seal_upload(uploaded_file, aes_key):
+    """
+    Compress (when configured) and encrypt uploaded_file under a new Fernet
+    key wrapped with aes_key (when given), and hash the bytes that will be
+    stored. Returns (content to store, VaultFile fields describing it). If
+    encryption fails the original file is stored and hashed instead.
+    """
+    content = uploaded_file
+    fields = {'original_size': uploaded_file.size, 'compression_codec': '', 'encrypted_fernet_key': None}
+    if aes_key:
+        try:
+            # Generate Fernet key
+            fernet_key = generate_fernet_key()
+
+            # Compress first (ciphertext does not compress), then encrypt
+            plaintext, codec = compress_upload(uploaded_file)
+            if plaintext is None:
+                uploaded_file.seek(0)
+                plaintext = uploaded_file.read()
+            encrypted_data = encrypt_data(plaintext, fernet_key)
+
+            # Encrypt the Fernet key with AES key
+            encrypted_fernet_key = encrypt_fernet_key_with_aes(fernet_key, aes_key)
+
+            # Store the ciphertext instead of the original
+            content = ContentFile(encrypted_data, name=uploaded_file.name)
+            fields.update(compression_codec=codec, encrypted_fernet_key=encrypted_fernet_key)
+        except Exception as e:
+            print(f"Encryption failed: {e}")
+
+    # Calculate hash (and chunk tree) of the bytes being stored
+    try:
+        content.seek(0)
+        fields.update(file_hash_fields(content))
+        content.seek(0)
+    except Exception as e:
+        print(f"Hash calculation failed: {e}")
+    fields['file_size'] = content.size
+    return content, fields
+
+
+def save_sealed_upload(serializer, uploaded_file, **save_kwargs):
+    """
+    Seal an incoming upload with seal_upload (encrypted when save_kwargs
+    carries an aes_key) before anything is written and save the instance
+    with all of it in a single INSERT.
+    """
+    data = serializer.validated_data
+    if save_kwargs.get('receiving_user') is None and (data.get('expires_at') or data.get('max_downloads')):
+        raise ValidationError({'expires_at': ["Only shared files (with a receiving user) can expire."]})
+
+    if uploaded_file is None:
+        return serializer.save(**save_kwargs)
+
+    content, fields = seal_upload(uploaded_file, save_kwargs.get('aes_key'))
+    save_kwargs.update(fields)
+
+    # Exact quota check and usage counters in the same transaction as the row
+    with transaction.atomic():
+        check_quota(save_kwargs['user'], content.size, lock=True)
+        instance = serializer.save(uploaded_file=content, **save_kwargs)
+        record_vault_file(instance)
+    return instance
+
+
+def is_client_encrypted(request):
+    """Whether the upload is declared as already encrypted by the client."""
+    return str(request.data.get('client_encrypted', '')).lower() in ('1', 'true', 'yes')
+
+
+def save_passthrough_upload(serializer, uploaded_file, **save_kwargs):
+    """
+    Store an upload the client encrypted itself: no compression, key
+    derivation or encryption. The blob is streamed to storage and hashed in
+    the same pass; encrypted_fernet_key keeps the client's wrapped key as
+    given (it is required) and no AES key is stored.
+    """
+    data = serializer.validated_data
+    if save_kwargs.get('receiving_user') is None and (data.get('expires_at') or data.get('max_downloads')):
+        raise ValidationError({'expires_at': ["Only shared files (with a receiving user) can expire."]})
+    if not save_kwargs.get('encrypted_fernet_key'):
+        raise ValidationError({'encrypted_fernet_key': ["Client-encrypted uploads must include the wrapped key."]})
+
+    field = VaultFile._meta.get_field('uploaded_file')
+    hasher = StreamHasher()
+    name = field.generate_filename(VaultFile(receiving_user=save_kwargs.get('receiving_user')), uploaded_file.name)
+    name = field.storage.save(name, HashingFile(uploaded_file, hasher), max_length=field.max_length)
+    save_kwargs.update(hasher.fields())
+    save_kwargs.update(
+        file_size=uploaded_file.size,
+        original_size=None,
+        compression_codec='',
+        aes_key=None,
+        client_encrypted=True,
+    )
+    try:
+        with transaction.atomic():
+            check_quota(save_kwargs['user'], uploaded_file.size, lock=True)
+            instance = serializer.save(uploaded_file=name, **save_kwargs)
+            record_vault_file(instance)
+    except Exception:
+        field.storage.delete(name)
+        raise
+    return instance
+
+
+def save_vault_upload(request, serializer):
+    """
+    Save a new upload for request.user: resolve the receiver (by
+    'receiving_username' or 'receiving_user' id; unknown ones leave the file
+    unshared), then store it as given when it is client-encrypted, else seal
+    it with save_sealed_upload.
+    """
+    uploaded_file = request.FILES.get('uploaded_file')
+    receiving_user_id = request.data.get('receiving_user')
+    receiving_username = request.data.get('receiving_username')
+    aes_key = request.data.get('aes_key', '')
+
+    # If username is provided, look up the user
+    receiving_user = None
+    if receiving_username:
+        try:
+            receiving_user = User.objects.get(username=receiving_username)
+        except User.DoesNotExist:
+            pass  # receiving_user will remain None
+    elif receiving_user_id:
+        try:
+            receiving_user = User.objects.get(id=receiving_user_id)
+        except User.DoesNotExist:
+            receiving_user = None
+
+    if uploaded_file and is_client_encrypted(request):
+        return save_passthrough_upload(
+            serializer,
+            uploaded_file,
+            user=request.user,
+            file_name=uploaded_file.name,
+            receiving_user=receiving_user,
+            encrypted_fernet_key=request.data.get('encrypted_fernet_key') or None
+        )
+
+    # Reserve memory for the encryption before anything is written
+    with reserve_crypto_memory(uploaded_file.size if uploaded_file and aes_key else 0):
+        return save_sealed_upload(
+            serializer,
+            uploaded_file,
+            user=request.user,
+            file_name=uploaded_file.name if uploaded_file else "",
+            receiving_user=receiving_user,
+            aes_key=aes_key
+        )
+
+
 # File upload/list API for authenticated users, secured with JWT Authentication
 class FileUploadView(generics.ListCreateAPIView):
     serializer_class = VaultFileSerializer
@@ -35,88 +227,18 @@ class FileUploadView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Filter to show only files owned by the logged-in user (personal vault)"""
-        return VaultFile.objects.filter(
+        return VaultFile.objects.unexpired().filter(
             user=self.request.user,
             receiving_user__isnull=True
         ).order_by('-uploaded_at')
 
+    def create(self, request, *args, **kwargs):
+        enforce_upload_size(request)
+        check_upload_quota(request)
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        uploaded_file = self.request.FILES.get('uploaded_file')
-        receiving_user_id = self.request.data.get('receiving_user')
-        receiving_username = self.request.data.get('receiving_username')
-        aes_key = self.request.data.get('aes_key', '')
-        
-        # If username is provided, look up the user
-        receiving_user = None
-        if receiving_username:
-            try:
-                receiving_user = User.objects.get(username=receiving_username)
-                receiving_user_id = receiving_user.id
-            except User.DoesNotExist:
-                pass  # receiving_user will remain None
-        elif receiving_user_id:
-            try:
-                receiving_user = User.objects.get(id=receiving_user_id)
-            except User.DoesNotExist:
-                receiving_user = None
-                receiving_user_id = None
-        
-        # Save instance first to get file path
-        instance = serializer.save(
-            user=self.request.user,
-            file_name=uploaded_file.name if uploaded_file else "",
-            receiving_user=receiving_user,
-            aes_key=aes_key
-        )
-        
-        # Encrypt file if AES key is provided
-        if uploaded_file and instance.uploaded_file and aes_key:
-            try:
-                file_path = instance.uploaded_file.path
-                
-                # Generate Fernet key
-                fernet_key = generate_fernet_key()
-                    
-                
-                # Encrypt the file
-                encrypted_data = encrypt_file(file_path, fernet_key)
-                
-                # Encrypt the Fernet key with AES key
-                encrypted_fernet_key = encrypt_fernet_key_with_aes(fernet_key, aes_key)
-                
-                # Save encrypted file (overwrite original)
-                with open(file_path, 'wb') as f:
-                    f.write(encrypted_data)
-                
-                # Save encrypted Fernet key
-                instance.encrypted_fernet_key = encrypted_fernet_key
-                
-                # Calculate hash of encrypted file
-                with open(file_path, 'rb') as f:
-                    hash_val = hashlib.sha256(f.read()).hexdigest()
-                instance.blockchain_hash = hash_val
-                instance.save()
-            except Exception as e:
-                print(f"Encryption/hash calculation failed: {e}")
-                # If encryption fails, still calculate hash of original file
-                try:
-                    file_path = instance.uploaded_file.path
-                    with open(file_path, 'rb') as f:
-                        hash_val = hashlib.sha256(f.read()).hexdigest()
-                    instance.blockchain_hash = hash_val
-                    instance.save()
-                except Exception as e2:
-                    print(f"Hash calculation failed: {e2}")
-        elif uploaded_file and instance.uploaded_file:
-            # No encryption, just calculate hash
-            try:
-                file_path = instance.uploaded_file.path
-                with open(file_path, 'rb') as f:
-                    hash_val = hashlib.sha256(f.read()).hexdigest()
-                instance.blockchain_hash = hash_val
-                instance.save()
-            except Exception as e:
-                print(f"Hash calculation failed: {e}")
+        save_vault_upload(self.request, serializer)
 
 
 # ViewSet for router-based file APIs (router URL: /files/)
@@ -133,128 +255,177 @@ class SecureFileViewSet(viewsets.ModelViewSet):
         - Files received by the logged-in user (receiving_user=self.request.user)
         """
         user = self.request.user
-        return VaultFile.objects.filter(
+        return VaultFile.objects.unexpired().filter(
             models.Q(user=user) | models.Q(receiving_user=user)
         ).order_by('-uploaded_at')
     
+    def filter_queryset(self, queryset):
+        """Apply search/filter query parameters to listings (not to detail lookups)."""
+        queryset = super().filter_queryset(queryset)
+        if self.action not in ('list', 'vault_files', 'shared_files', 'received_files'):
+            return queryset
+        params = VaultFileFilterSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return filter_vault_files(queryset, params.validated_data)
+
     def get_queryset_for_vault(self):
         """Get only files owned by user (not shared files)"""
-        return VaultFile.objects.filter(
+        return VaultFile.objects.unexpired().filter(
             user=self.request.user,
             receiving_user__isnull=True
         ).order_by('-uploaded_at')
     
     def get_queryset_for_shared(self):
         """Get only files received by user"""
-        return VaultFile.objects.filter(
+        return VaultFile.objects.unexpired().filter(
             receiving_user=self.request.user
         ).order_by('-uploaded_at')
 
+    def create(self, request, *args, **kwargs):
+        enforce_upload_size(request)
+        check_upload_quota(request)
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        receiving_user_id = self.request.data.get('receiving_user')
-        receiving_username = self.request.data.get('receiving_username')
-        aes_key = self.request.data.get('aes_key', '')
-        
-        # If username is provided, look up the user
-        receiving_user = None
-        if receiving_username:
-            try:
-                receiving_user = User.objects.get(username=receiving_username)
-                receiving_user_id = receiving_user.id
-            except User.DoesNotExist:
-                pass  # receiving_user will remain None
-        elif receiving_user_id:
-            try:
-                receiving_user = User.objects.get(id=receiving_user_id)
-            except User.DoesNotExist:
-                receiving_user = None
-                receiving_user_id = None
-        
-        # Save instance first to get file path
-        instance = serializer.save(
-            user=self.request.user,
-            file_name=self.request.FILES['uploaded_file'].name if 'uploaded_file' in self.request.FILES else "",
-            receiving_user=receiving_user,
-            aes_key=aes_key
-        )
-        
-        # Encrypt file if AES key is provided
-        if 'uploaded_file' in self.request.FILES and instance.uploaded_file and aes_key:
-            try:
-                file_path = instance.uploaded_file.path
-                
-                # Generate Fernet key
-                fernet_key = generate_fernet_key()
-                
-                # Encrypt the file
-                encrypted_data = encrypt_file(file_path, fernet_key)
-                
-                # Encrypt the Fernet key with AES key
-                encrypted_fernet_key = encrypt_fernet_key_with_aes(fernet_key, aes_key)
-                
-                # Save encrypted file (overwrite original)
-                with open(file_path, 'wb') as f:
-                    f.write(encrypted_data)
-                
-                # Save encrypted Fernet key
-                instance.encrypted_fernet_key = encrypted_fernet_key
-                
-                # Calculate hash of encrypted file
-                with open(file_path, 'rb') as f:
-                    hash_val = hashlib.sha256(f.read()).hexdigest()
-                instance.blockchain_hash = hash_val
-                instance.save()
-            except Exception as e:
-                print(f"Encryption/hash calculation failed: {e}")
-                # If encryption fails, still calculate hash of original file
-                try:
-                    file_path = instance.uploaded_file.path
-                    with open(file_path, 'rb') as f:
-                        hash_val = hashlib.sha256(f.read()).hexdigest()
-                    instance.blockchain_hash = hash_val
-                    instance.save()
-                except Exception as e2:
-                    print(f"Hash calculation failed: {e2}")
-        elif 'uploaded_file' in self.request.FILES and instance.uploaded_file:
-            # No encryption, just calculate hash
-            try:
-                file_path = instance.uploaded_file.path
-                with open(file_path, 'rb') as f:
-                    hash_val = hashlib.sha256(f.read()).hexdigest()
-                instance.blockchain_hash = hash_val
-                instance.save()
-            except Exception as e:
-                print(f"Hash calculation failed: {e}")
+        save_vault_upload(self.request, serializer)
+
+    def update(self, request, *args, **kwargs):
+        enforce_upload_size(request)
+        return super().update(request, *args, **kwargs)
 
     def perform_update(self, serializer):
-        instance = serializer.save()
-        try:
-            file_path = instance.uploaded_file.path
-            with open(file_path, 'rb') as f:
-                hash_val = hashlib.sha256(f.read()).hexdigest()
-            instance.blockchain_hash = hash_val
-            instance.save()
-        except Exception as e:
-            print(f"Hash calculation failed (update): {e}")
+        """
+        Save only the changed fields, in one UPDATE; metadata changes never
+        read the stored blob. Replacement content is sealed like a new
+        upload, or streamed to storage and hashed in one pass when the
+        client encrypted it, and the quota is checked for the growth. A new
+        receiver starts without the old share's expiry, unless the same
+        request sets one.
+        """
+        instance = serializer.instance
+        removed = vault_file_deltas(instance.user_id, instance.receiving_user_id, instance.file_size, sign=-1)
+        changes = dict(serializer.validated_data)
+        if 'receiving_user' in changes and getattr(changes['receiving_user'], 'pk', None) != instance.receiving_user_id:
+            changes = {**SHARE_EXPIRY_RESET, **changes}
+        new_file = changes.pop('uploaded_file', None)
+
+        hasher = None
+        if new_file is not None and is_client_encrypted(self.request):
+            encrypted_fernet_key = self.request.data.get('encrypted_fernet_key') or None
+            if not encrypted_fernet_key:
+                raise ValidationError({'encrypted_fernet_key': ["Client-encrypted uploads must include the wrapped key."]})
+            hasher = StreamHasher()
+            content = HashingFile(new_file, hasher)
+            changes.update(
+                file_size=new_file.size,
+                original_size=None,
+                compression_codec='',
+                encrypted_fernet_key=encrypted_fernet_key,
+                aes_key=None,
+                client_encrypted=True,
+            )
+        aes_key = changes.get('aes_key', instance.aes_key)
+
+        # Reserve memory for the encryption before anything is written
+        with reserve_crypto_memory(new_file.size if new_file is not None and hasher is None and aes_key else 0):
+            if new_file is not None and hasher is None:
+                content, fields = seal_upload(new_file, aes_key)
+                changes.update(fields, client_encrypted=False)
+            with transaction.atomic():
+                if new_file is not None:
+                    owner = self.request.user if self.request.user.pk == instance.user_id else instance.user
+                    check_quota(owner, changes['file_size'] - (instance.file_size or 0), incoming_files=0, lock=True)
+                    instance.uploaded_file.save(new_file.name, content, save=False)
+                    if hasher is not None:
+                        changes.update(hasher.fields())
+                    if 'blockchain_hash' in changes:
+                        changes.update(hash_field_changes(instance, changes))
+                    changes.update(uploaded_file=instance.uploaded_file, file_name=new_file.name)
+                for field, value in changes.items():
+                    setattr(instance, field, value)
+                if changes:
+                    instance.save(update_fields=list(changes))
+                apply_deltas(merge_deltas(
+                    removed,
+                    vault_file_deltas(instance.user_id, instance.receiving_user_id, instance.file_size)
+                ))
     
+    def list(self, request, *args, **kwargs):
+        """All files owned or received by user (lean read-only listing)"""
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(serialize_file_listing(queryset, request))
+
     def vault_files(self, request, *args, **kwargs):
         """Get only files owned by user (personal vault files)"""
-        queryset = self.get_queryset_for_vault()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset_for_vault())
+        return Response(serialize_file_listing(queryset, request))
     
     def shared_files(self, request, *args, **kwargs):
         """Get only files received by user (shared files)"""
-        queryset = self.get_queryset_for_shared()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset_for_shared())
+        return Response(serialize_file_listing(queryset, request))
     
     def received_files(self, request, *args, **kwargs):
         """Get files received by user (alias for shared_files)"""
-        queryset = self.get_queryset_for_shared()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        queryset = self.filter_queryset(self.get_queryset_for_shared())
+        return Response(serialize_file_listing(queryset, request))
     
+    def get_bulk_queryset(self, selection):
+        """Files selected for a bulk action; only the caller's own files qualify."""
+        return selection.filter_queryset(VaultFile.objects.filter(user=self.request.user))
+
+    def requested_ids_not_found(self, selection, queryset):
+        """Requested ids that are not the caller's files (resolved in one query)."""
+        found = set(queryset.values_list('id', flat=True))
+        return sorted(set(selection.validated_data['ids']) - found)
+
+    @action(detail=False, methods=['post'])
+    def bulk_delete(self, request):
+        """
+        Delete many of the user's own files, by 'ids' and/or filters
+        ('uploaded_before', 'scope', 'shared_with'). Blobs are removed in
+        the background by collect_garbage.
+        """
+        selection = VaultFileBulkSelectionSerializer(data=request.data)
+        selection.is_valid(raise_exception=True)
+        queryset = self.get_bulk_queryset(selection)
+        data = {}
+        if 'ids' in selection.validated_data:
+            data['not_found'] = self.requested_ids_not_found(selection, queryset)
+        data['deleted'] = bulk_delete_files(queryset)
+        return Response(data)
+
+    @action(detail=False, methods=['post'])
+    def bulk_reshare(self, request):
+        """
+        Point 'receiving_user' (or 'receiving_username') of many of the
+        user's own files at a new receiver; null moves them back to the
+        personal vault. Files are selected as for bulk_delete.
+        """
+        selection = VaultFileBulkReshareSerializer(data=request.data)
+        selection.is_valid(raise_exception=True)
+        receiving_user = selection.validated_data['receiving_user']
+        if receiving_user == request.user:
+            return Response(
+                {'error': 'Files cannot be shared with their owner.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.get_bulk_queryset(selection)
+        data = {}
+        if 'ids' in selection.validated_data:
+            data['not_found'] = self.requested_ids_not_found(selection, queryset)
+        data['updated'] = bulk_reshare_files(queryset, receiving_user)
+        return Response(data)
+
+    def download_limit_reached(self, file_instance):
+        """Count a recipient's download; a 410 response once max_downloads is used up."""
+        if file_instance.receiving_user_id != self.request.user.pk or file_instance.record_download():
+            return None
+        return Response(
+            {'error': 'Download limit reached for this shared file.'},
+            status=status.HTTP_410_GONE
+        )
+
     @action(detail=True, methods=['post'])
     def decrypt_and_download(self, request, pk=None):
         """
@@ -265,12 +436,18 @@ class SecureFileViewSet(viewsets.ModelViewSet):
             file_instance = self.get_object()
             
             # Verify user has access to this file
-            if file_instance.user != request.user and file_instance.receiving_user != request.user:
+            if request.user.pk not in (file_instance.user_id, file_instance.receiving_user_id):
                 return Response(
                     {'error': 'You do not have permission to access this file.'},
                     status=status.HTTP_403_FORBIDDEN
                 )
             
+            if file_instance.client_encrypted:
+                return Response(
+                    {'error': 'File was encrypted by the client; fetch it with download_encrypted.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
             # Get decryption key from request
             decryption_key = request.data.get('decryption_key')
             if not decryption_key:
@@ -304,26 +481,43 @@ class SecureFileViewSet(viewsets.ModelViewSet):
                     {'error': 'Failed to decrypt Fernet key. Invalid decryption key.'},
                     status=status.HTTP_401_UNAUTHORIZED
                 )
+
+            # Ciphertext and plaintext are both held in memory while decrypting
+            with reserve_crypto_memory(max(file_instance.uploaded_file.size, file_instance.original_size or 0)):
+                # Read encrypted file, checking each chunk against the Merkle tree
+                try:
+                    encrypted_data = b''.join(iter_verified_chunks(file_instance))
+                except ChunkVerificationError as e:
+                    return Response(
+                        {'error': 'File failed integrity verification.', 'chunk': e.index},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    )
+
+                # Decrypt file (and undo compression applied at upload)
+                try:
+                    decrypted_data = decompress_data(
+                        decrypt_file(encrypted_data, fernet_key),
+                        file_instance.compression_codec
+                    )
+                except Exception as e:
+                    return Response(
+                        {'error': 'Failed to decrypt file.'},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                    )
+
+                # Only a download that produced the file counts against max_downloads
+                limit_reached = self.download_limit_reached(file_instance)
+                if limit_reached:
+                    return limit_reached
+
+                # Return decrypted file as response
+                response = HttpResponse(decrypted_data, content_type='application/octet-stream')
+                response['Content-Disposition'] = f'attachment; filename="{file_instance.file_name}"'
+                return response
             
-            # Read encrypted file
-            file_path = file_instance.uploaded_file.path
-            with open(file_path, 'rb') as f:
-                encrypted_data = f.read()
-            
-            # Decrypt file
-            try:
-                decrypted_data = decrypt_file(encrypted_data, fernet_key)
-            except Exception as e:
-                return Response(
-                    {'error': 'Failed to decrypt file.'},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-            
-            # Return decrypted file as response
-            response = HttpResponse(decrypted_data, content_type='application/octet-stream')
-            response['Content-Disposition'] = f'attachment; filename="{file_instance.file_name}"'
-            return response
-            
+        except (APIException, Http404):
+            # Let DRF render 404s and admission rejections (503 + Retry-After)
+            raise
         except VaultFile.DoesNotExist:
             return Response(
                 {'error': 'File not found.'},
@@ -335,6 +529,129 @@ class SecureFileViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get'])
+    def verify_chunks(self, request, pk=None):
+        """
+        Verify part of the stored file against its Merkle chunk tree.
+        Query parameters: either 'chunks' (comma separated indexes) or a
+        byte range with 'start' and 'end' (end exclusive). Without either,
+        the whole file is checked.
+        """
+        file_instance = self.get_object()
+        if not has_chunk_tree(file_instance):
+            return Response(
+                {'error': 'File has no chunk hashes.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        chunk_size = file_instance.merkle_chunk_size
+        chunk_count = len(file_instance.get_chunk_hashes())
+        try:
+            if 'chunks' in request.query_params:
+                indexes = sorted({int(i) for i in request.query_params['chunks'].split(',') if i.strip()})
+                if not indexes:
+                    raise ValueError
+            elif 'start' in request.query_params or 'end' in request.query_params:
+                start = int(request.query_params.get('start', 0))
+                end = int(request.query_params.get('end', chunk_count * chunk_size))
+                if start < 0 or end <= start:
+                    raise ValueError
+                indexes = list(range(start // chunk_size, min((end - 1) // chunk_size + 1, chunk_count)))
+                if not indexes:
+                    return Response(
+                        {'error': f'Range starts beyond the end of the file ({chunk_count} chunks).'},
+                        status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+                    )
+            else:
+                indexes = list(range(chunk_count))
+        except ValueError:
+            return Response(
+                {'error': 'Invalid chunk indexes or byte range.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if any(i < 0 or i >= chunk_count for i in indexes):
+            return Response(
+                {'error': f'Chunk index out of range (file has {chunk_count} chunks).'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = {i: False for i in indexes}
+        # Read contiguous runs of requested chunks with one seek each
+        runs = []
+        for i in indexes:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        for first, last in runs:
+            for index, data, valid in iter_chunks(file_instance, first, last):
+                results[index] = valid
+
+        return Response({
+            'merkle_root': file_instance.merkle_root,
+            'tree_consistent': chunk_tree_is_consistent(file_instance),
+            'chunk_size': chunk_size,
+            'chunk_count': chunk_count,
+            'valid': all(results.values()),
+            'chunks': [
+                {'index': i, 'offset': i * chunk_size, 'valid': results[i]}
+                for i in indexes
+            ],
+        })
+
+    @action(detail=True, methods=['get'])
+    def download_encrypted(self, request, pk=None):
+        """
+        Stream the stored ciphertext as-is. Each chunk is checked against
+        the Merkle tree as it is served; on a mismatch the stream is cut
+        short, so the client sees a truncated body instead of bad data.
+        """
+        file_instance = self.get_object()
+        storage = file_instance.uploaded_file.storage
+        name = file_instance.uploaded_file.name
+        if not name or not storage.exists(name):
+            raise Http404('Stored file not found.')
+        limit_reached = self.download_limit_reached(file_instance)
+        if limit_reached:
+            return limit_reached
+
+        response = StreamingHttpResponse(
+            iter_verified_chunks(file_instance),
+            content_type='application/octet-stream'
+        )
+        response['Content-Length'] = storage.size(name)
+        response['Content-Disposition'] = f'attachment; filename="{file_instance.file_name}"'
+        response['X-Chunk-Verification'] = 'merkle' if has_chunk_tree(file_instance) else 'unavailable'
+        if file_instance.client_encrypted:
+            response['X-Client-Encrypted'] = '1'
+        if file_instance.blockchain_hash:
+            response['X-Blockchain-Hash'] = file_instance.blockchain_hash
+        return response
+
+
+    @action(detail=True, methods=['get'])
+    def proof(self, request, pk=None):
+        """
+        Inclusion proof of this file's blockchain_hash in its anchor batch.
+        Verifying it takes O(log n) hashes: fold the leaf with each sibling
+        in order ('left' siblings are hashed before the running node) and
+        compare with the batch root.
+        """
+        file_instance = self.get_object()
+        if not file_instance.anchor_batch_id:
+            return Response(
+                {'error': 'File has not been anchored yet.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({
+            'blockchain_hash': file_instance.blockchain_hash,
+            'leaf_index': file_instance.anchor_index,
+            'proof': file_instance.anchor_proof,
+            'batch': AnchorBatchSerializer(file_instance.anchor_batch).data,
+            'verified': verify_file_anchor(file_instance),
+            'leaf_encoding': 'sha256(0x00 || blockchain_hash bytes)',
+            'node_encoding': 'sha256(0x01 || left || right)',
+        })
+
 
 # Token authentication endpoint 
 # You can remove this if you fully switch to JWT
@@ -368,8 +685,156 @@ class CloudUploadLogView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Return only logs for the authenticated user"""
-        return CloudUploadLog.objects.filter(user=self.request.user)
+        # user is rendered with StringRelatedField
+        return CloudUploadLog.objects.filter(user=self.request.user).select_related('user')
     
     def perform_create(self, serializer):
         """Associate the log with the authenticated user"""
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        with transaction.atomic():
+            log = serializer.save(user=self.request.user)
+            record_cloud_uploads([log])
+
+
+def bulk_results_response(results):
+    """Response for per-item bulk results: 201 if all were created, 207 if some, 400 if none."""
+    created = sum(1 for result in results if result['status'] == 'created')
+    if created == len(results):
+        response_status = status.HTTP_201_CREATED
+    elif created:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_400_BAD_REQUEST
+    return Response(
+        {'created': created, 'failed': len(results) - created, 'results': results},
+        status=response_status
+    )
+
+
+class CloudUploadLogBulkView(generics.GenericAPIView):
+    """
+    Create many cloud upload log entries in one request.
+    Accepts a JSON array or NDJSON (one entry per line) and returns a
+    per-item result: 201 if every item was stored, 207 if only some were,
+    400 if none were.
+    """
+    serializer_class = CloudUploadLogSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [parsers.JSONParser, NDJSONParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            max_length=getattr(settings, 'CLOUD_UPLOAD_BULK_MAX_ITEMS', 5000)
+        )
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data:
+            # Each chunk commits with its usage counters in its own short transaction
+            serializer.save(user=request.user)
+        return bulk_results_response(serializer.item_results())
+
+
+class UserProvisionView(generics.GenericAPIView):
+    """
+    Create many users in one request (admin only).
+    Accepts a JSON array, NDJSON or CSV with a header row, each item having
+    username, email and password, and returns a per-item result like
+    /cloud-uploads/bulk/. Requests are capped at USER_PROVISION_MAX_ITEMS
+    rows, since every password is hashed before the response is sent.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+    parser_classes = [parsers.JSONParser, NDJSONParser, CSVParser]
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+        if len(items) > settings.USER_PROVISION_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f'Ensure this list has no more than {settings.USER_PROVISION_MAX_ITEMS} items; '
+                'import larger files with the provision_users management command.'
+            ]})
+        return bulk_results_response(provision_users(items))
+
+
+class AnchorBatchView(generics.RetrieveAPIView):
+    """
+    Details of an anchor batch (root and publishing status).
+    """
+    queryset = AnchorBatch.objects.all()
+    serializer_class = AnchorBatchSerializer
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+
+class CryptoAdmissionStatsView(generics.GenericAPIView):
+    """
+    Current state of the crypto admission controller (admin only).
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_admission_controller().stats())
+
+
+class StorageUsageView(generics.GenericAPIView):
+    """
+    Current storage usage of the authenticated user, read from the
+    precomputed counters, plus the configured quota.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        usage = get_usage(request.user)
+        max_bytes, max_files = get_quota()
+        return Response({
+            'vault': {'bytes': usage.vault_bytes, 'files': usage.vault_files},
+            'shared_out': {'bytes': usage.shared_out_bytes, 'files': usage.shared_out_files},
+            'shared_in': {'bytes': usage.shared_in_bytes, 'files': usage.shared_in_files},
+            'cloud': {'bytes': usage.cloud_bytes, 'files': usage.cloud_files},
+            'owned': {'bytes': usage.owned_bytes, 'files': usage.owned_files},
+            'quota': {'bytes': max_bytes, 'files': max_files},
+            'updated_at': usage.updated_at,
+        })
+
+
+class MetadataExportView(generics.GenericAPIView):
+    """
+    Stream metadata of the user's vault files (files owned or received) or
+    cloud upload logs as NDJSON (?fmt=ndjson, default) or CSV (?fmt=csv).
+    Staff can export every user's rows with ?all=true. File exports accept
+    the same filters as the file listings.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, kind, *args, **kwargs):
+        export_format = request.query_params.get('fmt', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"fmt must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        model, fields = EXPORTS[kind]
+        queryset = model.objects.all()
+        if not (request.user.is_staff and request.query_params.get('all') == 'true'):
+            if model is VaultFile:
+                queryset = queryset.unexpired().filter(models.Q(user=request.user) | models.Q(receiving_user=request.user))
+            else:
+                queryset = queryset.filter(user=request.user)
+        if model is VaultFile:
+            params = VaultFileFilterSerializer(data=request.query_params)
+            params.is_valid(raise_exception=True)
+            queryset = filter_vault_files(queryset, params.validated_data)
+
+        response = StreamingHttpResponse(
+            iter_export(queryset, fields, export_format),
+            content_type=EXPORT_FORMATS[export_format]
+        )
+        extension = 'csv' if export_format == 'csv' else 'ndjson'
+        response['Content-Disposition'] = f'attachment; filename="{kind}.{extension}"'
+        return response
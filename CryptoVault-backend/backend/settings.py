@@ -14,12 +14,6 @@ PROJECT_ROOT = BASE_DIR.parent
 # The path to the built frontend files
 FRONTEND_DIST_DIR = PROJECT_ROOT / 'dist'
 
-# 🛑 CRITICAL DEBUG STEP: Check the calculated path
-print(f"\n--- DEBUG PATH CHECK ---")
-print(f"Project Root (2 up): {PROJECT_ROOT}")
-print(f"Frontend Dist Dir: {FRONTEND_DIST_DIR}")
-print(f"------------------------\n")
-
 # -------------------------------------------------------------
 # 🎯 CORE CONFIGURATION
 # -------------------------------------------------------------
@@ -46,9 +40,6 @@ INSTALLED_APPS = [
     'api',
 ]
 
-# 🛑 CRITICAL DEBUG LINE
-print(f"*** DEBUG MEDIA ROOT: {MEDIA_ROOT}")
-
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware', # MUST be placed high up
@@ -57,8 +48,19 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Needs request.user, so it stays after AuthenticationMiddleware
+    'api.middleware.RequestProfilingMiddleware',
 ]
 
+# On-demand request profiling (see api/middleware.py). Disabled by default;
+# when disabled the middleware drops out of the chain at startup.
+REQUEST_PROFILING = {
+    'ENABLED': os.getenv('REQUEST_PROFILING', '0') == '1',
+    'SAMPLE_RATE': float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', '0')),
+    'HEADER': 'X-Profile-Request',
+    'OUTPUT_DIR': BASE_DIR / 'profiles',
+}
+
 ROOT_URLCONF = 'backend.urls'
 
 # -------------------------------------------------------------
@@ -130,18 +132,168 @@ CORS_ALLOWED_ORIGINS = [
 CORS_ALLOW_CREDENTIALS = True
 
 # -------------------------------------------------------------
-# 🎯 DATABASE & DEFAULTS (unchanged)
+# 🎯 DATABASE & DEFAULTS
 # -------------------------------------------------------------
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# SQLite tuned for concurrent requests: WAL lets readers run alongside the
+# writer, IMMEDIATE transactions take the write lock up front (no "database
+# is locked" when a read-then-write transaction has to upgrade its lock),
+# and writers wait up to `timeout` seconds for the lock instead of failing.
+# Compare with: python manage.py bench_db
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA cache_size=-20000;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 20,
 }
 
+# DB_ENGINE=postgresql switches to PostgreSQL with psycopg 3's built-in
+# connection pool (pip install "psycopg[binary,pool]").
+if os.getenv('DB_ENGINE', 'sqlite') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'cryptovault'),
+            'USER': os.getenv('POSTGRES_USER', 'cryptovault'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 20)),
+                    'timeout': 10,
+                },
+            },
+            # Required behind PgBouncer in transaction pooling mode
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', '0') == '1',
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': SQLITE_OPTIONS,
+            # Keep connections open across requests instead of reconnecting
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cold-start budget (django.setup + WSGI app + URLconf) checked by the
+# bench_startup command and the start-up test in api/tests.py
+STARTUP_IMPORT_BUDGET_MS = float(os.getenv('STARTUP_IMPORT_BUDGET_MS', 1500))
+
+# -------------------------------------------------------------
+# 🎯 VAULT STORAGE
+# -------------------------------------------------------------
+
+# Chunk size for the per-file Merkle tree stored next to blockchain_hash.
+# Set to 0 to only store the whole-file hash.
+VAULT_MERKLE_CHUNK_SIZE = 1024 * 1024
+
+# Storages vault blobs (VaultFile.uploaded_file) can live on. 'default' keeps
+# them under MEDIA_ROOT; 'gridfs' streams them into MongoDB GridFS through the
+# shared pooled client in api/utils.py (MONGO_URI / DB_NAME).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'gridfs': {
+        'BACKEND': 'api.storage.GridFSStorage',
+        'OPTIONS': {
+            'bucket_name': os.getenv('GRIDFS_BUCKET', 'vault'),
+        },
+    },
+}
+# Alias new uploads are written to. Every row records the alias of its blob
+# (VaultFile.storage_alias), so changing this only affects new uploads; move
+# existing blobs with `migrate_storage --from default --to gridfs`.
+# VAULT_STORAGE_BACKEND=gridfs is accepted for older deployments.
+VAULT_STORAGE_ALIAS = os.getenv(
+    'VAULT_STORAGE_ALIAS',
+    'gridfs' if os.getenv('VAULT_STORAGE_BACKEND') == 'gridfs' else 'default'
+)
+
+# Server-side mirroring of vault ciphertext to S3-compatible storage
+# (see api/replication.py and the replicate_vault command). Point
+# ENDPOINT_URL at MinIO or moto_server to test locally. Requires boto3.
+VAULT_REPLICATION = {
+    'ENABLED': os.getenv('VAULT_REPLICATION', '0') == '1',
+    'ENDPOINT_URL': os.getenv('S3_ENDPOINT_URL') or None,
+    'BUCKET': os.getenv('AWS_S3_BUCKET'),
+    'REGION': os.getenv('AWS_REGION'),
+    'ACCESS_KEY_ID': os.getenv('AWS_ACCESS_KEY_ID'),
+    'SECRET_ACCESS_KEY': os.getenv('AWS_SECRET_ACCESS_KEY'),
+    'PREFIX': 'vault/',
+    'PART_SIZE': 8 * 1024 * 1024,
+    'PART_CONCURRENCY': 8,
+    'MAX_POOL_CONNECTIONS': 16,
+    'MAX_MBPS': float(os.getenv('VAULT_REPLICATION_MAX_MBPS', 0)),
+}
+
+# Compression of encrypted uploads before encryption (see api/compression.py).
+# CODEC is '' (off, the default), 'zlib', 'lzma' or 'zstd' (needs zstandard,
+# else zlib).
+# Already-compressed content types and high-entropy samples are stored as is.
+VAULT_COMPRESSION = {
+    'CODEC': os.getenv('VAULT_COMPRESSION_CODEC', ''),
+    'LEVEL': int(os.getenv('VAULT_COMPRESSION_LEVEL', 0)) or None,
+    'MIN_SIZE': 1024,
+    'MAX_ENTROPY': 7.5,
+}
+
+# Deleted vault files are tombstoned; collect_garbage removes their blobs
+# once they have been deleted for this long (in-flight downloads finish).
+VAULT_DELETE_GRACE_SECONDS = int(os.getenv('VAULT_DELETE_GRACE_SECONDS', 300))
+
+# Per-user quota on files a user uploads (personal and shared-out); None
+# disables the limit. Checked from Content-Length before the body is read.
+VAULT_QUOTA_BYTES = int(os.getenv('VAULT_QUOTA_BYTES', 0)) or None
+VAULT_QUOTA_FILES = int(os.getenv('VAULT_QUOTA_FILES', 0)) or None
+
+# Maximum number of entries accepted by POST /cloud-uploads/bulk/
+CLOUD_UPLOAD_BULK_MAX_ITEMS = 5000
+
+# Bulk user provisioning (see api/provisioning.py). Password validation and
+# hashing run in this many worker processes (0: one per CPU).
+USER_PROVISION_WORKERS = int(os.getenv('USER_PROVISION_WORKERS', 0)) or os.cpu_count() or 1
+# Maximum number of users accepted by POST /users/bulk/, kept to what can be
+# hashed within one request; larger imports go through provision_users
+USER_PROVISION_MAX_ITEMS = int(os.getenv('USER_PROVISION_MAX_ITEMS', 100))
+
+# Uploads larger than this are rejected from their Content-Length before
+# the body is read. Uploads above FILE_UPLOAD_MAX_MEMORY_SIZE are spooled to
+# a temporary file rather than kept in memory while the request is parsed.
+VAULT_MAX_UPLOAD_SIZE = int(os.getenv('VAULT_MAX_UPLOAD_SIZE', 512 * 1024 * 1024))
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5 MB, Django's default
+DATA_UPLOAD_MAX_MEMORY_SIZE = 2621440
+
+# Admission control for in-memory encryption/decryption (see api/admission.py).
+# MAX_BYTES defaults to room for two maximum-size uploads at MEMORY_FACTOR.
+CRYPTO_ADMISSION = {
+    'MAX_CONCURRENT': int(os.getenv('CRYPTO_MAX_CONCURRENT', 4)),
+    'MAX_BYTES': int(os.getenv('CRYPTO_MAX_BYTES', VAULT_MAX_UPLOAD_SIZE * 3 * 2)),
+    'QUEUE_TIMEOUT': float(os.getenv('CRYPTO_QUEUE_TIMEOUT', 10)),
+    'RETRY_AFTER': 5,
+    'MEMORY_FACTOR': 3,
+}
+
+# Dotted path to a callable(batch) -> reference that publishes anchor batch
+# roots (see api/anchoring.py). None only records roots locally.
+VAULT_ANCHOR_PUBLISHER = os.getenv('VAULT_ANCHOR_PUBLISHER') or None
+
 # -------------------------------------------------------------
 # 🎯 SIMPLE JWT SETTINGS
 # -------------------------------------------------------------